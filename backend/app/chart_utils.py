@@ -1,138 +1,246 @@
-"""차트 데이터 생성 유틸리티"""
+"""차트 데이터 생성 유틸리티
 
-from typing import List, Dict, Any, Optional
+컬럼 종류는 DB 계층이 알려준 타입(QueryResult.column_types, cursor.description 타입 OID 기준)으로
+정하고, 행을 한 번 전치(zip)한 뒤 컬럼 단위로 변환합니다. 타입 정보가 없으면(결과 캐시의 오래된
+항목 등) 컬럼 값으로 추정합니다.
+
+라인 차트 점이 CHART_MAX_POINTS를 넘으면 LTTB(Largest-Triangle-Three-Buckets)로 모양(최고/최저점)을
+유지하며 줄여서 보냅니다 (데이터셋이 여러 개면 각 데이터셋이 고른 점의 합집합).
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, Sequence
 import logging
 
+from app.settings import get_settings
+
 logger = logging.getLogger(__name__)
 
-def generate_chart_data(columns: List[str], rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+NUMBER_TYPES = {"integer", "number"}
+DATE_TYPES = {"date", "datetime"}
+
+# 날짜로 볼 컬럼 이름 (예: TO_CHAR(...) AS month, EXTRACT(MONTH FROM ...) AS month)
+DATE_NAME_KEYWORDS = ['date', 'month', 'year', 'day', 'time', '일', '월', '년']
+
+COLORS = [
+    'rgb(102, 126, 234)',  # 보라
+    'rgb(255, 99, 132)',   # 빨강
+    'rgb(75, 192, 192)',   # 청록
+    'rgb(255, 159, 64)',   # 주황
+    'rgb(153, 102, 255)',  # 보라
+    'rgb(255, 205, 86)',   # 노랑
+]
+
+
+def generate_chart_data(
+    columns: List[str],
+    rows: Sequence[Sequence[Any]],
+    column_types: Optional[List[str]] = None,
+) -> Optional[Dict[str, Any]]:
     """
     SQL 결과를 분석하여 적절한 차트 데이터 생성
-    
+
     Args:
         columns: 컬럼 이름 리스트
-        rows: 데이터 행 리스트
-        
+        rows: 데이터 행 리스트 (튜플)
+        column_types: 컬럼별 타입 ('integer', 'number', 'date', 'text' 등, 없으면 값으로 추정)
+
     Returns:
         chart_data: Chart.js 형식의 차트 데이터 또는 None
     """
-    if not columns or not rows or len(rows) == 0:
+    if not columns or not rows:
         return None
-    
+
+    values = list(zip(*rows))  # 컬럼별 값
+    if not column_types or len(column_types) != len(columns):
+        column_types = [_infer_type(col_values) for col_values in values]
+
     # 컬럼 분석
     date_columns = []
     text_columns = []
     number_columns = []
-    
-    for col in columns:
-        col_lower = col.lower()
-        # 날짜/시간 컬럼 감지
-        if any(keyword in col_lower for keyword in ['date', 'month', 'year', 'day', 'time', '일', '월', '년']):
-            date_columns.append(col)
-        # 숫자 컬럼 감지
-        elif rows[0].get(col) is not None:
-            val = rows[0][col]
-            if isinstance(val, (int, float)):
-                number_columns.append(col)
-            elif isinstance(val, str):
-                try:
-                    float(val)
-                    number_columns.append(col)
-                except:
-                    text_columns.append(col)
-            else:
-                text_columns.append(col)
+    for idx, (col, col_type) in enumerate(zip(columns, column_types)):
+        if col_type in DATE_TYPES:
+            date_columns.append(idx)
+        elif col_type in NUMBER_TYPES:
+            number_columns.append(idx)
+        elif _is_date_name(col):
+            date_columns.append(idx)
         else:
-            text_columns.append(col)
-    
-    logger.info(f"컬럼 분석 - 날짜: {date_columns}, 텍스트: {text_columns}, 숫자: {number_columns}")
-    
+            text_columns.append(idx)
+
+    # EXTRACT(MONTH FROM sale_date) AS month처럼 숫자지만 이름이 날짜인 컬럼은 레이블로 (값 컬럼은 하나 이상 남김)
+    for idx in [i for i in number_columns if _is_date_name(columns[i])]:
+        if len(number_columns) > 1:
+            number_columns.remove(idx)
+            date_columns.append(idx)
+
+    logger.info(
+        f"컬럼 분석 - 날짜: {[columns[i] for i in date_columns]}, "
+        f"텍스트: {[columns[i] for i in text_columns]}, 숫자: {[columns[i] for i in number_columns]}"
+    )
+
     # 차트 생성 가능 여부 확인
     if not number_columns:
         logger.info("숫자 컬럼이 없어 차트 생성 불가")
         return None
-    
-    # 레이블(X축) 결정
-    label_column = None
+
+    # 레이블(X축) 결정 (날짜 > 텍스트 > 첫 번째 컬럼)
     if date_columns:
-        label_column = date_columns[0]
+        label_idx = date_columns[0]
     elif text_columns:
-        label_column = text_columns[0]
+        label_idx = text_columns[0]
     else:
-        # 첫 번째 컬럼을 레이블로 사용
-        label_column = columns[0]
-    
+        label_idx = 0
+
     # 차트 타입 자동 선택
     chart_type = _determine_chart_type(date_columns, text_columns, number_columns, len(rows))
-    
-    # 레이블 추출
-    labels = [str(row.get(label_column, '')) for row in rows]
-    
-    # 데이터셋 생성
+
+    labels = _labels(values[label_idx])
+    series = [_numbers(values[idx]) for idx in number_columns[:6]]  # 최대 6개 데이터셋
+
+    chart_data: Dict[str, Any] = {'type': chart_type}
+    max_points = get_settings().CHART_MAX_POINTS
+    if chart_type == 'line' and 0 < max_points < len(rows):
+        keep = _downsample_indices(series, max_points)
+        labels = [labels[i] for i in keep]
+        series = [[data[i] for i in keep] for data in series]
+        chart_data['downsampled_from'] = len(rows)
+        logger.info(f"라인 차트 다운샘플링 - {len(rows)}개 → {len(keep)}개 점")
+
     datasets = []
-    colors = [
-        'rgb(102, 126, 234)',  # 보라
-        'rgb(255, 99, 132)',   # 빨강
-        'rgb(75, 192, 192)',   # 청록
-        'rgb(255, 159, 64)',   # 주황
-        'rgb(153, 102, 255)',  # 보라
-        'rgb(255, 205, 86)',   # 노랑
-    ]
-    
-    for idx, num_col in enumerate(number_columns[:6]):  # 최대 6개 데이터셋
-        data = []
-        for row in rows:
-            val = row.get(num_col)
-            if val is None:
-                data.append(0)
-            elif isinstance(val, (int, float)):
-                data.append(val)
-            else:
-                try:
-                    data.append(float(val))
-                except:
-                    data.append(0)
-        
-        color = colors[idx % len(colors)]
-        
-        dataset = {
-            'label': num_col,
+    for idx, (col_idx, data) in enumerate(zip(number_columns, series)):
+        color = COLORS[idx % len(COLORS)]
+        datasets.append({
+            'label': columns[col_idx],
             'data': data,
             'borderColor': color,
             'backgroundColor': color.replace('rgb', 'rgba').replace(')', ', 0.2)') if chart_type != 'pie' else [
-                c.replace('rgb', 'rgba').replace(')', ', 0.6)') for c in colors[:len(data)]
+                c.replace('rgb', 'rgba').replace(')', ', 0.6)') for c in COLORS[:len(data)]
             ],
             'tension': 0.3 if chart_type == 'line' else 0,
             'yAxisID': 'y' if idx == 0 else 'y1',  # 첫 번째는 y, 나머지는 y1
-        }
-        
-        datasets.append(dataset)
-    
-    chart_data = {
-        'type': chart_type,
-        'labels': labels,
-        'datasets': datasets
-    }
-    
+        })
+
+    chart_data['labels'] = labels
+    chart_data['datasets'] = datasets
+
     logger.info(f"차트 생성 완료 - 타입: {chart_type}, 데이터셋: {len(datasets)}개")
     return chart_data
 
 
-def _determine_chart_type(date_columns: List[str], text_columns: List[str], 
-                          number_columns: List[str], row_count: int) -> str:
+def _infer_type(col_values: Sequence[Any]) -> str:
+    """컬럼의 첫 번째 NULL이 아닌 값으로 타입 추정"""
+    value = next((v for v in col_values if v is not None), None)
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float, Decimal)):
+        return "number"
+    if isinstance(value, (date, datetime)):
+        return "date"
+    if isinstance(value, str):
+        try:
+            float(value)
+            return "number"
+        except ValueError:
+            return "text"
+    return "text"
+
+
+def _numbers(col_values: Sequence[Any]) -> List[float]:
+    """숫자 컬럼 값 변환 (NULL은 0, int/float는 그대로, Decimal/문자열은 float)"""
+    if all(type(v) in (int, float) for v in col_values):
+        return list(col_values)
+    return [_to_number(v) for v in col_values]
+
+
+def _to_number(value: Any) -> float:
+    if value is None:
+        return 0
+    if type(value) in (int, float):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _is_date_name(column: str) -> bool:
+    return any(keyword in column.lower() for keyword in DATE_NAME_KEYWORDS)
+
+
+def _labels(col_values: Sequence[Any]) -> List[str]:
+    """레이블 문자열 (DATE_TRUNC 결과처럼 시각이 모두 자정이면 날짜만)"""
+    if all(isinstance(v, datetime) and v.time() == datetime.min.time() for v in col_values):
+        return [v.date().isoformat() for v in col_values]
+    return ['' if v is None else (v.isoformat() if isinstance(v, date) else str(v)) for v in col_values]
+
+
+def lttb_indices(data: Sequence[float], threshold: int) -> List[int]:
+    """
+    LTTB로 고른 점의 인덱스 (첫/마지막 점 포함, 오름차순)
+
+    X 좌표는 행 순서(인덱스)를 사용합니다. 각 구간에서 이전에 고른 점과 다음 구간 평균점과
+    만드는 삼각형 넓이가 가장 큰 점을 고릅니다.
+    """
+    n = len(data)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # 다음 구간 평균점
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            avg_x, avg_y = n - 1, data[n - 1]
+        else:
+            avg_x = (next_start + next_end - 1) / 2
+            avg_y = sum(data[next_start:next_end]) / (next_end - next_start)
+
+        ax, ay = a, data[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (data[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
+
+
+def _downsample_indices(series: List[List[float]], max_points: int) -> List[int]:
+    """데이터셋별 LTTB 인덱스의 합집합 (데이터셋마다 max_points를 나눠 사용)"""
+    per_series = max(3, max_points // len(series))
+    keep = set()
+    for data in series:
+        keep.update(lttb_indices(data, per_series))
+    return sorted(keep)
+
+
+def _determine_chart_type(date_columns: List[int], text_columns: List[int],
+                          number_columns: List[int], row_count: int) -> str:
     """
     데이터 특성을 기반으로 적절한 차트 타입 선택
-    
+
     Returns:
         'line', 'bar', 'pie' 중 하나
     """
     # 시계열 데이터 → 라인 차트
     if date_columns:
         return 'line'
-    
+
     # 항목이 적고 숫자 컬럼이 1개 → 파이 차트
     if row_count <= 7 and len(number_columns) == 1:
         return 'pie'
-    
+
     # 기본 → 바 차트
     return 'bar'
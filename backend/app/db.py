@@ -1,12 +1,23 @@
 """데이터베이스 연결 및 쿼리 실행"""
 
 import os
+import json
+import asyncio
 import logging
 import socket
-from typing import List, Dict, Tuple, Any
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import List, Dict, Tuple, Any, Optional, NamedTuple, Iterator, AsyncIterator, Callable
 import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+import psycopg2.extensions
+from app import metrics
+from app.db_pool import ConnectionPool
+from app.fingerprint import Fingerprint, fingerprint_sql
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +25,43 @@ logger = logging.getLogger(__name__)
 socket.setdefaulttimeout(10)
 
 # 커넥션 풀
-_connection_pool = None
+_connection_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
 
+# 블로킹 쿼리를 실행할 워커 (커넥션 풀 크기만큼만 동시에 실행)
+_db_executor = None
 
-def get_connection_pool():
+# PREPARE에 실패한 템플릿 지문 (다시 시도하지 않고 원문 SQL로 실행)
+_unpreparable = set()
+_UNPREPARABLE_MAX = 1000
+
+
+class _Connection(psycopg2.extensions.connection):
+    """준비된 문장(PREPARE) 목록을 커넥션마다 보관하는 커넥션"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: "OrderedDict[str, str]" = OrderedDict()  # 지문 → 문장 이름 (LRU)
+
+
+def _configure_session(conn) -> None:
+    """
+    새 물리 커넥션마다 한 번 실행하는 세션 설정
+
+    읽기 전용/기본 타임아웃을 세션 기본값으로 한 번에 설정하고 autocommit으로 전환합니다.
+    쿼리마다 BEGIN/SET을 따로 보내지 않고 쿼리와 같은 왕복에 묶어 보내기 위함입니다.
+    """
+    settings = get_settings()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SET default_transaction_read_only = on; "
+            f"SET statement_timeout = {int(settings.QUERY_TIMEOUT_MAX_SECONDS * 1000)}; "
+            "SET application_name = 'text2query'"
+        )
+
+
+def get_connection_pool() -> Optional[ConnectionPool]:
     """데이터베이스 커넥션 풀 가져오기"""
     global _connection_pool
     
@@ -27,22 +71,33 @@ def get_connection_pool():
             logger.warning("DATABASE_URL이 설정되지 않음 - DB 연결 스킵")
             return None
         
-        try:
-            # Windows IPv6 DNS 문제 해결을 위해 connect_timeout 추가
-            if "?" in database_url:
-                database_url += "&connect_timeout=10"
-            else:
-                database_url += "?connect_timeout=10"
-            
-            _connection_pool = pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=10,
-                dsn=database_url
-            )
-            logger.info("데이터베이스 커넥션 풀 생성 완료")
-        except Exception as e:
-            logger.warning(f"⚠️ DB 연결 실패 (SQL 생성만 사용 가능)")
-            return None
+        with _pool_lock:
+            if _connection_pool is not None:
+                return _connection_pool
+            try:
+                # Windows IPv6 DNS 문제 해결을 위해 connect_timeout 추가
+                if "?" in database_url:
+                    database_url += "&connect_timeout=10"
+                else:
+                    database_url += "?connect_timeout=10"
+                
+                settings = get_settings()
+                pool_instance = ConnectionPool(
+                    dsn=database_url,
+                    max_size=settings.DB_MAX_CONNECTIONS,
+                    min_size=settings.DB_MIN_CONNECTIONS,
+                    acquire_timeout=settings.DB_ACQUIRE_TIMEOUT_SECONDS,
+                    max_idle=settings.DB_MAX_IDLE_SECONDS,
+                    max_lifetime=settings.DB_MAX_LIFETIME_SECONDS,
+                    configure=_configure_session,
+                    connection_factory=_Connection,
+                )
+                pool_instance.open()
+                _connection_pool = pool_instance
+                logger.info("데이터베이스 커넥션 풀 생성 완료")
+            except Exception as e:
+                logger.warning(f"⚠️ DB 연결 실패 (SQL 생성만 사용 가능)")
+                return None
     
     return _connection_pool
 
@@ -55,77 +110,311 @@ def test_db_connection() -> bool:
             logger.warning("⚠️ DB 연결 풀이 없음 - 연결 스킵")
             return False
         
-        conn = pool_instance.getconn()
-        
-        try:
+        with pool_instance.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT 1;")
                 result = cursor.fetchone()
                 logger.info(f"✅ DB 연결 성공: {result}")
                 return True
-        finally:
-            pool_instance.putconn(conn)
             
     except Exception as e:
         logger.warning(f"⚠️ DB 연결 실패")
         return False
 
 
-def run_query(sql: str, timeout: int = 10) -> Tuple[List[str], List[Dict[str, Any]]]:
+def pool_stats() -> Dict[str, Any]:
+    """커넥션 풀 상태 (풀이 없으면 빈 dict)"""
+    return _connection_pool.stats() if _connection_pool is not None else {}
+
+
+def dimension_names() -> Tuple[List[str], List[str], List[str]]:
+    """(지점명 목록, 상품명 목록, 지역 목록) - 풀이 없거나 조회 실패 시 빈 목록"""
+    pool_instance = get_connection_pool()
+    if pool_instance is None:
+        return [], [], []
+    try:
+        with pool_instance.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT branch_name FROM dim_branch ORDER BY branch_id")
+                branches = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT product_name FROM dim_product ORDER BY product_id")
+                products = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT DISTINCT region FROM dim_branch WHERE region IS NOT NULL ORDER BY region")
+                regions = [row[0] for row in cursor.fetchall()]
+                return branches, products, regions
+    except Exception as e:
+        logger.warning(f"지점/상품 이름 조회 실패: {str(e)[:100]}")
+        return [], [], []
+
+
+def existing_tables(names: List[str]) -> List[str]:
+    """names 중 DB에 실제로 있는 테이블 (풀이 없거나 조회 실패 시 빈 리스트)"""
+    pool_instance = get_connection_pool()
+    if pool_instance is None:
+        return []
+    try:
+        with pool_instance.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL",
+                    (list(names),),
+                )
+                return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.warning(f"테이블 확인 실패: {str(e)[:100]}")
+        return []
+
+
+class QueryResult(NamedTuple):
+    """쿼리 실행 결과"""
+    columns: List[str]
+    rows: List[Any]  # row_format="dict"이면 dict, "tuple"이면 튜플
+    truncated: bool = False  # 행 수/바이트 제한으로 일부만 가져온 경우 True
+    column_types: Optional[List[str]] = None  # 컬럼별 타입 ('integer', 'number', 'date', 'text' 등)
+
+
+# PostgreSQL 타입 OID → 응답 타입 이름 (cursor.description의 type_code 기준)
+PG_TYPE_NAMES = {
+    16: "boolean",
+    20: "integer", 21: "integer", 23: "integer", 26: "integer",
+    700: "number", 701: "number", 1700: "number", 790: "number",
+    1082: "date",
+    1114: "datetime", 1184: "datetime",
+    1083: "time", 1266: "time",
+    1186: "interval",
+    25: "text", 1042: "text", 1043: "text", 19: "text",
+}
+
+
+def _cast_numeric(value: Optional[str], cursor) -> Optional[Any]:
     """
-    SQL 쿼리 실행 및 결과 반환
-    
-    Args:
-        sql: 실행할 SQL 쿼리
-        timeout: 쿼리 타임아웃 (초)
-        
+    NUMERIC을 Decimal 대신 int/float로 바로 변환하는 typecaster
+
+    NUMERIC(15,2) 금액처럼 정수 값이면 int, 아니면 float로 반환합니다.
+    Decimal은 JSON 인코딩 시 느리고 차트에서 숫자로 인식되지 않습니다.
+    """
+    if value is None:
+        return None
+    number = float(value)
+    if number.is_integer() and abs(number) < 2 ** 53:
+        return int(number)
+    return number
+
+
+NUMERIC_AS_NUMBER = psycopg2.extensions.new_type((1700,), "NUMERIC_AS_NUMBER", _cast_numeric)
+
+
+def column_types(description) -> List[str]:
+    """cursor.description의 타입 OID를 타입 이름 리스트로 변환"""
+    if not description:
+        return []
+    return [PG_TYPE_NAMES.get(desc.type_code, "text") for desc in description]
+
+
+def _shape_rows(columns: List[str], rows: List[tuple], row_format: str) -> List[Any]:
+    if row_format == "tuple":
+        return rows
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _value_size(value: Any) -> int:
+    """값의 대략적인 전송 크기 (바이트) - 바이트 예산 계산용"""
+    if value is None:
+        return 4
+    if isinstance(value, (str, bytes, memoryview)):
+        return len(value)
+    return 16
+
+
+def iter_bounded(cursor, max_rows: int, max_bytes: int, fetch_size: int) -> Iterator[Tuple[List[tuple], bool]]:
+    """
+    커서에서 최대 max_rows행, max_bytes바이트까지 fetch_size씩 나누어 가져오기
+
+    서버 측 커서에서 나누어 가져오므로 결과가 아무리 커도
+    메모리와 전송량은 제한 크기 + 1배치 수준으로 유지됩니다.
+
+    Yields:
+        (행 튜플 배치, 잘림 여부) - 잘림 여부는 제한에 걸린 마지막 배치에서만 True
+    """
+    count = 0
+    total_bytes = 0
+
+    while True:
+        # 잘림 여부를 알기 위해 max_rows + 1행까지 요청
+        batch = cursor.fetchmany(min(fetch_size, max_rows + 1 - count))
+        if not batch:
+            return
+
+        accepted = []
+        for row in batch:
+            if count >= max_rows:
+                yield accepted, True
+                return
+            total_bytes += sum(_value_size(v) for v in row)
+            if total_bytes > max_bytes:
+                logger.warning(f"결과가 {max_bytes}바이트를 초과하여 {count}행만 반환")
+                yield accepted, True
+                return
+            accepted.append(row)
+            count += 1
+        yield accepted, False
+
+
+def fetch_bounded(cursor, max_rows: int, max_bytes: int, fetch_size: int) -> Tuple[List[tuple], bool]:
+    """
+    iter_bounded 결과를 모두 모아 반환
+
     Returns:
-        (컬럼명 리스트, 행 데이터 리스트) 튜플
-        - columns: ['col1', 'col2', ...]
-        - rows: [{'col1': val1, 'col2': val2}, ...]
-        
-    Raises:
-        Exception: 쿼리 실행 중 오류 발생 시
+        (행 튜플 리스트, 잘림 여부)
+    """
+    rows: List[tuple] = []
+    truncated = False
+    for batch, batch_truncated in iter_bounded(cursor, max_rows, max_bytes, fetch_size):
+        rows.extend(batch)
+        truncated = truncated or batch_truncated
+    return rows, truncated
+
+
+def _begin(timeout: float) -> str:
+    """읽기 전용 트랜잭션 시작 + 이 트랜잭션에만 적용되는 statement_timeout (뒤에 쿼리를 이어 붙여 한 번에 전송)"""
+    return f"BEGIN READ ONLY; SET LOCAL statement_timeout = {max(1, int(timeout * 1000))}; "
+
+
+@contextmanager
+def _transaction():
+    """
+    풀에서 커넥션을 빌려 커서를 반환하고, 종료 시 ROLLBACK 후 반납
+
+    커넥션은 autocommit이므로 트랜잭션은 _begin()으로 직접 시작합니다.
+    ROLLBACK이 실패한 커넥션은 닫아서 풀이 폐기하도록 합니다.
     """
     pool_instance = get_connection_pool()
     
     if pool_instance is None:
         raise Exception("데이터베이스 연결 풀이 초기화되지 않았습니다")
     
-    conn = pool_instance.getconn()
-    
+    with pool_instance.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            try:
+                cursor.execute("ROLLBACK")  # 읽기 전용이므로 롤백 (서버 측 커서도 함께 닫힘)
+                cursor.close()
+            except psycopg2.Error:
+                conn.close()
+
+
+class _DeclaredCursor:
+    """
+    DECLARE한 서버 측 커서를 FETCH로 나누어 읽는 커서 (iter_bounded용 fetchmany/description)
+
+    첫 배치는 DECLARE와 같은 왕복에서 받아두고, 요청보다 적게 온 배치 뒤에는
+    빈 FETCH를 보내지 않습니다.
+    """
+
+    def __init__(self, cursor, name: str, first_batch: List[tuple], first_size: int):
+        self._cursor = cursor
+        self._name = name
+        self._pending: Optional[List[tuple]] = first_batch
+        self._exhausted = len(first_batch) < first_size
+        self.description = cursor.description
+
+    def fetchmany(self, size: int) -> List[tuple]:
+        if self._pending is not None:
+            batch, self._pending = self._pending, None
+            return batch
+        if self._exhausted or size <= 0:
+            return []
+        self._cursor.execute(f"FETCH FORWARD {size} FROM {self._name}")
+        batch = self._cursor.fetchall()
+        self._exhausted = len(batch) < size
+        return batch
+
+
+def _execute_prepared(cursor, fp: Fingerprint, timeout: float, prefix: str = "") -> bool:
+    """
+    지문의 템플릿을 이 커넥션에 PREPARE해 두고 EXECUTE (prefix는 EXECUTE 앞에 붙일 문장, 예: EXPLAIN)
+
+    처음 보는 템플릿은 PREPARE(+ LRU에서 밀려난 문장의 DEALLOCATE)를 트랜잭션 밖에서 먼저 한 번 보냅니다.
+    PREPARE가 실패한 경우(파라미터 타입 추론 실패 등)만 준비할 수 없는 템플릿으로 기억하고,
+    EXECUTE 중 오류(0으로 나누기, 잘못된 형변환 등)는 원문 SQL로 다시 실행하지 않고 그대로 전달합니다.
+    두 번째부터는 파싱/계획 없이 파라미터만 전달합니다.
+
+    Returns:
+        실행했으면 True, 준비할 수 없는 템플릿이면 False (트랜잭션은 시작되지 않은 상태)
+    """
+    conn = cursor.connection
+    prepared = getattr(conn, "prepared", None)
+    capacity = get_settings().DB_PREPARED_STATEMENTS
+    if prepared is None or capacity <= 0 or fp.fingerprint in _unpreparable:
+        return False
+
+    name = prepared.get(fp.fingerprint)
+    if name is None:
+        metrics.increment("db.prepared.miss")
+        name = f"fp_{fp.fingerprint}"
+        setup = ""
+        while len(prepared) >= capacity:
+            _, old_name = prepared.popitem(last=False)
+            setup += f"DEALLOCATE {old_name}; "
+        types = f" ({', '.join(fp.param_types)})" if fp.params else ""
+        try:
+            # 파라미터 없이 보내므로 템플릿의 %는 그대로
+            cursor.execute(setup + f"PREPARE {name}{types} AS {fp.template}")
+        except (psycopg2.ProgrammingError, psycopg2.DataError) as e:
+            # 이 템플릿은 원문 SQL로 실행
+            logger.info(f"준비된 문장 사용 불가 ({fp.fingerprint}): {str(e)[:100]}")
+            if len(_unpreparable) >= _UNPREPARABLE_MAX:
+                _unpreparable.clear()
+            _unpreparable.add(fp.fingerprint)
+            return False
+        prepared[fp.fingerprint] = name
+    else:
+        metrics.increment("db.prepared.hit")
+        prepared.move_to_end(fp.fingerprint)
+
+    args = f"({', '.join(['%s'] * len(fp.params))})" if fp.params else ""
+    cursor.execute(_begin(timeout) + f"{prefix}EXECUTE {name}{args}", fp.params)
+    return True
+
+
+@contextmanager
+def _query_cursor(sql: str, timeout: float, fetch_size: int, max_rows: int):
+    """
+    읽기 전용 트랜잭션에서 SQL을 실행하고 결과를 읽을 커서를 반환
+
+    - 최상위 LIMIT이 max_rows + 1 이하인 쿼리는 결과 크기가 이미 제한되므로
+      커넥션별로 준비된 문장(PREPARE/EXECUTE)으로 실행하여 파싱/계획을 생략
+    - 그 외에는 서버 측 커서로 실행하며, BEGIN, SET LOCAL statement_timeout, DECLARE,
+      첫 FETCH를 한 번의 왕복으로 보냄
+
+    어느 쪽이든 작은 결과는 실행 왕복과 종료 시 ROLLBACK 두 번이면 끝납니다 (처음 보는 템플릿은 PREPARE 왕복 하나 추가).
+    타임아웃은 TimeoutError로 변환됩니다.
+    """
+    name = f"chat_{uuid.uuid4().hex[:12]}"
+    first_size = min(fetch_size, max_rows + 1)
     try:
-        # 타임아웃 설정
-        conn.set_session(readonly=True)
-        
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            # Statement timeout 설정
-            cursor.execute(f"SET statement_timeout TO {timeout * 1000};")
-            
-            # 쿼리 실행
-            logger.info(f"SQL 실행: {sql[:200]}...")
-            cursor.execute(sql)
-            
-            # 결과 가져오기
-            rows = cursor.fetchall()
-            
-            # 최대 1000행 제한
-            if len(rows) > 1000:
-                logger.warning(f"결과 {len(rows)}행 중 1000행만 반환")
-                rows = rows[:1000]
-            
-            # 컬럼명 추출
-            columns = [desc.name for desc in cursor.description] if cursor.description else []
-            
-            # RealDict를 일반 dict로 변환
-            rows_dict = [dict(row) for row in rows]
-            
-            logger.info(f"쿼리 완료: {len(rows_dict)}개 행, {len(columns)}개 컬럼")
-            return columns, rows_dict
+        with _transaction() as cursor:
+            # NUMERIC → int/float (Decimal 생성 비용 제거)
+            psycopg2.extensions.register_type(NUMERIC_AS_NUMBER, cursor)
+
+            fp = fingerprint_sql(sql)
+            logger.info(f"SQL 실행 [{fp.fingerprint}]: {sql[:200]}...")
+            if fp.limit is not None and fp.limit <= max_rows + 1 and _execute_prepared(cursor, fp, timeout):
+                yield cursor
+                return
+
+            cursor.execute(
+                _begin(timeout)
+                + f"DECLARE {name} NO SCROLL CURSOR FOR {sql.rstrip().rstrip(';')}; "
+                + f"FETCH FORWARD {first_size} FROM {name}"
+            )
+            yield _DeclaredCursor(cursor, name, cursor.fetchall(), first_size)
             
     except psycopg2.errors.QueryCanceled:
-        logger.error(f"쿼리 타임아웃 ({timeout}초 초과)")
-        raise TimeoutError(f"쿼리 실행 시간이 {timeout}초를 초과했습니다")
+        logger.error(f"쿼리 타임아웃 ({timeout:g}초 초과)")
+        raise TimeoutError(f"쿼리 실행 시간이 {timeout:g}초를 초과했습니다")
         
     except psycopg2.Error as e:
         logger.error(f"SQL 실행 오류: {str(e)[:200]}")
@@ -134,16 +423,247 @@ def run_query(sql: str, timeout: int = 10) -> Tuple[List[str], List[Dict[str, An
     except Exception as e:
         logger.error(f"예상치 못한 오류: {str(e)[:200]}")
         raise
+
+
+def explain_query(sql: str, timeout: float = 2) -> Dict[str, Any]:
+    """
+    EXPLAIN (FORMAT JSON)으로 실행 계획만 조회 (쿼리는 실행하지 않음)
+
+    Returns:
+        최상위 Plan 노드 ("Total Cost", "Plan Rows", "Plans" 등)
+    """
+    with _transaction() as cursor:
+        # 실행과 같은 준비된 문장으로 계획 (같은 템플릿이면 이후 실행에서 재사용)
+        if not _execute_prepared(cursor, fingerprint_sql(sql), timeout, prefix="EXPLAIN (FORMAT JSON) "):
+            cursor.execute(_begin(timeout) + "EXPLAIN (FORMAT JSON) " + sql.rstrip().rstrip(";"))
+        return _plan_root(cursor.fetchone()[0])
+
+
+def _plan_root(plan: Any) -> Dict[str, Any]:
+    """EXPLAIN (FORMAT JSON) 결과에서 최상위 Plan 노드"""
+    # json 타입은 psycopg2가 파싱하지만 드라이버 설정에 따라 문자열일 수 있음
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def explain_hypothetical(sql: str, candidates: List[List[str]], timeout: float = 5) -> Optional[Dict[str, Any]]:
+    """
+    hypopg 가상 인덱스를 만든 상태의 실행 계획 비교 (인덱스를 실제로 만들거나 쿼리를 실행하지 않음)
+
+    가상 인덱스는 트랜잭션이 아니라 세션에 남으므로 끝나면 hypopg_reset()으로 지운 뒤 커넥션을 반납합니다.
+
+    Args:
+        sql: 계획을 볼 SQL
+        candidates: 후보마다 함께 만들 CREATE INDEX 문 목록 (파티션마다 하나씩 등)
+
+    Returns:
+        {"baseline": 가상 인덱스 없는 Plan 노드, "candidates": [{"index_names", "plan"} 또는 {"error"}]},
+        hypopg 확장이 설치되어 있지 않으면 None
+    """
+    explain = "EXPLAIN (FORMAT JSON) " + sql.rstrip().rstrip(";")
+    with _transaction() as cursor:
+        cursor.execute(_begin(timeout) + "SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+        if cursor.fetchone() is None:
+            return None
+        try:
+            cursor.execute(explain)
+            result = {"baseline": _plan_root(cursor.fetchone()[0]), "candidates": []}
+            for statements in candidates:
+                try:
+                    cursor.execute("SAVEPOINT hypothetical; SELECT hypopg_reset()")
+                    index_names = []
+                    for statement in statements:
+                        cursor.execute("SELECT indexname FROM hypopg_create_index(%s)", (statement,))
+                        index_names.append(cursor.fetchone()[0])
+                    cursor.execute(explain)
+                    result["candidates"].append({"index_names": index_names, "plan": _plan_root(cursor.fetchone()[0])})
+                    cursor.execute("RELEASE SAVEPOINT hypothetical")
+                except psycopg2.Error as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT hypothetical")
+                    result["candidates"].append({"error": str(e).strip()[:200]})
+            return result
+        finally:
+            cursor.execute("ROLLBACK; SELECT hypopg_reset()")
+
+
+def run_query(
+    sql: str,
+    timeout: float = 10,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    row_format: str = "dict",
+) -> QueryResult:
+    """
+    SQL 쿼리 실행 및 결과 반환
+
+    서버 측 커서(DECLARE ... CURSOR)로 실행하여 필요한 만큼만 가져옵니다.
+    전체 결과를 받아서 자르는 대신 max_rows + 1행까지만 읽어 잘림 여부를 판단합니다.
+    
+    Args:
+        sql: 실행할 SQL 쿼리
+        timeout: 쿼리 타임아웃 (초)
+        max_rows: 최대 반환 행 수 (기본값 QUERY_MAX_ROWS)
+        max_bytes: 최대 반환 바이트 (기본값 QUERY_MAX_BYTES, TEXT 같은 넓은 컬럼 대비)
+        row_format: "dict"(기본) 또는 "tuple" (컬럼명 반복 없이 값만)
+        
+    Returns:
+        QueryResult(columns, rows, truncated, column_types)
+        - columns: ['col1', 'col2', ...]
+        - rows: [{'col1': val1, 'col2': val2}, ...] 또는 [(val1, val2), ...]
+        - truncated: 제한에 걸려 일부만 반환했는지 여부
+        - column_types: ['text', 'number', ...]
+        
+    Raises:
+        Exception: 쿼리 실행 중 오류 발생 시
+    """
+    settings = get_settings()
+    max_rows = settings.QUERY_MAX_ROWS if max_rows is None else max_rows
+    max_bytes = settings.QUERY_MAX_BYTES if max_bytes is None else max_bytes
+
+    with _query_cursor(sql, timeout, settings.QUERY_FETCH_SIZE, max_rows) as cursor:
+        # 결과 가져오기 (최대 max_rows행 / max_bytes바이트)
+        rows, truncated = fetch_bounded(cursor, max_rows, max_bytes, settings.QUERY_FETCH_SIZE)
+        if truncated:
+            logger.warning(f"결과가 제한을 초과하여 {len(rows)}행만 반환")
+        
+        # 컬럼명 추출
+        columns = [desc.name for desc in cursor.description] if cursor.description else []
         
+        logger.info(f"쿼리 완료: {len(rows)}개 행, {len(columns)}개 컬럼")
+        return QueryResult(columns, _shape_rows(columns, rows, row_format), truncated, column_types(cursor.description))
+
+
+def stream_query(
+    sql: str,
+    emit: Callable[[QueryResult], None],
+    cancelled: threading.Event,
+    timeout: float = 10,
+    row_format: str = "dict",
+    max_rows: Optional[int] = None,
+) -> None:
+    """
+    SQL을 실행하면서 배치가 도착할 때마다 emit으로 전달 (run_query와 같은 제한 적용)
+
+    Args:
+        sql: 실행할 SQL 쿼리
+        emit: 배치마다 QueryResult(columns, 배치 행, 잘림 여부)를 받는 콜백
+        cancelled: 설정되면 다음 배치부터 중단 (클라이언트 연결 종료 등)
+        timeout: 쿼리 타임아웃 (초)
+        row_format: "dict"(기본) 또는 "tuple"
+        max_rows: 최대 행 수 (기본값 QUERY_MAX_ROWS)
+    """
+    settings = get_settings()
+    max_rows = settings.QUERY_MAX_ROWS if max_rows is None else max_rows
+    emitted = False
+
+    with _query_cursor(sql, timeout, settings.QUERY_FETCH_SIZE, max_rows) as cursor:
+        for batch, truncated in iter_bounded(
+            cursor, max_rows, settings.QUERY_MAX_BYTES, settings.QUERY_FETCH_SIZE
+        ):
+            if cancelled.is_set():
+                logger.info("스트리밍 중단 (클라이언트 연결 종료)")
+                return
+            columns = [desc.name for desc in cursor.description] if cursor.description else []
+            emit(QueryResult(columns, _shape_rows(columns, batch, row_format), truncated, column_types(cursor.description)))
+            emitted = True
+
+        if not emitted:
+            # 결과가 없어도 컬럼 정보는 전달
+            columns = [desc.name for desc in cursor.description] if cursor.description else []
+            emit(QueryResult(columns, [], False, column_types(cursor.description)))
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """쿼리 실행용 스레드 풀 가져오기 (풀 크기 = 최대 커넥션 수)"""
+    global _db_executor
+
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=get_settings().DB_MAX_CONNECTIONS,
+            thread_name_prefix="db-query",
+        )
+
+    return _db_executor
+
+
+async def run_query_async(
+    sql: str, timeout: float = 10, row_format: str = "dict", max_rows: Optional[int] = None
+) -> QueryResult:
+    """
+    run_query의 비동기 버전
+
+    psycopg2 호출은 블로킹이므로 커넥션 수만큼 제한된 워커에서 실행하여
+    이벤트 루프가 DB 왕복 동안 다른 요청을 처리할 수 있도록 합니다.
+    워커 수가 커넥션 풀 크기와 같으므로 풀 고갈(PoolError) 없이 초과 요청은 대기합니다.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), partial(run_query, sql, timeout, max_rows=max_rows, row_format=row_format)
+    )
+
+
+async def explain_query_async(sql: str, timeout: float = 2) -> Dict[str, Any]:
+    """explain_query의 비동기 버전 (쿼리 실행과 같은 DB 워커 사용)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(explain_query, sql, timeout))
+
+
+async def explain_hypothetical_async(sql: str, candidates: List[List[str]], timeout: float = 5) -> Optional[Dict[str, Any]]:
+    """explain_hypothetical의 비동기 버전 (쿼리 실행과 같은 DB 워커 사용)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), partial(explain_hypothetical, sql, candidates, timeout))
+
+
+async def stream_query_async(
+    sql: str, timeout: float = 10, row_format: str = "dict", max_rows: Optional[int] = None
+) -> AsyncIterator[QueryResult]:
+    """
+    stream_query의 비동기 버전 - DB 워커에서 가져온 배치를 순서대로 yield
+
+    워커와는 크기가 제한된 큐로 연결되어 소비가 느리면 워커도 대기합니다(backpressure).
+    소비자가 중간에 종료하면 워커에 취소를 알리고 큐를 비워 커넥션이 바로 반납되도록 합니다.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+    cancelled = threading.Event()
+    done = object()
+
+    def emit(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def worker() -> None:
+        try:
+            stream_query(sql, emit, cancelled, timeout, row_format, max_rows)
+        except BaseException as e:
+            if not cancelled.is_set():
+                emit(e)
+        finally:
+            if not cancelled.is_set():
+                emit(done)
+
+    future = loop.run_in_executor(get_db_executor(), worker)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
     finally:
-        conn.rollback()  # 읽기 전용이므로 롤백
-        pool_instance.putconn(conn)
+        cancelled.set()
+        while not queue.empty():
+            queue.get_nowait()
+        if future.done():
+            future.result()
 
 
-def close_pool():
-    """커넥션 풀 종료"""
+def close_pool(timeout: float = 10.0):
+    """커넥션 풀 종료 (사용 중인 커넥션은 반납될 때까지 timeout초 대기)"""
     global _connection_pool
-    if _connection_pool:
-        _connection_pool.closeall()
-        _connection_pool = None
+    with _pool_lock:
+        pool_instance, _connection_pool = _connection_pool, None
+    if pool_instance is not None:
+        pool_instance.close(timeout)
         logger.info("커넥션 풀 종료됨")
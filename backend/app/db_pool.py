@@ -0,0 +1,302 @@
+"""스레드 안전 PostgreSQL 커넥션 풀
+
+psycopg2.pool 대비 추가된 동작:
+
+- 물리 커넥션을 만들 때 한 번만 세션 설정(읽기 전용, 기본 타임아웃 등)을 적용
+- 커넥션이 없으면 acquire_timeout까지만 대기 후 PoolTimeout
+- 끊긴 커넥션, 오래 유휴 상태였던 커넥션, 수명이 다한 커넥션은 버리고 새로 연결
+  (Supabase 재시작 후 죽은 소켓을 잡고 실패하는 문제 방지)
+- 사용 중/유휴/대기 수와 대기 시간을 메트릭으로 노출
+- close()는 새 대여를 막고 반납되는 커넥션부터 닫으며 drain
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """acquire_timeout 안에 커넥션을 얻지 못함"""
+
+
+class PoolClosed(Exception):
+    """종료된 풀에서 커넥션 요청"""
+
+
+class _Slot:
+    __slots__ = ("conn", "created_at", "released_at")
+
+    def __init__(self, conn, now: float):
+        self.conn = conn
+        self.created_at = now
+        self.released_at = now
+
+
+class ConnectionPool:
+    """
+    Args:
+        dsn: libpq 연결 문자열
+        max_size: 최대 물리 커넥션 수
+        min_size: 유지할 최소 커넥션 수 (유휴 정리 시에도 이만큼은 남김)
+        acquire_timeout: 커넥션 대기 최대 시간 (초)
+        max_idle: 이 시간 이상 유휴였던 커넥션은 닫고 새로 연결 (초, 0이면 비활성)
+        max_lifetime: 이 시간 이상 사용한 커넥션은 반납 시 닫음 (초, 0이면 비활성)
+        ping_after: 이 시간 이상 유휴였던 커넥션은 빌려주기 전에 SELECT 1로 확인 (초)
+        configure: 새 물리 커넥션마다 한 번 호출되는 세션 설정 함수
+        connection_factory: psycopg2.connect에 넘길 커넥션 클래스 (커넥션별 상태 보관용)
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        max_size: int = 10,
+        min_size: int = 1,
+        acquire_timeout: float = 5.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 3600.0,
+        ping_after: float = 30.0,
+        configure: Optional[Callable[[Any], None]] = None,
+        connection_factory: Optional[type] = None,
+    ):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.configure = configure
+        self.connection_factory = connection_factory
+
+        self._cond = threading.Condition()
+        self._idle: "deque[_Slot]" = deque()  # 오른쪽이 가장 최근 반납 (LIFO로 따뜻한 커넥션 우선)
+        self._in_use: Dict[int, _Slot] = {}
+        self._size = 0  # 연결 중인 커넥션 포함 물리 커넥션 수
+        self._waiting = 0
+        self._closed = False
+        self._stats = {"created": 0, "recycled": 0, "broken": 0, "timeouts": 0}
+
+    def open(self) -> None:
+        """min_size만큼 미리 연결 (실패 시 예외)"""
+        for _ in range(self.min_size):
+            slot = self._reserve_and_connect()
+            self._put_idle(slot)
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        커넥션 대여
+
+        Raises:
+            PoolTimeout: timeout(기본 acquire_timeout) 안에 커넥션을 얻지 못한 경우
+            PoolClosed: 풀이 종료된 경우
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            slot = None
+            reserve = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolClosed("커넥션 풀이 종료되었습니다")
+                    if self._idle:
+                        slot = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        reserve = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        metrics.increment("db.pool.timeouts")
+                        raise PoolTimeout(f"{timeout:g}초 안에 DB 커넥션을 얻지 못했습니다 (최대 {self.max_size}개 사용 중)")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if reserve:
+                slot = self._connect_reserved()
+            elif not self._usable(slot):
+                self._discard(slot, "recycled")
+                continue
+
+            with self._cond:
+                self._in_use[id(slot.conn)] = slot
+            metrics.observe("db.pool.wait", time.monotonic() - start)
+            return slot.conn
+
+    def release(self, conn, broken: bool = False) -> None:
+        """
+        커넥션 반납
+
+        Args:
+            broken: 사용 중 연결 오류가 난 경우 True (닫고 새로 연결하도록)
+        """
+        with self._cond:
+            slot = self._in_use.pop(id(conn), None)
+        if slot is None:
+            return
+
+        if broken or conn.closed:
+            self._discard(slot, "broken")
+            return
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            # 트랜잭션이 남은 커넥션은 정리 실패 가능성이 있으므로 재사용하지 않음
+            self._discard(slot, "broken")
+            return
+        if self.max_lifetime and time.monotonic() - slot.created_at > self.max_lifetime:
+            self._discard(slot, "recycled")
+            return
+
+        slot.released_at = time.monotonic()
+        self._put_idle(slot)
+        self._trim_idle()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """커넥션을 빌려 with 블록이 끝나면 반납 (연결 오류 시 폐기)"""
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        풀 종료 - 새 대여를 막고 유휴 커넥션을 닫은 뒤, 사용 중인 커넥션이
+        반납될 때까지 timeout만큼 기다렸다가 남은 커넥션을 닫음
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for slot in idle:
+            self._discard(slot, None)
+
+        with self._cond:
+            while self._in_use:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            leftover = list(self._in_use.values())
+            self._in_use.clear()
+
+        if leftover:
+            logger.warning(f"종료 시간 초과 - 사용 중인 커넥션 {len(leftover)}개를 강제로 닫음")
+        for slot in leftover:
+            self._discard(slot, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 상태 (사용 중/유휴/대기 수 및 누적 통계)"""
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "closed": self._closed,
+            }
+
+    def _usable(self, slot: _Slot) -> bool:
+        conn = slot.conn
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - slot.released_at
+        if self.max_idle and idle_for > self.max_idle:
+            return False
+        if idle_for > self.ping_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except psycopg2.Error:
+                logger.info("유휴 커넥션 확인 실패 - 새로 연결")
+                return False
+        return True
+
+    def _trim_idle(self) -> None:
+        """min_size를 넘는 유휴 커넥션 중 max_idle 이상 쓰이지 않은 것을 닫음 (가장 오래된 것부터)"""
+        if not self.max_idle:
+            return
+        expired = []
+        now = time.monotonic()
+        with self._cond:
+            while (
+                self._idle
+                and self._size - len(expired) > self.min_size
+                and now - self._idle[0].released_at > self.max_idle
+            ):
+                expired.append(self._idle.popleft())
+        for slot in expired:
+            self._discard(slot, "recycled")
+
+    def _reserve_and_connect(self) -> _Slot:
+        with self._cond:
+            self._size += 1
+        return self._connect_reserved()
+
+    def _connect_reserved(self) -> _Slot:
+        """_size에 자리를 예약한 상태에서 연결 (실패 시 예약 해제)"""
+        try:
+            if self.connection_factory is not None:
+                conn = psycopg2.connect(self.dsn, connection_factory=self.connection_factory)
+            else:
+                conn = psycopg2.connect(self.dsn)
+            if self.configure is not None:
+                self.configure(conn)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        metrics.increment("db.pool.created")
+        return _Slot(conn, time.monotonic())
+
+    def _put_idle(self, slot: _Slot) -> None:
+        with self._cond:
+            if self._closed:
+                close = True
+            else:
+                close = False
+                self._idle.append(slot)
+                self._cond.notify()
+        if close:
+            self._discard(slot, None)
+
+    def _discard(self, slot: _Slot, reason: Optional[str]) -> None:
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            if reason is not None:
+                self._stats[reason] += 1
+            self._cond.notify()
+        if reason is not None:
+            metrics.increment(f"db.pool.{reason}")
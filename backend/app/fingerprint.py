@@ -0,0 +1,163 @@
+"""SQL 지문 - 리터럴을 파라미터로 뽑아낸 쿼리 템플릿
+
+같은 종류의 질문에서 생성된 SQL은 지점명/날짜/LIMIT 같은 리터럴만 다릅니다.
+
+    SELECT ... WHERE b.branch_name LIKE '%서울본점%' LIMIT 5
+    → SELECT ... WHERE b.branch_name LIKE $1 LIMIT $2   ('%서울본점%', 5)
+
+템플릿이 같으면 같은 지문을 가지므로 DB 계층은 커넥션별로 PREPARE해 둔 문장을
+재사용하여 파싱/계획을 생략하고, 로그/타임아웃 기록은 지문 단위로 묶입니다.
+
+다음 리터럴은 파라미터로 바꾸면 의미나 문법이 달라지므로 그대로 둡니다.
+- 상수 인자가 필요한 함수/타입 수식자: DATE_TRUNC('month', ...), TO_CHAR(..., 'YYYY-MM'), NUMERIC(15, 2)
+- ORDER BY / GROUP BY의 위치 번호: ORDER BY 2 DESC
+- E'...' 문자열, $$...$$ 문자열
+
+타입 리터럴(DATE '2024-01-01', INTERVAL '1 month')은 같은 의미의 $1::date 형태로 바꿉니다.
+"""
+
+import hashlib
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from app.sql_lexer import tokenize, WORD, STRING, NUMBER, SPACE, COMMENT, SEMICOLON, OPEN, CLOSE
+
+# 뒤따르는 문자열이 타입 리터럴이 되는 단어
+_TYPED_LITERAL_WORDS = {"date", "time", "timetz", "timestamp", "timestamptz", "interval"}
+
+# 괄호 안 리터럴을 상수로 유지해야 하는 함수/타입
+_CONSTANT_ARG_WORDS = {
+    "date_trunc", "date_part", "extract", "to_char", "to_date", "to_timestamp", "to_number", "format",
+    "numeric", "decimal", "varchar", "char", "character", "bit", "float", "time", "timestamp", "interval",
+}
+
+# ORDER BY / GROUP BY 목록을 끝내는 절
+_CLAUSE_WORDS = {"having", "limit", "offset", "window", "union", "except", "intersect", "fetch", "for", "order", "group"}
+
+# 위치 참조 숫자 뒤에 올 수 있는 토큰
+_POSITION_FOLLOWERS = {",", ")", "asc", "desc", "nulls"} | _CLAUSE_WORDS
+
+# INTERVAL '1' MONTH 처럼 뒤에 단위가 붙는 경우는 타입 리터럴 그대로 유지
+_INTERVAL_FIELDS = {"year", "month", "day", "hour", "minute", "second"}
+
+# bigint를 넘는 정수는 numeric으로 선언
+_INT4_MAX = 2 ** 31 - 1
+_INT8_MAX = 2 ** 63 - 1
+
+
+class Fingerprint(NamedTuple):
+    fingerprint: str                 # 템플릿 + 파라미터 타입 해시 (16자리, 로그/캐시 키)
+    template: str                    # 리터럴을 $1..$n으로 바꾼 정규화 SQL (세미콜론 없음)
+    params: Tuple[Any, ...]          # 파라미터 값
+    param_types: Tuple[str, ...]     # PREPARE 선언 타입 ('integer', 'bigint', 'numeric', 'unknown')
+    limit: Optional[int] = None      # 최상위 LIMIT 값 (없거나 리터럴이 아니면 None)
+
+
+def _number_param(text: str) -> Tuple[Any, str]:
+    if text.isdigit():
+        value = int(text)
+        if value <= _INT4_MAX:
+            return value, "integer"
+        if value <= _INT8_MAX:
+            return value, "bigint"
+    return Decimal(text), "numeric"
+
+
+def _is_position(parts: List[Tuple[str, str]], following: Optional[str], in_by_list: bool) -> bool:
+    """ORDER BY 2 / GROUP BY 1, 2 처럼 목록 항목 전체가 숫자인 위치 참조인지"""
+    if not in_by_list:
+        return False
+    previous = next((text for kind, text in reversed(parts) if kind != SPACE), None)
+    return previous in ("by", ",") and (following is None or following in _POSITION_FOLLOWERS)
+
+
+def _previous_word(parts: List[Tuple[str, str]]) -> Optional[str]:
+    """직전 토큰(공백 제외)이 단어면 소문자로 반환"""
+    for kind, text in reversed(parts):
+        if kind != SPACE:
+            return text if kind == WORD else None
+    return None
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> Fingerprint:
+    """
+    SQL을 템플릿 + 파라미터로 분해
+
+    - 주석 제거, 공백 한 칸으로 정규화, 따옴표 없는 단어 소문자화 (PostgreSQL에서 의미 동일)
+    - 같은 값/타입의 리터럴은 같은 파라미터 번호를 공유
+      (SELECT와 GROUP BY에 같은 식이 있을 때 계속 같은 식으로 인식되도록)
+    """
+    # 공백/주석은 다음 토큰 앞 공백 여부로만 남김
+    tokens: List[Tuple[str, str, bool]] = []  # (kind, text, 앞에 공백)
+    space = False
+    for kind, text in tokenize(sql):
+        if kind in (SPACE, COMMENT):
+            space = True
+        elif kind != SEMICOLON:
+            tokens.append((kind, text, space))
+            space = False
+
+    parts: List[Tuple[str, str]] = []  # (kind, 정규화된 text)
+    params: List[Any] = []
+    param_types: List[str] = []
+    param_index = {}
+    constant_parens: List[bool] = []   # 괄호 깊이별 상수 인자 여부
+    by_depth: Optional[int] = None     # ORDER BY / GROUP BY 목록이 있는 괄호 깊이
+    limit: Optional[int] = None
+
+    def add_param(value: Any, type_name: str) -> str:
+        key = (type(value), value, type_name)
+        if key not in param_index:
+            params.append(value)
+            param_types.append(type_name)
+            param_index[key] = len(params)
+        return f"${param_index[key]}"
+
+    for i, (kind, text, space) in enumerate(tokens):
+        depth = len(constant_parens)
+        in_constant = bool(constant_parens) and constant_parens[-1]
+        previous = _previous_word(parts)
+        following = tokens[i + 1][1].lower() if i + 1 < len(tokens) else None
+
+        if kind == WORD:
+            text = text.lower()
+            if text == "by" and previous in ("order", "group"):
+                by_depth = depth
+            elif text in _CLAUSE_WORDS and by_depth == depth:
+                by_depth = None
+        elif kind == OPEN:
+            constant_parens.append(previous in _CONSTANT_ARG_WORDS)
+        elif kind == CLOSE:
+            if constant_parens:
+                constant_parens.pop()
+            if by_depth is not None and len(constant_parens) < by_depth:
+                by_depth = None
+        elif kind == STRING and text[0] == "'" and not in_constant:
+            value = text[1:-1].replace("''", "'")
+            if previous in _TYPED_LITERAL_WORDS:
+                if following in _INTERVAL_FIELDS:
+                    pass  # INTERVAL '1' MONTH 형태는 그대로
+                else:
+                    # DATE '2024-01-01' == $1::date
+                    _, type_word = parts.pop()
+                    if parts and parts[-1][0] == SPACE:
+                        parts.pop()
+                    space = tokens[i - 1][2]
+                    text = f"{add_param(value, 'unknown')}::{type_word}"
+            else:
+                text = add_param(value, "unknown")
+        elif kind == NUMBER and not in_constant and not _is_position(parts, following, by_depth == depth):
+            value, type_name = _number_param(text)
+            if previous == "limit" and depth == 0 and isinstance(value, int):
+                limit = value
+            text = add_param(value, type_name)
+
+        if space and parts:
+            parts.append((SPACE, " "))
+        parts.append((kind, text))
+
+    template = "".join(text for _, text in parts)
+    digest = hashlib.sha1(f"{template}|{','.join(param_types)}".encode("utf-8")).hexdigest()[:16]
+    return Fingerprint(digest, template, tuple(params), tuple(param_types), limit)
@@ -1,8 +1,10 @@
 """SQL Guardrails - SQL 쿼리 검증 및 안전성 확보"""
 
-import re
 import logging
-from typing import Tuple
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.sql_lexer import tokenize, WORD, QUOTED, COMMENT, SPACE, SEMICOLON, OPEN, CLOSE
 
 logger = logging.getLogger(__name__)
 
@@ -13,14 +15,119 @@ FORBIDDEN_KEYWORDS = [
     "EXEC", "EXECUTE", "IMPORT", "EXPORT", "BACKUP",
     "RESTORE", "SHUTDOWN", "KILL"
 ]
+_FORBIDDEN = frozenset(FORBIDDEN_KEYWORDS)
+
+# LIMIT이 없을 때 추가하는 기본값
+DEFAULT_LIMIT = 1000
+
+# 검증 결과를 기억할 SQL 수 (같은 SQL은 토큰화 없이 바로 판정)
+VERDICT_CACHE_SIZE = 1024
+
+
+class Verdict(NamedTuple):
+    """검증 결과 - 통과 시 sql, 거부 시 error"""
+    sql: Optional[str]
+    error: Optional[str]
+    warnings: Tuple[str, ...] = ()
+    limit_added: bool = False
+
+
+def analyze(sql: str) -> Verdict:
+    """
+    토큰 한 번 순회로 SQL을 검증하고 재작성
+
+    - 첫 토큰이 SELECT인지, 세미콜론이 끝에만 있는지, 금지 키워드가 있는지 확인
+      (문자열 리터럴/따옴표 식별자/주석 안의 단어는 검사하지 않음)
+    - 주석 제거, 최상위 LIMIT이 없으면 LIMIT 추가, 끝에 세미콜론 하나
+    - 렉서와 별개로 원문에서 맨 끝 이외의 세미콜론은 무조건 거부
+      (토큰화 규칙이 PostgreSQL과 어긋나도 여러 문장이 섞여 들어가지 않도록)
+    """
+    body = sql[:-1] if sql.endswith(";") else sql
+    if ";" in body:
+        return Verdict(None, "여러 개의 SQL 문은 허용되지 않습니다")
+
+    try:
+        tokens = tokenize(sql)
+    except ValueError as e:
+        return Verdict(None, str(e))
+
+    parts: List[str] = []
+    first_word = None
+    depth = 0
+    has_limit = False
+    has_sale_date = False
+    ended = False  # 세미콜론 이후 (주석/공백만 허용)
+
+    for kind, text in tokens:
+        if kind == COMMENT:
+            # 주석은 제거하되 앞뒤 토큰이 붙지 않도록 공백으로 대체
+            if parts and not parts[-1].isspace():
+                parts.append(" ")
+            continue
+        if kind == SPACE:
+            parts.append(text)
+            continue
+        if ended:
+            return Verdict(None, "여러 개의 SQL 문은 허용되지 않습니다")
+        if kind == SEMICOLON:
+            ended = True
+            continue
+
+        if first_word is None:
+            first_word = text.upper() if kind == WORD else ""
+            if first_word != "SELECT":
+                return Verdict(None, "SELECT 문만 허용됩니다")
+
+        if kind == WORD:
+            upper = text.upper()
+            if upper in _FORBIDDEN:
+                return Verdict(None, f"금지된 키워드가 포함되어 있습니다: {upper}")
+            if upper == "LIMIT" and depth == 0:
+                has_limit = True
+            elif upper == "SALE_DATE":
+                has_sale_date = True
+        elif kind == QUOTED:
+            if text[1:-1].lower() == "sale_date":
+                has_sale_date = True
+        elif kind == OPEN:
+            depth += 1
+        elif kind == CLOSE:
+            depth -= 1
+        parts.append(text)
+
+    if first_word is None:
+        return Verdict(None, "SQL 쿼리가 비어있습니다")
+
+    rewritten = "".join(parts).strip()
+    if not has_limit:
+        rewritten = f"{rewritten} LIMIT {DEFAULT_LIMIT}"
 
-# 허용되는 SELECT 패턴
-ALLOWED_PATTERN = re.compile(r'^\s*SELECT\s+', re.IGNORECASE | re.MULTILINE)
+    warnings = () if has_sale_date else ("날짜 조건(sale_date)이 없습니다 - 전체 데이터 조회 주의",)
+    return Verdict(rewritten + ";", None, warnings, not has_limit)
+
+
+@lru_cache(maxsize=VERDICT_CACHE_SIZE)
+def _cached_verdict(sql: str) -> Verdict:
+    return analyze(sql)
+
+
+def verdict_cache_stats() -> dict:
+    """검증 결과 캐시 적중 통계"""
+    info = _cached_verdict.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hit": info.hits,
+        "miss": info.misses,
+        "entries": info.currsize,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+    }
 
 
 def validate_and_rewrite(sql: str) -> str:
     """
     SQL 쿼리를 검증하고 필요시 재작성
+
+    같은 SQL의 판정은 캐시되므로 (질문 캐시 적중 등) 반복 호출 비용이 거의 없습니다.
     
     Args:
         sql: 검증할 SQL 쿼리
@@ -33,48 +140,18 @@ def validate_and_rewrite(sql: str) -> str:
     """
     if not sql or not sql.strip():
         raise ValueError("SQL 쿼리가 비어있습니다")
-    
-    sql = sql.strip()
-    
-    # 1. SELECT 문인지 확인
-    if not ALLOWED_PATTERN.match(sql):
-        raise ValueError("SELECT 문만 허용됩니다")
-    
-    # 2. 세미콜론 검사 (여러 statement 방지)
-    semicolon_count = sql.count(';')
-    if semicolon_count > 1:
-        raise ValueError("여러 개의 SQL 문은 허용되지 않습니다")
-    
-    # 끝의 세미콜론 제거 (하나만 허용)
-    sql = sql.rstrip(';').strip()
-    
-    # 3. 금지 키워드 검사
-    sql_upper = sql.upper()
-    for keyword in FORBIDDEN_KEYWORDS:
-        # 단어 경계를 고려한 검사
-        pattern = r'\b' + keyword + r'\b'
-        if re.search(pattern, sql_upper):
-            raise ValueError(f"금지된 키워드가 포함되어 있습니다: {keyword}")
-    
-    # 4. LIMIT 절 확인 및 추가
-    if not re.search(r'\bLIMIT\s+\d+', sql, re.IGNORECASE):
-        logger.info("LIMIT 절이 없어 LIMIT 1000 추가")
-        sql = sql + " LIMIT 1000"
-    
-    # 5. 날짜 조건 확인 (경고만, 실행은 허용)
-    if 'sale_date' not in sql.lower():
-        logger.warning("날짜 조건(sale_date)이 없습니다 - 전체 데이터 조회 주의")
-    
-    # 6. 주석 제거 (-- 및 /* */)
-    sql = re.sub(r'--.*$', '', sql, flags=re.MULTILINE)
-    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-    sql = sql.strip()
-    
-    # 7. 최종 세미콜론 추가
-    sql = sql + ";"
-    
-    logger.info(f"SQL 검증 완료: {sql[:100]}...")
-    return sql
+
+    verdict = _cached_verdict(sql.strip())
+    if verdict.error is not None:
+        raise ValueError(verdict.error)
+
+    if verdict.limit_added:
+        logger.info(f"LIMIT 절이 없어 LIMIT {DEFAULT_LIMIT} 추가")
+    for warning in verdict.warnings:
+        logger.warning(warning)
+
+    logger.info(f"SQL 검증 완료: {verdict.sql[:100]}...")
+    return verdict.sql
 
 
 # 레거시 함수들 (하위 호환성 유지)
@@ -0,0 +1,178 @@
+"""Hedged 실행 - 주 경로가 늦으면 보조 경로를 같이 시작해 먼저 성공한 결과 사용
+
+SQL 생성은 Vanna(주)가 실패하거나 빈 결과를 낸 뒤에야 기본 LLM(보조)을 호출하므로,
+느리게 실패하는 Vanna의 지연시간이 그대로 더해집니다. Hedger는
+
+1. 주 경로를 시작하고 delay(기본: 주 경로 p90 지연시간)만큼 기다림
+2. 그 안에 성공하면 그대로 사용, 실패하면 바로 보조 경로 실행 (이전과 같음)
+3. delay가 지나도 끝나지 않으면 보조 경로를 같이 시작하고 먼저 성공한 결과 사용
+
+보조 경로(비동기 HTTP)가 지면 취소합니다. 주 경로(Vanna)는 워커 스레드에서 실행되어
+취소해도 멈추지 않으므로 끝까지 두고, 끝난 시점으로 순차 실행 대비 절약한 시간을 계산합니다.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# delay 자동 계산에 쓰는 주 경로 최근 성공 지연시간 수 / 최소 표본 수
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class HedgeOutcome(NamedTuple):
+    winner: str       # 결과를 낸 경로 이름
+    value: Any
+    hedged: bool      # 보조 경로를 같이 시작했는지
+
+
+class Hedger:
+    """
+    Args:
+        name: 메트릭 이름 접두어 (<name>.hedged, <name>.won.<경로>, <name>.saved)
+        fixed_delay: 보조 경로 시작 지연 (초, 0이면 주 경로 percentile 지연시간 사용)
+        default_delay: 표본이 MIN_SAMPLES개 모이기 전 지연 (초)
+        percentile: 자동 지연에 쓸 백분위 (0.9 = p90)
+        min_delay: 자동 지연 하한 (초)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fixed_delay: float = 0.0,
+        default_delay: float = 2.0,
+        percentile: float = 0.9,
+        min_delay: float = 0.2,
+    ):
+        self.name = name
+        self.fixed_delay = fixed_delay
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self._latencies: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+        self._stats: Dict[str, Any] = {"runs": 0, "hedged": 0, "won": {}, "saved_seconds": 0.0}
+
+    def delay(self) -> float:
+        """보조 경로를 시작하기 전 기다릴 시간"""
+        if self.fixed_delay > 0:
+            return self.fixed_delay
+        if len(self._latencies) < MIN_SAMPLES:
+            return self.default_delay
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile))
+        return max(self.min_delay, latencies[index])
+
+    async def run(
+        self,
+        primary_name: str,
+        primary: Callable[[], Awaitable[Any]],
+        backup_name: str,
+        backup: Callable[[], Awaitable[Any]],
+    ) -> HedgeOutcome:
+        """
+        주/보조 경로 실행 (각 경로는 실패 시 예외를 던져야 함)
+
+        Raises:
+            둘 다 실패하면 보조 경로의 예외 (보조 경로를 시작하지 않았다면 주 경로 예외)
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        finished: Dict[str, float] = {}  # 경로 → 소요 시간
+
+        def timed(name: str, factory: Callable[[], Awaitable[Any]]) -> "asyncio.Future":
+            began = loop.time()
+
+            async def call():
+                try:
+                    return await factory()
+                finally:
+                    finished[name] = loop.time() - began
+
+            return asyncio.ensure_future(call())
+
+        self._stats["runs"] += 1
+        first = timed(primary_name, primary)
+        first.add_done_callback(lambda task: self._record_primary(task, finished.get(primary_name, 0.0)))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.delay())
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+
+        if first in done:
+            if first.exception() is None:
+                return self._win(primary_name, first.result(), hedged=False)
+            logger.info(f"{primary_name} 실패 - {backup_name}로 대체: {first.exception()}")
+            second = timed(backup_name, backup)
+            return self._win(backup_name, await second, hedged=False)
+
+        # 주 경로가 늦음 - 보조 경로를 같이 시작
+        self._stats["hedged"] += 1
+        metrics.increment(f"{self.name}.hedged")
+        logger.info(f"{primary_name} 응답 지연 ({self.delay():.2f}초 초과) - {backup_name} 동시 시작")
+        second = timed(backup_name, backup)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # 둘 다 끝났으면 주 경로 결과 우선
+                for task in sorted(done, key=lambda t: t is not first):
+                    if task.exception() is None:
+                        winner = primary_name if task is first else backup_name
+                        if task is second:
+                            self._account_saved(first, finished, primary_name, backup_name, loop.time() - start)
+                        return self._win(winner, task.result(), hedged=True)
+                    if task is second or error is None:
+                        error = task.exception()
+            raise error
+        finally:
+            # 진 보조 경로는 취소, 주 경로는 스레드라 멈출 수 없으므로 끝까지 둠
+            if not second.done():
+                second.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "won": dict(self._stats["won"]), "delay_seconds": round(self.delay(), 3)}
+
+    def _record_primary(self, task: "asyncio.Future", elapsed: float) -> None:
+        if not task.cancelled() and task.exception() is None:
+            # 성공한 주 경로 지연시간만 delay 계산에 사용 (실패는 보통 빠르므로 p90을 낮춤)
+            self._latencies.append(elapsed)
+
+    def _win(self, winner: str, value: Any, hedged: bool) -> HedgeOutcome:
+        self._stats["won"][winner] = self._stats["won"].get(winner, 0) + 1
+        metrics.increment(f"{self.name}.won.{winner}")
+        return HedgeOutcome(winner, value, hedged)
+
+    def _account_saved(
+        self,
+        first: "asyncio.Future",
+        finished: Dict[str, float],
+        primary_name: str,
+        backup_name: str,
+        elapsed: float,
+    ) -> None:
+        """
+        보조 경로가 이겼을 때 순차 실행(주 경로 종료 후 실패 시 보조 경로) 대비 절약한 시간 기록
+
+        주 경로가 아직 실행 중이면 끝날 때 계산합니다.
+        """
+        def account(_=None) -> None:
+            if first.cancelled():
+                return
+            sequential = finished[primary_name]
+            if first.exception() is not None:
+                sequential += finished[backup_name]
+            saved = max(0.0, sequential - elapsed)
+            self._stats["saved_seconds"] += saved
+            metrics.observe(f"{self.name}.saved", saved)
+
+        if first.done():
+            account()
+        else:
+            first.add_done_callback(account)
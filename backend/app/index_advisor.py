@@ -0,0 +1,138 @@
+"""인덱스 제안 - fact_loan_sales를 순차 스캔하는 쿼리 형태에 가상 인덱스 후보를 EXPLAIN으로 비교
+
+쿼리 기록(app.query_log)에 남은 최근 계획에서 fact_loan_sales(또는 그 월 파티션)를 Filter와 함께
+순차 스캔한 형태만 대상으로 합니다. Filter 식에 나온 팩트 컬럼으로 후보를 만들고
+
+- 컬럼 하나씩 B-tree
+- 컬럼이 여럿이면 등호 조건 컬럼 먼저, 범위 조건 컬럼(sale_date 등) 나중인 복합 B-tree
+
+hypopg 확장(CREATE EXTENSION hypopg)의 가상 인덱스를 만든 상태로 같은 SQL을 다시 EXPLAIN해
+추정 비용이 얼마나 줄어드는지 봅니다. 인덱스를 실제로 만들지 않으므로 팩트 테이블 잠금이나 쓰기가 없습니다.
+파티션을 스캔했다면 스캔한 파티션마다 가상 인덱스를 만들고, 제안은 부모 테이블 기준으로 표시합니다.
+
+예상 절약 시간 = 그 형태의 총 실행 시간 × 추정 비용 감소율 (비용 모델 기준의 대략값)
+필터 없는 전체 스캔은 B-tree 인덱스로 줄일 수 없으므로 후보 없이 사유만 표시합니다.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Tuple
+
+from app import metrics
+from app.db import explain_hypothetical_async
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLE = "fact_loan_sales"
+FACT_COLUMNS = ("contract_id", "branch_id", "product_id", "sale_date", "disbursed_amount", "quantity", "created_at")
+
+# 팩트 테이블과 월/기본 파티션(fact_loan_sales_YYYYMM, fact_loan_sales_default)
+_FACT_RELATION_RE = re.compile(rf"^{FACT_TABLE}(_\d{{6}}|_default)?$")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_COLUMN_RE = re.compile(rf"\b({'|'.join(FACT_COLUMNS)})\b")
+
+# 복합 인덱스 최대 컬럼 수
+MAX_INDEX_COLUMNS = 3
+# 추정 비용이 이 비율 이상 줄어드는 후보만 제안
+MIN_COST_REDUCTION = 0.1
+
+
+def _filter_columns(filter_expr: str) -> Tuple[List[str], List[str]]:
+    """Filter 식의 팩트 컬럼을 (등호 조건, 그 외 조건)으로 분류 (나온 순서대로)"""
+    expr = _STRING_RE.sub("''", filter_expr)
+    equality: List[str] = []
+    other: List[str] = []
+    for column in dict.fromkeys(_COLUMN_RE.findall(expr)):
+        # (branch_id = 1), ((contract_id)::text = ...) - >=, <=, <>는 제외
+        if re.search(rf"\b{column}\)?(?:::[\w ]+)?\s*=\s", expr):
+            equality.append(column)
+        else:
+            other.append(column)
+    return equality, other
+
+
+def candidate_indexes(filter_expr: str) -> List[Tuple[str, ...]]:
+    """Filter 식으로 인덱스 후보 컬럼 조합 생성"""
+    equality, other = _filter_columns(filter_expr)
+    columns = equality + other
+    candidates = [(column,) for column in columns]
+    if len(columns) > 1:
+        candidates.append(tuple(columns[:MAX_INDEX_COLUMNS]))
+    return candidates
+
+
+def _index_names(node: Dict[str, Any]) -> set:
+    """계획 트리에서 사용한 인덱스 이름"""
+    names = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", ()):
+        names |= _index_names(child)
+    return names
+
+
+async def advise_shape(shape: Dict[str, Any], timeout: float = 5) -> Dict[str, Any]:
+    """
+    쿼리 형태 하나의 인덱스 제안
+
+    Args:
+        shape: QueryLog.top_shapes() 항목 (sql, plan.seq_scans, total_ms 사용)
+
+    Returns:
+        {"fingerprint", "scans", "baseline_cost", "suggestions": [...], "note"}
+    """
+    scans = [(relation, filter_expr) for relation, filter_expr in shape["plan"]["seq_scans"]
+             if _FACT_RELATION_RE.match(relation)]
+    advice: Dict[str, Any] = {
+        "fingerprint": shape["fingerprint"],
+        "total_ms": shape["total_ms"],
+        "scans": sorted({relation for relation, _ in scans}),
+        "suggestions": [],
+    }
+    filters = [filter_expr for _, filter_expr in scans if filter_expr]
+    if not filters:
+        advice["note"] = "필터 없는 전체 스캔 - 인덱스 대신 기간/지점 조건 또는 롤업 테이블 사용 권장"
+        return advice
+
+    columns_list = list(dict.fromkeys(c for filter_expr in filters for c in candidate_indexes(filter_expr)))
+    if not columns_list:
+        advice["note"] = "Filter에 팩트 컬럼이 없어 후보를 만들 수 없음"
+        return advice
+    relations = advice["scans"]
+    statements = [
+        [f"CREATE INDEX ON {relation} ({', '.join(columns)})" for relation in relations]
+        for columns in columns_list
+    ]
+
+    with metrics.timer("index_advisor.explain"):
+        result = await explain_hypothetical_async(shape["sql"], statements, timeout)
+    if result is None:
+        advice["note"] = "hypopg 확장이 없어 비용을 비교할 수 없음 (CREATE EXTENSION hypopg)"
+        advice["candidates"] = [f"CREATE INDEX ON {FACT_TABLE} ({', '.join(columns)})" for columns in columns_list]
+        return advice
+
+    baseline_cost = float(result["baseline"].get("Total Cost", 0.0))
+    advice["baseline_cost"] = baseline_cost
+    for columns, outcome in zip(columns_list, result["candidates"]):
+        definition = f"CREATE INDEX ON {FACT_TABLE} ({', '.join(columns)})"
+        if "error" in outcome:
+            logger.info(f"가상 인덱스 평가 실패 ({definition}): {outcome['error']}")
+            continue
+        cost = float(outcome["plan"].get("Total Cost", 0.0))
+        reduction = 1 - cost / baseline_cost if baseline_cost else 0.0
+        used = bool(_index_names(outcome["plan"]) & set(outcome["index_names"]))
+        if used and reduction >= MIN_COST_REDUCTION:
+            advice["suggestions"].append({
+                "definition": definition,
+                "estimated_cost": cost,
+                "cost_reduction": round(reduction, 3),
+                "estimated_saved_ms": round(shape["total_ms"] * reduction, 1),
+            })
+    advice["suggestions"].sort(key=lambda s: s["cost_reduction"], reverse=True)
+    if not advice["suggestions"]:
+        advice["note"] = "가상 인덱스로 추정 비용이 줄지 않음 (조건의 선택도가 낮거나 이미 적절한 인덱스 있음)"
+    metrics.increment("index_advisor.suggestions", len(advice["suggestions"]))
+    return advice
+
+
+def scans_fact_table(shape: Dict[str, Any]) -> bool:
+    """최근 계획에서 fact_loan_sales(파티션 포함)를 순차 스캔했는지"""
+    return any(_FACT_RELATION_RE.match(relation) for relation, _ in shape["plan"]["seq_scans"])
@@ -0,0 +1,522 @@
+"""판매 데이터 대량 적재 - CSV/NDJSON 배치를 COPY로 스테이징 후 contract_id 기준 upsert
+
+/chat 쿼리 풀은 읽기 전용 세션이므로 적재는 별도의 작은 쓰기 풀(INGEST_MAX_CONCURRENCY)과
+워커를 사용합니다. 대량 적재가 /chat의 DB 커넥션을 차지하지 않도록 하기 위함입니다.
+
+1. 요청 본문을 받는 대로 크기가 제한된 큐로 워커에 넘김 (본문 전체를 메모리에 올리지 않음)
+2. 워커는 세션 임시 테이블에 COPY FROM STDIN (fact_loan_sales는 건드리지 않으므로 트랜잭션 밖에서)
+   - CSV: 헤더 줄로 컬럼을 확인한 뒤 나머지 바이트는 그대로 COPY (파싱은 PostgreSQL이 수행)
+   - NDJSON: 줄마다 JSON을 읽어 CSV로 바꿔 COPY
+3. 같은 contract_id가 배치 안에 여러 번 있으면 마지막 행만 INSERT ... ON CONFLICT DO UPDATE
+   (값이 같은 행은 갱신하지 않아 롤업 트리거도 건드리지 않음)
+   월 파티션 레이아웃(db/partitioned.sql)은 contract_id 단독 UNIQUE를 둘 수 없으므로 적재끼리 잠금을 잡고
+   UPDATE → 없는 계약만 INSERT. 배치에 필요한 월 파티션은 그 전에 짧은 별도 트랜잭션에서 만듦
+   (파티션 생성/붙이기의 ACCESS EXCLUSIVE 잠금이 적재 트랜잭션 내내 /chat 조회를 막지 않도록)
+   파티션 레이아웃이면 keep_sales_partitions가 앞으로 몇 달치 월 파티션도 미리 만들어 둠
+4. 커밋 후 데이터 버전을 올려 이전 버전으로 캐시된 쿼리 결과를 무효화
+
+데이터 버전은 프로세스 안의 값이므로 워커 프로세스가 여러 개면 적재를 받은 프로세스에만 반영됩니다
+(나머지는 RESULT_CACHE_TTL_SECONDS 후 갱신).
+"""
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import psycopg2
+
+from app import metrics
+from app.db_pool import ConnectionPool
+from app.result_cache import bump_data_version, get_data_version
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # 선택 의존성 - 없으면 표준 json 사용
+    _loads = json.loads
+
+REQUIRED_COLUMNS = ("contract_id", "branch_id", "product_id", "sale_date", "disbursed_amount")
+OPTIONAL_COLUMNS = ("quantity",)
+FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-seq": "ndjson",
+}
+
+# 미리 만들 월 파티션 확인 주기
+PARTITION_CHECK_INTERVAL_SECONDS = 24 * 60 * 60
+
+_STAGING_DDL = (
+    "CREATE TEMP TABLE ingest_staging ("
+    " line BIGINT GENERATED ALWAYS AS IDENTITY,"
+    " contract_id VARCHAR(50) NOT NULL,"
+    " branch_id INTEGER NOT NULL,"
+    " product_id INTEGER NOT NULL,"
+    " sale_date DATE NOT NULL,"
+    " disbursed_amount NUMERIC(15, 2) NOT NULL,"
+    " quantity INTEGER"
+    ")"
+)
+
+# 배치 안 중복은 마지막 행, 값이 바뀐 행만 갱신 (RETURNING xmax = 0이면 새로 삽입된 행)
+_UPSERT_SQL = """
+WITH upserted AS (
+    INSERT INTO fact_loan_sales (contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity)
+    SELECT DISTINCT ON (contract_id)
+           contract_id, branch_id, product_id, sale_date, disbursed_amount, COALESCE(quantity, 1)
+    FROM ingest_staging
+    ORDER BY contract_id, line DESC
+    ON CONFLICT (contract_id) DO UPDATE SET
+        branch_id = EXCLUDED.branch_id,
+        product_id = EXCLUDED.product_id,
+        sale_date = EXCLUDED.sale_date,
+        disbursed_amount = EXCLUDED.disbursed_amount,
+        quantity = EXCLUDED.quantity
+    WHERE (fact_loan_sales.branch_id, fact_loan_sales.product_id, fact_loan_sales.sale_date,
+           fact_loan_sales.disbursed_amount, fact_loan_sales.quantity)
+          IS DISTINCT FROM
+          (EXCLUDED.branch_id, EXCLUDED.product_id, EXCLUDED.sale_date,
+           EXCLUDED.disbursed_amount, EXCLUDED.quantity)
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+# 적재끼리 직렬화하는 advisory 잠금 (읽기는 막지 않음)
+_INGEST_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('ingest:fact_loan_sales'));"
+
+# 파티션 레이아웃: 배치의 월 파티션 생성 (DDL 잠금이 짧게 끝나도록 단독 트랜잭션으로 커밋)
+_PARTITIONS_SQL = (
+    "BEGIN; " + _INGEST_LOCK_SQL
+    + " SELECT create_sales_partitions(MIN(sale_date), MAX(sale_date)) FROM ingest_staging; COMMIT"
+)
+
+# 파티션 레이아웃: 적재끼리 직렬화 후 계약별 마지막 행만 남김
+_PARTITIONED_PREPARE_SQL = _INGEST_LOCK_SQL + """
+CREATE TEMP TABLE ingest_batch ON COMMIT DROP AS
+    SELECT DISTINCT ON (contract_id)
+           contract_id, branch_id, product_id, sale_date, disbursed_amount, COALESCE(quantity, 1) AS quantity
+    FROM ingest_staging
+    ORDER BY contract_id, line DESC;
+"""
+
+_PARTITIONED_UPDATE_SQL = """
+UPDATE fact_loan_sales f SET
+    branch_id = b.branch_id,
+    product_id = b.product_id,
+    sale_date = b.sale_date,
+    disbursed_amount = b.disbursed_amount,
+    quantity = b.quantity
+FROM ingest_batch b
+WHERE f.contract_id = b.contract_id
+  AND (f.branch_id, f.product_id, f.sale_date, f.disbursed_amount, f.quantity)
+      IS DISTINCT FROM (b.branch_id, b.product_id, b.sale_date, b.disbursed_amount, b.quantity)
+"""
+
+_PARTITIONED_INSERT_SQL = """
+INSERT INTO fact_loan_sales (contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity)
+SELECT contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity
+FROM ingest_batch b
+WHERE NOT EXISTS (SELECT 1 FROM fact_loan_sales f WHERE f.contract_id = b.contract_id)
+"""
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class IngestError(Exception):
+    """잘못된 배치 (형식/컬럼/값/참조 오류) - 트랜잭션은 롤백됨"""
+    status_code = 422
+
+
+class IngestTooLarge(IngestError):
+    """본문이 INGEST_MAX_BYTES 초과"""
+    status_code = 413
+
+
+class IngestUnavailable(IngestError):
+    """DB가 설정되지 않음"""
+    status_code = 503
+
+
+class IngestResult(NamedTuple):
+    rows: int           # 배치 행 수 (중복 포함)
+    inserted: int
+    updated: int
+    unchanged: int      # 배치 안 중복이거나 기존 값과 같아 갱신하지 않은 행
+    data_version: int
+    elapsed_ms: float
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    """Content-Type → 'csv' / 'ndjson' (지원하지 않으면 None)"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    return FORMATS.get(media_type)
+
+
+def _configure_session(conn) -> None:
+    """적재 세션 설정 (읽기/쓰기, 긴 statement_timeout)"""
+    settings = get_settings()
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SET statement_timeout = {int(settings.INGEST_TIMEOUT_SECONDS * 1000)}; "
+            "SET application_name = 'text2query-ingest'"
+        )
+
+
+def _get_pool() -> ConnectionPool:
+    """적재용 커넥션 풀 (첫 적재 때 생성, min_size=0이라 평소에는 커넥션을 잡지 않음)"""
+    global _pool
+    if _pool is None:
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise IngestUnavailable("DATABASE_URL이 설정되지 않았습니다")
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    dsn=database_url,
+                    max_size=get_settings().INGEST_MAX_CONCURRENCY,
+                    min_size=0,
+                    acquire_timeout=get_settings().INGEST_TIMEOUT_SECONDS,
+                    configure=_configure_session,
+                )
+    return _pool
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().INGEST_MAX_CONCURRENCY,
+            thread_name_prefix="db-ingest",
+        )
+    return _executor
+
+
+def pool_stats() -> Dict[str, Any]:
+    """적재 풀 상태 (아직 적재가 없으면 빈 dict)"""
+    return _pool.stats() if _pool is not None else {}
+
+
+def close_pool(timeout: float = 10.0) -> None:
+    """적재 풀 종료 (진행 중인 적재는 timeout초까지 대기)"""
+    global _pool
+    with _pool_lock:
+        pool_instance, _pool = _pool, None
+    if pool_instance is not None:
+        pool_instance.close(timeout)
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    bytes 청크 이터레이터를 copy_expert가 읽는 파일처럼 감쌈
+
+    psycopg2는 read()에서 난 예외를 QueryCanceled("error in .read() call")로 바꾸므로
+    원래 예외(줄 단위 형식 오류, 크기 초과 등)를 error에 보관해 COPY 실패 후 다시 던집니다.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self.bytes = 0
+        self.error: Optional[BaseException] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            for chunk in self._chunks:
+                if chunk:
+                    self.bytes += len(chunk)
+                    return chunk
+        except Exception as e:
+            self.error = e
+            raise
+        return b""
+
+
+def _split_header(chunks: Iterator[bytes]) -> Tuple[List[str], Iterator[bytes]]:
+    """CSV 첫 줄(헤더)의 컬럼 이름과 나머지 바이트 이터레이터"""
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if b"\n" in head:
+            break
+    line, _, rest = head.partition(b"\n")
+    header = next(csv.reader([line.decode("utf-8-sig").strip("\r")]), [])
+
+    def remaining() -> Iterator[bytes]:
+        if rest:
+            yield rest
+        yield from chunks
+
+    return [name.strip().lower() for name in header], remaining()
+
+
+def _check_columns(columns: List[str]) -> None:
+    unknown = [c for c in columns if c not in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if unknown or missing or len(set(columns)) != len(columns):
+        raise IngestError(
+            f"CSV 헤더 오류 - 필수 컬럼: {', '.join(REQUIRED_COLUMNS)}, 선택 컬럼: {', '.join(OPTIONAL_COLUMNS)}"
+            + (f", 알 수 없는 컬럼: {', '.join(unknown)}" if unknown else "")
+            + (f", 누락: {', '.join(missing)}" if missing else "")
+        )
+
+
+def _ndjson_to_csv(chunks: Iterator[bytes], columns: List[str]) -> Iterator[bytes]:
+    """NDJSON 줄을 columns 순서의 CSV 행으로 변환 (약 64KB씩 모아서 전달)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    pending = b""
+    line_no = 0
+
+    def rows(lines: List[bytes]) -> None:
+        nonlocal line_no
+        for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                record = _loads(line)
+            except ValueError:
+                raise IngestError(f"{line_no}번째 줄: JSON 형식이 아닙니다")
+            if not isinstance(record, dict):
+                raise IngestError(f"{line_no}번째 줄: JSON 객체가 아닙니다")
+            missing = [c for c in REQUIRED_COLUMNS if record.get(c) is None]
+            if missing:
+                raise IngestError(f"{line_no}번째 줄: 필수 값 누락 ({', '.join(missing)})")
+            writer.writerow([record.get(c) for c in columns])
+
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        rows(lines)
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    rows([pending])
+    yield buffer.getvalue().encode("utf-8")
+
+
+def ingest_sales(chunks: Iterator[bytes], fmt: str) -> IngestResult:
+    """
+    배치 하나를 한 트랜잭션으로 반영 (블로킹 - 적재 워커에서 실행)
+
+    스테이징 COPY와 월 파티션 생성은 반영 트랜잭션 전에 끝나므로 긴 트랜잭션에는 DML만 남습니다.
+
+    Raises:
+        IngestError: 형식/컬럼/값/참조(존재하지 않는 branch_id 등) 오류
+    """
+    start = time.perf_counter()
+    if fmt == "csv":
+        columns, body = _split_header(chunks)
+        _check_columns(columns)
+    else:
+        columns = list(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+        body = _ndjson_to_csv(chunks, columns)
+    reader = _ChunkReader(body)
+
+    with _get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DROP TABLE IF EXISTS ingest_staging; " + _STAGING_DDL)
+            with metrics.timer("ingest.copy"):
+                try:
+                    cursor.copy_expert(
+                        f"COPY ingest_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", reader
+                    )
+                except psycopg2.Error:
+                    if reader.error is not None:
+                        raise reader.error
+                    raise
+            rows = cursor.rowcount
+            partitioned = _is_partitioned(cursor)
+            if partitioned:
+                cursor.execute(_PARTITIONS_SQL)
+            with metrics.timer("ingest.upsert"):
+                cursor.execute("BEGIN")
+                inserted, updated = _upsert(cursor, partitioned)
+                cursor.execute("COMMIT")
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            cursor.execute("ROLLBACK")
+            metrics.increment("ingest.rejected")
+            raise IngestError(_pg_message(e)) from e
+        except BaseException as e:
+            if isinstance(e, IngestError):
+                metrics.increment("ingest.rejected")
+            try:
+                cursor.execute("ROLLBACK")
+            except psycopg2.Error:
+                conn.close()
+            raise
+        finally:
+            try:
+                cursor.execute("DROP TABLE IF EXISTS ingest_staging")
+            except psycopg2.Error:
+                conn.close()
+            cursor.close()
+
+    version = bump_data_version() if inserted or updated else get_data_version()
+    elapsed = time.perf_counter() - start
+    metrics.increment("ingest.batches")
+    metrics.increment("ingest.rows", rows)
+    metrics.increment("ingest.inserted", inserted)
+    metrics.increment("ingest.updated", updated)
+    metrics.increment("ingest.bytes", reader.bytes)
+    logger.info(
+        f"적재 완료 - {rows}행 (삽입 {inserted}, 갱신 {updated}), {elapsed:.2f}초, 데이터 버전 {version}"
+    )
+    return IngestResult(rows, inserted, updated, rows - inserted - updated, version, elapsed * 1000)
+
+
+def ensure_sales_partitions(months_ahead: int) -> Optional[int]:
+    """
+    월 파티션 레이아웃이면 이번 달부터 months_ahead개월 뒤까지 파티션 생성 (블로킹)
+
+    Returns:
+        새로 만든 파티션 수, 파티션 레이아웃이 아니면 None
+    """
+    with _get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relkind = 'p' AND to_regproc('create_sales_partitions') IS NOT NULL "
+                "FROM pg_class c WHERE c.oid = to_regclass('fact_loan_sales')"
+            )
+            row = cursor.fetchone()
+            if not row or not row[0]:
+                return None
+            # 적재의 파티션 생성과 겹치지 않도록 같은 잠금 아래에서 짧게 커밋
+            cursor.execute("BEGIN; " + _INGEST_LOCK_SQL)
+            cursor.execute(
+                "SELECT create_sales_partitions(CURRENT_DATE, (CURRENT_DATE + %s * INTERVAL '1 month')::DATE)",
+                (months_ahead,),
+            )
+            created = cursor.fetchone()[0]
+            cursor.execute("COMMIT")
+            return created
+
+
+async def keep_sales_partitions() -> None:
+    """
+    시작 시와 이후 하루마다 앞으로 SALES_PARTITION_AHEAD_MONTHS개월치 월 파티션 생성
+
+    월 파티션이 없는 날짜의 행은 기본 파티션에 쌓이고, 기본 파티션이 커질수록 파티션 생성과
+    프루닝이 느려지므로 미리 만들어 둡니다. 실패(권한 없음, DB 미연결 등)는 경고만 남기고 다음 주기에 재시도합니다.
+    """
+    months_ahead = get_settings().SALES_PARTITION_AHEAD_MONTHS
+    if months_ahead <= 0 or not os.getenv("DATABASE_URL"):
+        return
+
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            created = await loop.run_in_executor(_get_executor(), ensure_sales_partitions, months_ahead)
+            if created:
+                logger.info(f"판매 월 파티션 {created}개 생성 ({months_ahead}개월 앞까지)")
+        except Exception as e:
+            logger.warning(f"판매 월 파티션 생성 실패: {str(e)[:200]}")
+        await asyncio.sleep(PARTITION_CHECK_INTERVAL_SECONDS)
+
+
+def _is_partitioned(cursor) -> bool:
+    """fact_loan_sales가 월 파티션 레이아웃인지"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'fact_loan_sales'::regclass")
+    return cursor.fetchone()[0] == "p"
+
+
+def _upsert(cursor, partitioned: bool) -> Tuple[int, int]:
+    """스테이징 → fact_loan_sales 반영 (열린 트랜잭션 안에서), (삽입 수, 갱신 수)"""
+    if not partitioned:
+        cursor.execute(_UPSERT_SQL)
+        return cursor.fetchone()
+    cursor.execute(_PARTITIONED_PREPARE_SQL)
+    cursor.execute(_PARTITIONED_UPDATE_SQL)
+    updated = cursor.rowcount
+    cursor.execute(_PARTITIONED_INSERT_SQL)
+    return cursor.rowcount, updated
+
+
+def _pg_message(error: psycopg2.Error) -> str:
+    """PostgreSQL 오류 메시지 첫 줄 + COPY 위치(있으면)"""
+    diag = error.diag
+    message = diag.message_primary or str(error).splitlines()[0]
+    if diag.context and diag.context.startswith("COPY"):
+        message += f" ({diag.context.splitlines()[0]})"
+    if diag.message_detail:
+        message += f" - {diag.message_detail}"
+    return message
+
+
+async def ingest_sales_async(body: AsyncIterator[bytes], fmt: str, max_bytes: int) -> IngestResult:
+    """
+    요청 본문을 받는 대로 적재 워커에 넘겨 적재
+
+    본문과 워커는 크기가 제한된 큐로 연결되어 DB가 느리면 본문 읽기도 대기합니다(backpressure).
+    워커가 먼저 실패하면 남은 본문은 버리고, 본문이 max_bytes를 넘으면 워커의 COPY를 중단시킵니다.
+
+    Raises:
+        IngestError: 잘못된 배치, IngestTooLarge: max_bytes 초과
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+    done = object()
+    finished = threading.Event()
+
+    def chunks() -> Iterator[bytes]:
+        while True:
+            item = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def worker() -> IngestResult:
+        try:
+            return ingest_sales(chunks(), fmt)
+        finally:
+            finished.set()  # 실패로 일찍 끝났으면 남은 본문은 큐에 넣지 않음
+
+    future = loop.run_in_executor(_get_executor(), worker)
+    received = 0
+    try:
+        async for chunk in body:
+            received += len(chunk)
+            if received > max_bytes:
+                raise IngestTooLarge(f"배치가 너무 큽니다 (최대 {max_bytes:,}바이트)")
+            if finished.is_set():
+                break
+            await _put(queue, chunk, future)
+        await _put(queue, done, future)
+    except BaseException as e:
+        await _put(queue, e if isinstance(e, IngestError) else IngestError("요청 본문 수신 중단"), future)
+        try:
+            await future
+        except Exception:
+            pass  # 원래 예외를 전달
+        raise
+    return await future
+
+
+async def _put(queue: asyncio.Queue, item, future: asyncio.Future) -> None:
+    """워커가 끝나지 않은 동안만 큐에 넣음 (워커가 실패해 더 읽지 않으면 대기하지 않음)"""
+    put = asyncio.ensure_future(queue.put(item))
+    await asyncio.wait({put, future}, return_when=asyncio.FIRST_COMPLETED)
+    if not put.done():
+        put.cancel()
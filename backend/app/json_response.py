@@ -0,0 +1,122 @@
+"""빠른 JSON 응답 - orjson 인코딩 + 크기 기준 zstd/gzip 압축
+
+/chat 응답은 서버가 직접 만든 값이므로 pydantic 재검증과 jsonable_encoder(값마다 재귀 변환)를
+거치지 않고 바로 bytes로 인코딩합니다.
+
+- orjson: date/datetime을 기본 지원, Decimal은 default로 float 변환 (없으면 표준 json으로 대체)
+- 압축: 본문이 RESPONSE_COMPRESS_MIN_BYTES 이상이고 클라이언트가 받을 수 있을 때만
+  (Accept-Encoding의 q 값이 가장 높은 것, 같으면 zstd(zstandard 설치 시) → gzip 순, q=0은 거부로 취급)
+
+스트리밍(NDJSON)은 줄마다 바로 보내야 하므로 압축하지 않고 인코딩만 사용합니다.
+"""
+
+import gzip
+import json
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.responses import Response
+
+from app import metrics
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성 - 없으면 표준 json 사용
+    orjson = None
+
+try:
+    import zstandard
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+except ImportError:  # 선택 의존성 - 없으면 gzip만 사용
+    zstandard = None
+    _zstd_compressor = None
+
+GZIP_LEVEL = 5  # 6(기본)보다 빠르고 크기 차이는 작음
+
+
+def _default(value: Any) -> Any:
+    """기본 인코더가 처리하지 못하는 DB 값 변환 (Decimal, date 등)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "isoformat"):  # date, datetime, time
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON bytes로 인코딩 (UTF-8, 한글 이스케이프 없음)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """
+    Accept-Encoding → {코딩: q 값} (q=0이거나 q 값이 잘못된 코딩은 제외)
+
+    목록에 없는 코딩은 '*'의 q 값을 따릅니다 (명시적으로 q=0인 코딩은 '*'로 되살리지 않음).
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+                if not 0.0 <= q <= 1.0:
+                    q = 0.0
+        qualities[coding.lower()] = q
+
+    wildcard = qualities.pop("*", 0.0)
+    accepted = {coding: q for coding, q in qualities.items() if q > 0}
+    if wildcard > 0:
+        for coding in ("zstd", "gzip"):
+            if coding not in qualities:
+                accepted[coding] = wildcard
+    return accepted
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """
+    본문 압축 (작거나 클라이언트가 받지 못하면 그대로)
+
+    Returns:
+        (본문, Content-Encoding 값 또는 None)
+    """
+    if len(body) < get_settings().RESPONSE_COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = _accepted_encodings(accept_encoding)
+    zstd_q = accepted.get("zstd", 0.0) if _zstd_compressor is not None else 0.0
+    gzip_q = accepted.get("gzip", 0.0)
+    if zstd_q > 0 and zstd_q >= gzip_q:
+        return _zstd_compressor.compress(body), "zstd"
+    if gzip_q > 0:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def json_response(obj: Any, accept_encoding: Optional[str] = None, status_code: int = 200) -> Response:
+    """검증 없이 인코딩/압축한 JSON 응답"""
+    with metrics.timer("response.encode"):
+        body = dumps(obj)
+    raw_size = len(body)
+    with metrics.timer("response.compress"):
+        body, encoding = compress(body, accept_encoding)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        metrics.increment(f"response.compressed.{encoding}")
+    metrics.increment("response.bytes.raw", raw_size)
+    metrics.increment("response.bytes.sent", len(body))
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
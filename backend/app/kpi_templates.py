@@ -0,0 +1,301 @@
+"""KPI 질문 템플릿 - 자주 묻는 질문 유형은 LLM 없이 바로 SQL 생성
+
+트래픽 대부분은 Vanna 학습 예제(vanna_client.SQL_EXAMPLES)와 같은 유형입니다.
+
+    지난 달 전체 판매액은?          → 기간 + 지표
+    서울본점의 이번 달 계약 건수는?  → 지점 + 기간 + 지표
+    상위 5개 지점의 판매액은?        → 상위 N + 차원 + 지표
+
+질문을 지표/기간/차원(지점·상품 이름)/그룹/상위 N 구문으로 분해하고, 알아본 구문을 모두
+지운 뒤 남은 말이 조사/군더더기뿐일 때만 템플릿 SQL을 만듭니다. 모르는 말이 하나라도
+남으면(예: "신규 고객 비율") 확신할 수 없으므로 None을 반환하고 Vanna/LLM 경로로 넘깁니다.
+
+띄어쓰기가 일정하지 않으므로("지난 달" / "지난달") 공백을 모두 지운 문자열에서 찾습니다.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.question_cache import FILLER_WORDS, tokenize_question
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateMatch(NamedTuple):
+    sql: str
+    intent: str  # 템플릿 종류 (로그/메트릭용, 예: "sum+branch+last_month+top")
+
+
+# 지표: 패턴 → (키, SELECT 식)
+METRICS = [
+    (re.compile(r"평균(?:판매금액|판매액|대출실행액|실행액|대출액|금액)"), "avg", "AVG(f.disbursed_amount) AS avg_sales_amount"),
+    (re.compile(r"총?(?:판매금액|판매액|매출액|매출|대출실행액|실행액|대출액|취급액)"), "sum", "SUM(f.disbursed_amount) AS total_sales_amount"),
+    (re.compile(r"(?:계약|판매)(?:건수|수|량)|건수|몇건"), "count", "COUNT(*) AS contract_count"),
+]
+
+# 상대 기간: 패턴 → (키, WHERE 조건) - vanna_client 학습 예제와 같은 표현
+PERIODS = [
+    (re.compile(r"지난달|저번달|전월|지난한달"), "last_month",
+     "f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month') AND f.sale_date < DATE_TRUNC('month', CURRENT_DATE)"),
+    (re.compile(r"이번달|이달|금월|당월"), "this_month",
+     "f.sale_date >= DATE_TRUNC('month', CURRENT_DATE)"),
+    (re.compile(r"지난분기|저번분기|전분기|직전분기"), "last_quarter",
+     "f.sale_date >= DATE_TRUNC('quarter', CURRENT_DATE - INTERVAL '3 months') AND f.sale_date < DATE_TRUNC('quarter', CURRENT_DATE)"),
+    (re.compile(r"이번분기|금분기|당분기"), "this_quarter",
+     "f.sale_date >= DATE_TRUNC('quarter', CURRENT_DATE)"),
+    (re.compile(r"작년|지난해|전년도|전년"), "last_year",
+     "f.sale_date >= DATE_TRUNC('year', CURRENT_DATE - INTERVAL '1 year') AND f.sale_date < DATE_TRUNC('year', CURRENT_DATE)"),
+    (re.compile(r"올해|금년|당해|이번년도|올해년도"), "this_year",
+     "f.sale_date >= DATE_TRUNC('year', CURRENT_DATE)"),
+    (re.compile(r"오늘|금일"), "today", "f.sale_date = CURRENT_DATE"),
+    (re.compile(r"어제|전일"), "yesterday", "f.sale_date = CURRENT_DATE - 1"),
+]
+
+# 절대 기간: 2024년 3월 / 2024년 2분기 / 2024년
+_YEAR_MONTH_RE = re.compile(r"(20\d{2})년(1[0-2]|0?[1-9])월")
+_YEAR_QUARTER_RE = re.compile(r"(20\d{2})년([1-4])분기")
+_YEAR_RE = re.compile(r"(20\d{2})년(?:도)?")
+_RECENT_RE = re.compile(r"최근(\d{1,3})(일|개월|달)")
+
+# 그룹: 패턴 → (키, SELECT 식, GROUP BY 식, 시간 축 여부)
+GROUPS = [
+    (re.compile(r"지점별|점포별"), "branch", "b.branch_name", "b.branch_name", False),
+    (re.compile(r"상품별"), "product", "p.product_name", "p.product_name", False),
+    (re.compile(r"지역별"), "region", "b.region", "b.region", False),
+    (re.compile(r"(?:상품)?(?:카테고리|분류|유형)별"), "category", "p.product_category", "p.product_category", False),
+    (re.compile(r"월별|월간|매월"), "month", "DATE_TRUNC('month', f.sale_date) AS month", "DATE_TRUNC('month', f.sale_date)", True),
+    (re.compile(r"분기별"), "quarter", "DATE_TRUNC('quarter', f.sale_date) AS quarter", "DATE_TRUNC('quarter', f.sale_date)", True),
+    (re.compile(r"연도별|년도별|연별|연간"), "year", "DATE_TRUNC('year', f.sale_date) AS year", "DATE_TRUNC('year', f.sale_date)", True),
+    (re.compile(r"일별|일자별|날짜별|일간"), "day", "f.sale_date", "f.sale_date", True),
+]
+
+# 상위/하위 N: "상위 5개 지점", "top3 상품", "5대 지점", "가장 많이 판 지점"
+_TOP_RE = re.compile(r"(상위|top|하위|bottom)(\d{1,3})(?:개|곳|위)?(지점|점포|상품)?")
+_TOP_BIG_RE = re.compile(r"(\d{1,2})대(지점|점포|상품)")
+_BEST_RE = re.compile(r"(?:가장|제일)(?:많이판|많은|높은|많이팔린|잘팔린|실적이좋은)(지점|점포|상품)")
+_DIMENSION_WORDS = {"지점": "branch", "점포": "branch", "상품": "product"}
+
+# 두 기간/대상을 비교하거나 비율을 묻는 말 - 한 기간 합계로 답하면 틀리므로 템플릿을 쓰지 않음
+_COMPARISON_RE = re.compile(r"대비|증감|증가|감소|성장률|비율|비중|차이|비교|vs")
+
+# 구문을 지운 뒤 남아도 되는 말 (조사, 접속사, 군더더기)
+ALLOWED_LEFTOVERS = FILLER_WORDS | {
+    "의", "은", "는", "이", "가", "을", "를", "에", "에서", "로", "으로", "와", "과", "및", "랑", "하고", "그리고",
+    "전체", "총", "합계", "모든", "모두", "전", "각", "기준", "실적", "현황", "통계", "데이터", "얼마나", "어떻게",
+    "몇", "별", "기간", "동안", "중", "간", "되", "됐", "나", "었", "었어", "였어", "됐어", "됐나요",
+}
+
+# 이름 별칭을 만들 때 떼어 볼 접미사 ("부산지점" → "부산")
+_NAME_SUFFIXES = ("본점", "지점", "금융", "대출")
+
+_branch_names: Dict[str, str] = {}   # 별칭(공백 제거, 소문자) → 실제 지점명
+_product_names: Dict[str, str] = {}
+_branch_re: Optional[re.Pattern] = None
+_product_re: Optional[re.Pattern] = None
+_dimension_re: Optional[re.Pattern] = None  # 지점/상품/지역 이름과 별칭 전체
+
+
+def _aliases(names: List[str]) -> Dict[str, str]:
+    """실제 이름과, 접미사를 뗀 이름이 다른 이름과 겹치지 않으면 그 이름도 별칭으로"""
+    aliases = {_compact(name): name for name in names if name}
+    short: Dict[str, List[str]] = {}
+    for name in names:
+        for suffix in _NAME_SUFFIXES:
+            compact = _compact(name)
+            if compact.endswith(suffix) and len(compact) - len(suffix) >= 2:
+                short.setdefault(compact[: -len(suffix)], []).append(name)
+    for alias, owners in short.items():
+        if len(set(owners)) == 1 and alias not in aliases:
+            aliases[alias] = owners[0]
+    return aliases
+
+
+def _alternation(aliases: Dict[str, str]) -> Optional[re.Pattern]:
+    if not aliases:
+        return None
+    return re.compile("|".join(re.escape(a) for a in sorted(aliases, key=len, reverse=True)))
+
+
+def set_dimension_names(branches: List[str], products: List[str], regions: Optional[List[str]] = None) -> None:
+    """지점/상품/지역 이름 등록 (DB의 dim_branch/dim_product 기준, 시작 시 호출)"""
+    global _branch_names, _product_names, _branch_re, _product_re, _dimension_re
+    _branch_names = _aliases(branches)
+    _product_names = _aliases(products)
+    _branch_re = _alternation(_branch_names)
+    _product_re = _alternation(_product_names)
+    region_names = {_compact(r): r for r in regions or [] if r}
+    _dimension_re = _alternation({**_branch_names, **_product_names, **region_names})
+    logger.info(f"KPI 템플릿 이름 등록: 지점 {len(branches)}개, 상품 {len(products)}개, 지역 {len(region_names)}개")
+
+
+def contains_dimension_name(token: str) -> bool:
+    """토큰에 등록된 지점/상품/지역 이름(별칭 포함)이 들어 있는지 (질문 캐시 오타 판정용)"""
+    return bool(_dimension_re and _dimension_re.search(_compact(token)))
+
+
+def mentioned_dimensions(question: str) -> Tuple[bool, bool]:
+    """질문에 등록된 지점/상품 이름이 있는지 (프롬프트 스키마 선택용)"""
+    text = _compact(question)
+    return (
+        bool(_branch_re and _branch_re.search(text)),
+        bool(_product_re and _product_re.search(text)),
+    )
+
+
+def _compact(text: str) -> str:
+    """NFKC + 소문자 + 문장부호/공백 제거"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"[^\w%]+", "", text)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class _Consumer:
+    """질문 문자열에서 찾은 구문을 지워 나가며 남은 말 추적"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def take(self, pattern: re.Pattern) -> List[re.Match]:
+        matches = list(pattern.finditer(self.text))
+        for m in reversed(matches):
+            self.text = self.text[: m.start()] + " " + self.text[m.end():]
+        return matches
+
+    def leftovers(self) -> List[str]:
+        return [t for t in tokenize_question(self.text) if t not in ALLOWED_LEFTOVERS]
+
+
+def _absolute_period(consumer: _Consumer) -> Tuple[List[str], List[str]]:
+    """절대 기간 → (키, WHERE 조건)"""
+    keys, conds = [], []
+    for m in consumer.take(_YEAR_MONTH_RE):
+        year, month = int(m.group(1)), int(m.group(2))
+        end = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
+        keys.append("month_literal")
+        conds.append(f"f.sale_date >= DATE '{year}-{month:02d}-01' AND f.sale_date < DATE '{end}'")
+    for m in consumer.take(_YEAR_QUARTER_RE):
+        year, quarter = int(m.group(1)), int(m.group(2))
+        start_month = 3 * (quarter - 1) + 1
+        end = f"{year + 1}-01-01" if quarter == 4 else f"{year}-{start_month + 3:02d}-01"
+        keys.append("quarter_literal")
+        conds.append(f"f.sale_date >= DATE '{year}-{start_month:02d}-01' AND f.sale_date < DATE '{end}'")
+    for m in consumer.take(_YEAR_RE):
+        year = int(m.group(1))
+        keys.append("year_literal")
+        conds.append(f"f.sale_date >= DATE '{year}-01-01' AND f.sale_date < DATE '{year + 1}-01-01'")
+    for m in consumer.take(_RECENT_RE):
+        n, unit = int(m.group(1)), m.group(2)
+        interval = f"{n} days" if unit == "일" else f"{n} months"
+        keys.append("recent")
+        conds.append(f"f.sale_date >= CURRENT_DATE - INTERVAL '{interval}'")
+    return keys, conds
+
+
+def match_template(question: str) -> Optional[TemplateMatch]:
+    """
+    질문이 KPI 템플릿 유형이면 SQL 생성 (확신할 수 없으면 None)
+
+    Returns:
+        TemplateMatch(sql, intent) - sql은 가드레일 검증 전 원본 (LIMIT/세미콜론 없음)
+    """
+    compact = _compact(question)
+    if _COMPARISON_RE.search(compact):
+        return None
+    consumer = _Consumer(compact)
+
+    # 1. 상위 N (차원 단어를 포함하므로 그룹/이름보다 먼저)
+    top: Optional[Tuple[int, bool, Optional[str]]] = None  # (N, 내림차순, 차원)
+    for m in consumer.take(_TOP_RE):
+        top = (int(m.group(2)), m.group(1) in ("상위", "top"), _DIMENSION_WORDS.get(m.group(3) or ""))
+    for m in consumer.take(_TOP_BIG_RE):
+        top = (int(m.group(1)), True, _DIMENSION_WORDS[m.group(2)])
+    for m in consumer.take(_BEST_RE):
+        top = (1, True, _DIMENSION_WORDS[m.group(1)])
+    if top is not None and top[0] == 0:
+        return None
+
+    # 2. 지점/상품 이름 (긴 별칭부터)
+    branches = [_branch_names[m.group()] for m in consumer.take(_branch_re)] if _branch_re else []
+    products = [_product_names[m.group()] for m in consumer.take(_product_re)] if _product_re else []
+
+    # 3. 그룹, 기간, 지표
+    groups = [(key, select, group_by, is_time) for pattern, key, select, group_by, is_time in GROUPS if consumer.take(pattern)]
+    period_keys, conds = _absolute_period(consumer)
+    for pattern, key, cond in PERIODS:
+        if consumer.take(pattern):
+            period_keys.append(key)
+            conds.append(cond)
+    found = []  # (질문 내 위치, 키, SELECT 식) - 질문에 나온 순서대로 컬럼 배치
+    for pattern, key, select in METRICS:
+        matches = consumer.take(pattern)
+        if matches:
+            found.append((matches[0].start(), key, select))
+    metrics = [(key, select) for _, key, select in sorted(found)]
+
+    # 모르는 말이 남았거나 구성이 애매하면 LLM으로
+    leftovers = consumer.leftovers()
+    if leftovers or not metrics or len(period_keys) > 1:
+        if metrics:
+            logger.debug(f"KPI 템플릿 불일치 - 남은 말: {leftovers}, 기간: {period_keys}")
+        return None
+
+    group_keys = [g[0] for g in groups]
+    if top is not None:
+        dimension = top[2] or next((k for k in group_keys if k in ("branch", "product")), None)
+        if dimension is None:
+            return None
+        if dimension not in group_keys:
+            groups.insert(0, next(
+                (key, select, group_by, is_time) for _, key, select, group_by, is_time in GROUPS if key == dimension
+            ))
+    # 여러 이름을 물으면 이름별로 나눠 보여줌
+    for names, key in ((branches, "branch"), (products, "product")):
+        if len(set(names)) > 1 and key not in [g[0] for g in groups]:
+            groups.append(next((k, s, g, t) for _, k, s, g, t in GROUPS if k == key))
+    if len(groups) > 2:
+        return None
+
+    group_keys = [g[0] for g in groups]
+    needs_branch = branches or any(k in ("branch", "region") for k in group_keys)
+    needs_product = products or any(k in ("product", "category") for k in group_keys)
+
+    select = [g[1] for g in groups] + [m[1] for m in metrics]
+    lines = [f"SELECT {', '.join(select)}", "FROM fact_loan_sales f"]
+    if needs_branch:
+        lines.append("JOIN dim_branch b ON f.branch_id = b.branch_id")
+    if needs_product:
+        lines.append("JOIN dim_product p ON f.product_id = p.product_id")
+
+    where = list(conds)
+    for names, column in ((branches, "b.branch_name"), (products, "p.product_name")):
+        unique = list(dict.fromkeys(names))
+        if len(unique) == 1:
+            where.append(f"{column} = {_quote(unique[0])}")
+        elif unique:
+            where.append(f"{column} IN ({', '.join(_quote(n) for n in unique)})")
+    if where:
+        lines.append("WHERE " + "\n  AND ".join(where))
+    if groups:
+        lines.append("GROUP BY " + ", ".join(g[2] for g in groups))
+
+    first_metric = metrics[0][1].rsplit(" AS ", 1)[1]
+    time_groups = [g for g in groups if g[3]]
+    if top is not None:
+        lines.append(f"ORDER BY {first_metric} {'DESC' if top[1] else 'ASC'}")
+        lines.append(f"LIMIT {top[0]}")
+    elif time_groups:
+        lines.append("ORDER BY " + ", ".join(g[2] for g in groups))
+    elif groups:
+        lines.append(f"ORDER BY {first_metric} DESC")
+
+    intent = "+".join(
+        [m[0] for m in metrics] + group_keys + period_keys
+        + (["branch_filter"] if branches else []) + (["product_filter"] if products else [])
+        + (["top"] if top is not None else [])
+    )
+    return TemplateMatch("\n".join(lines), intent)
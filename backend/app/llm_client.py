@@ -1,110 +1,380 @@
 """LLM 클라이언트 - OpenAI/Anthropic 지원"""
 
-import os
 import json
+import time
+import asyncio
 import logging
-from typing import Optional
+import threading
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Union
+
+import httpx
+
+from app import metrics
+from app.settings import get_settings
+from app.sql_prompt import SqlPrompt
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "You are a SQL expert. Generate ONLY the SQL query without any explanation, markdown formatting, or additional text. Return pure SQL only."
+
+# API 키가 없을 때 반환하는 샘플 SQL
+SAMPLE_SQL = "SELECT COUNT(*) as total FROM fact_loan_sales;"
+
+# 제공자 클라이언트 레지스트리 (프로세스당 한 번 생성)
+_clients: Dict[str, "ProviderClients"] = {}
+_clients_lock = threading.Lock()
+
+# 현재 호출에서 TCP/TLS 연결에 쓴 시간 (httpcore trace로 수집)
+_handshake_seconds: ContextVar[Optional[List[float]]] = ContextVar("llm_handshake_seconds", default=None)
+
+_CONNECT_EVENTS = ("connection.connect_tcp", "connection.start_tls")
+
+
+class ProviderClients:
+    """
+    한 LLM 제공자의 장수(long-lived) 클라이언트 묶음
+
+    sync/async SDK 클라이언트가 각각 keep-alive 커넥션 풀을 가진 httpx 클라이언트를
+    공유하므로 질문마다 TLS 핸드셰이크를 다시 하지 않습니다.
+    """
+
+    def __init__(self, provider: str, api_key: str):
+        settings = get_settings()
+        self.provider = provider
+        self.last_used = 0.0
+
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS,
+        )
+        timeout = httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=settings.LLM_CONNECT_TIMEOUT_SECONDS)
+        http_client = httpx.Client(
+            transport=_TracingTransport(httpx.HTTPTransport(limits=limits)),
+            timeout=timeout,
+        )
+        async_http_client = httpx.AsyncClient(
+            transport=_AsyncTracingTransport(httpx.AsyncHTTPTransport(limits=limits)),
+            timeout=timeout,
+        )
+
+        self._async_http_client = async_http_client
+
+        if provider == "openai":
+            from openai import OpenAI, AsyncOpenAI
+            self.client = OpenAI(api_key=api_key, http_client=http_client)
+            self.async_client = AsyncOpenAI(api_key=api_key, http_client=async_http_client)
+        elif provider == "anthropic":
+            from anthropic import Anthropic, AsyncAnthropic
+            self.client = Anthropic(api_key=api_key, http_client=http_client)
+            self.async_client = AsyncAnthropic(api_key=api_key, http_client=async_http_client)
+        else:
+            raise ValueError(f"지원하지 않는 LLM 제공자: {provider}")
+
+    async def warmup(self) -> float:
+        """
+        API 호스트에 미리 연결하여 keep-alive 커넥션을 만들어 둠
+
+        응답 코드와 무관하게 TCP/TLS 연결만 확보하면 되므로 base_url에 GET을 보냅니다.
+
+        Returns:
+            핸드셰이크에 걸린 시간 (초)
+        """
+        holder: List[float] = []
+        token = _handshake_seconds.set(holder)
+        try:
+            await self._async_http_client.get(str(self.async_client.base_url))
+        finally:
+            _handshake_seconds.reset(token)
+        self.last_used = time.monotonic()
+        handshake = sum(holder)
+        metrics.observe("llm.warmup.handshake", handshake)
+        return handshake
+
+    async def aclose(self) -> None:
+        """커넥션 풀 종료"""
+        self.client.close()
+        await self.async_client.close()
+
+
+class _TracingTransport(httpx.BaseTransport):
+    """요청마다 httpcore trace 콜백을 붙여 연결 시간을 수집하는 transport"""
+
+    def __init__(self, inner: httpx.BaseTransport):
+        self._inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _trace
+        return self._inner.handle_request(request)
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class _AsyncTracingTransport(httpx.AsyncBaseTransport):
+    """_TracingTransport의 비동기 버전"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _async_trace
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+_trace_started: ContextVar[float] = ContextVar("llm_trace_started", default=0.0)
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    """TCP 연결/TLS 핸드셰이크 구간 시간을 현재 호출에 누적"""
+    holder = _handshake_seconds.get()
+    if holder is None or not event_name.startswith(_CONNECT_EVENTS):
+        return
+    if event_name.endswith(".started"):
+        _trace_started.set(time.perf_counter())
+    elif event_name.endswith(".complete"):
+        holder.append(time.perf_counter() - _trace_started.get())
+
+
+async def _async_trace(event_name: str, info: Dict[str, Any]) -> None:
+    _trace(event_name, info)
+
+
+def get_provider_clients() -> Optional[ProviderClients]:
+    """설정된 제공자의 클라이언트 가져오기 (최초 호출 시 생성, API 키 없으면 None)"""
+    settings = get_settings()
+    provider = settings.LLM_PROVIDER.lower()
+
+    if not settings.LLM_API_KEY:
+        return None
+
+    clients = _clients.get(provider)
+    if clients is None:
+        with _clients_lock:
+            clients = _clients.get(provider)
+            if clients is None:
+                clients = _clients[provider] = ProviderClients(provider, settings.LLM_API_KEY)
+                logger.info(f"LLM 클라이언트 생성 ({provider})")
+    return clients
+
+
+async def warmup_llm_clients() -> None:
+    """시작 시 LLM 제공자에 미리 연결 (실패해도 무시)"""
+    try:
+        clients = get_provider_clients()
+        if clients is None:
+            return
+        handshake = await clients.warmup()
+        logger.info(f"LLM 커넥션 워밍업 완료 ({clients.provider}, 핸드셰이크 {handshake * 1000:.0f}ms)")
+    except Exception as e:
+        logger.warning(f"LLM 커넥션 워밍업 실패 (무시): {e}")
+
+
+async def keep_llm_connections_warm() -> None:
+    """
+    유휴 시간이 LLM_WARMUP_INTERVAL_SECONDS를 넘으면 커넥션을 다시 데움
+
+    keep-alive 커넥션이 만료된 뒤 첫 질문이 핸드셰이크 비용을 내지 않도록
+    백그라운드 태스크로 실행합니다.
+    """
+    interval = get_settings().LLM_WARMUP_INTERVAL_SECONDS
+    if interval <= 0:
+        return
+
+    while True:
+        await asyncio.sleep(interval)
+        clients = _clients.get(get_settings().LLM_PROVIDER.lower())
+        if clients is not None and time.monotonic() - clients.last_used >= interval:
+            await warmup_llm_clients()
+
+
+async def close_llm_clients() -> None:
+    """모든 제공자 클라이언트 종료"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        try:
+            await c.aclose()
+        except Exception as e:
+            logger.warning(f"LLM 클라이언트 종료 실패: {e}")
 
-def generate_sql(prompt: str) -> str:
+
+def generate_sql(prompt: Union[str, SqlPrompt]) -> str:
     """
     LLM을 호출하여 자연어 질문을 SQL로 변환
-    
+
     Args:
-        prompt: SQL 생성 프롬프트 (스키마 정보 + 사용자 질문)
-        
+        prompt: SQL 생성 프롬프트 (스키마 정보 + 사용자 질문, SqlPrompt면 정적 프리픽스를 system으로)
+
     Returns:
         생성된 SQL 쿼리문
     """
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
-    api_key = os.getenv("LLM_API_KEY")
-    
-    if not api_key:
-        logger.warning("LLM_API_KEY가 설정되지 않음 - 샘플 SQL 반환")
-        return "SELECT COUNT(*) as total FROM fact_loan_sales;"
-    
-    if provider == "openai":
-        return _generate_with_openai(prompt, api_key)
-    elif provider == "anthropic":
-        return _generate_with_anthropic(prompt, api_key)
-    else:
-        raise ValueError(f"지원하지 않는 LLM 제공자: {provider}")
+    clients = get_provider_clients()
 
+    if clients is None:
+        logger.warning("LLM_API_KEY가 설정되지 않음 - 샘플 SQL 반환")
+        return SAMPLE_SQL
 
-def _generate_with_openai(prompt: str, api_key: str) -> str:
-    """OpenAI API를 사용한 SQL 생성"""
+    holder: List[float] = []
+    token = _handshake_seconds.set(holder)
+    start = time.perf_counter()
     try:
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=api_key)
-        model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a SQL expert. Generate ONLY the SQL query without any explanation, markdown formatting, or additional text. Return pure SQL only."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
-        
-        sql = response.choices[0].message.content.strip()
-        
-        # 마크다운 코드 블록 제거
-        sql = sql.replace("```sql", "").replace("```", "").strip()
-        
-        logger.info(f"OpenAI로 생성된 SQL: {sql[:100]}...")
-        return sql
-        
-    except ImportError:
-        logger.error("openai 패키지가 설치되지 않음")
-        raise
+        if clients.provider == "openai":
+            response = clients.client.chat.completions.create(**_openai_request(prompt))
+        else:
+            response = clients.client.messages.create(**_anthropic_request(prompt))
     except Exception as e:
-        logger.error(f"OpenAI API 호출 실패: {e}")
+        logger.error(f"{clients.provider} API 호출 실패: {e}")
         raise
+    finally:
+        _handshake_seconds.reset(token)
 
+    return _finish(clients, response, time.perf_counter() - start, sum(holder))
 
-def _generate_with_anthropic(prompt: str, api_key: str) -> str:
-    """Anthropic Claude API를 사용한 SQL 생성"""
+
+async def generate_sql_async(prompt: Union[str, SqlPrompt]) -> str:
+    """
+    generate_sql의 비동기 버전 (AsyncOpenAI / AsyncAnthropic 사용)
+
+    Args:
+        prompt: SQL 생성 프롬프트 (스키마 정보 + 사용자 질문, SqlPrompt면 정적 프리픽스를 system으로)
+
+    Returns:
+        생성된 SQL 쿼리문
+    """
+    clients = get_provider_clients()
+
+    if clients is None:
+        logger.warning("LLM_API_KEY가 설정되지 않음 - 샘플 SQL 반환")
+        return SAMPLE_SQL
+
+    holder: List[float] = []
+    token = _handshake_seconds.set(holder)
+    start = time.perf_counter()
     try:
-        from anthropic import Anthropic
-        
-        client = Anthropic(api_key=api_key)
-        model = os.getenv("LLM_MODEL", "claude-3-5-sonnet-20241022")
-        
-        response = client.messages.create(
-            model=model,
-            max_tokens=500,
-            temperature=0.1,
-            system="You are a SQL expert. Generate ONLY the SQL query without any explanation, markdown formatting, or additional text. Return pure SQL only.",
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        
-        sql = response.content[0].text.strip()
-        
-        # 마크다운 코드 블록 제거
-        sql = sql.replace("```sql", "").replace("```", "").strip()
-        
-        logger.info(f"Anthropic로 생성된 SQL: {sql[:100]}...")
-        return sql
-        
-    except ImportError:
-        logger.error("anthropic 패키지가 설치되지 않음")
-        raise
+        if clients.provider == "openai":
+            response = await clients.async_client.chat.completions.create(**_openai_request(prompt))
+        else:
+            response = await clients.async_client.messages.create(**_anthropic_request(prompt))
     except Exception as e:
-        logger.error(f"Anthropic API 호출 실패: {e}")
+        logger.error(f"{clients.provider} API 호출 실패: {e}")
         raise
+    finally:
+        _handshake_seconds.reset(token)
+
+    return _finish(clients, response, time.perf_counter() - start, sum(holder))
+
+
+def _finish(clients: ProviderClients, response, elapsed: float, handshake: float) -> str:
+    """응답에서 SQL 추출 및 핸드셰이크/생성 시간 기록"""
+    clients.last_used = time.monotonic()
+    generation = elapsed - handshake
+
+    metrics.increment(f"llm.{clients.provider}.calls")
+    metrics.observe("llm.generation", generation)
+    if handshake > 0:
+        metrics.increment("llm.cold_connections")
+        metrics.observe("llm.handshake", handshake)
+
+    _record_usage(clients.provider, getattr(response, "usage", None))
+
+    if clients.provider == "openai":
+        sql = _clean_sql(response.choices[0].message.content)
+    else:
+        sql = _clean_sql(response.content[0].text)
+
+    logger.info(
+        f"{clients.provider}로 생성된 SQL (핸드셰이크 {handshake * 1000:.0f}ms, "
+        f"생성 {generation * 1000:.0f}ms): {sql[:100]}..."
+    )
+    return sql
+
+
+def _record_usage(provider: str, usage) -> None:
+    """
+    제공자가 보고한 입력/캐시/출력 토큰 수 기록 (llm.tokens.input/cached/output)
+
+    OpenAI: prompt_tokens에 캐시 적중분(prompt_tokens_details.cached_tokens)이 포함됨
+    Anthropic: input_tokens는 캐시 밖 부분만, 캐시 적중/기록분은 따로 보고됨
+    """
+    if usage is None:
+        return
+    if provider == "openai":
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        total_input = usage.prompt_tokens or 0
+        output = usage.completion_tokens or 0
+    else:
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        total_input = (usage.input_tokens or 0) + cached + written
+        output = usage.output_tokens or 0
+
+    metrics.increment("llm.tokens.input", total_input)
+    metrics.increment("llm.tokens.cached", cached)
+    metrics.increment("llm.tokens.output", output)
+    logger.info(f"{provider} 토큰: 입력 {total_input} (캐시 적중 {cached}), 출력 {output}")
+
+
+def _split_prompt(prompt: Union[str, SqlPrompt]):
+    """(system 텍스트, user 텍스트) - SqlPrompt의 정적 프리픽스는 system 메시지 뒤에 붙임"""
+    if isinstance(prompt, SqlPrompt):
+        return f"{SYSTEM_PROMPT}\n\n{prompt.static}", prompt.dynamic
+    return SYSTEM_PROMPT, prompt
+
+
+def _clean_sql(text: str) -> str:
+    """LLM 응답에서 마크다운 코드 블록 제거"""
+    return text.strip().replace("```sql", "").replace("```", "").strip()
+
+
+def _openai_request(prompt: Union[str, SqlPrompt]) -> dict:
+    """OpenAI chat.completions 요청 파라미터 (system 메시지가 같으면 자동 프리픽스 캐시 적중)"""
+    settings = get_settings()
+    system, user = _split_prompt(prompt)
+    return {
+        "model": settings.LLM_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": system
+            },
+            {
+                "role": "user",
+                "content": user
+            }
+        ],
+        "temperature": 0.1,
+        "max_tokens": 500,
+        "timeout": settings.LLM_TIMEOUT_SECONDS,
+    }
+
+
+def _anthropic_request(prompt: Union[str, SqlPrompt]) -> dict:
+    """Anthropic messages 요청 파라미터 (system 블록에 cache_control 지정)"""
+    settings = get_settings()
+    system, user = _split_prompt(prompt)
+    return {
+        "model": settings.LLM_MODEL,
+        "max_tokens": 500,
+        "temperature": 0.1,
+        "system": [
+            {
+                "type": "text",
+                "text": system,
+                "cache_control": {"type": "ephemeral"}
+            }
+        ],
+        "messages": [
+            {
+                "role": "user",
+                "content": user
+            }
+        ],
+        "timeout": settings.LLM_TIMEOUT_SECONDS,
+    }
@@ -1,20 +1,53 @@
 """FastAPI 메인 애플리케이션"""
 
+import asyncio
+import hmac
 import logging
-from fastapi import FastAPI, HTTPException
+import time
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Literal, Tuple
 from app.settings import get_settings
+from app import metrics
+from app.question_cache import get_question_cache, normalize_question
+from app.result_cache import get_result_cache, get_data_version
+from app.query_planner import get_query_planner, summarize_plan, QueryPlan, QueryRejected
+from app.query_log import get_query_log, close_query_log
+from app.fingerprint import fingerprint_sql
+from app.rollup_rewrite import ROLLUPS, rewrite_for_rollup, set_available_rollups
+from app.kpi_templates import match_template, set_dimension_names
+from app.single_flight import SingleFlight
+from app.hedge import Hedger
+from app.json_response import dumps, json_response
 
 # 조건부 import (파일 존재 여부에 따라)
 try:
-    from app.db import test_db_connection, run_query
-    from app.llm_client import generate_sql
-    from app.vanna_client import generate_sql_with_vanna
+    from app.db import (
+        test_db_connection,
+        run_query_async,
+        stream_query_async,
+        explain_query_async,
+        close_pool,
+        pool_stats,
+        existing_tables,
+        dimension_names,
+        QueryResult,
+    )
+    from app.llm_client import (
+        generate_sql_async,
+        warmup_llm_clients,
+        keep_llm_connections_warm,
+        close_llm_clients,
+    )
+    from app.vanna_client import generate_sql_with_vanna_async, warmup_vanna, is_vanna_warm, get_vanna_state
     from app.sql_prompt import build_prompt
-    from app.guardrails import validate_and_rewrite
+    from app.guardrails import validate_and_rewrite, verdict_cache_stats
     from app.chart_utils import generate_chart_data
+    from app.ingest import IngestError, detect_format, ingest_sales_async
+    from app.ingest import close_pool as close_ingest_pool, pool_stats as ingest_pool_stats, keep_sales_partitions
+    from app.index_advisor import advise_shape, scans_fact_table
     LLM_ENABLED = True
     VANNA_ENABLED = True
 except ImportError as e:
@@ -22,12 +55,40 @@ except ImportError as e:
     LLM_ENABLED = False
     VANNA_ENABLED = False
     def test_db_connection(): return False
-    def run_query(sql): return [], []
-    def generate_sql(prompt): return "SELECT 1;"
-    def generate_sql_with_vanna(question): return None
+    from typing import NamedTuple
+    class QueryResult(NamedTuple):
+        columns: List[str]
+        rows: List[Dict[str, Any]]
+        truncated: bool = False
+        column_types: Optional[List[str]] = None
+    async def run_query_async(sql, timeout=10, row_format="dict", max_rows=None): return QueryResult([], [])
+    async def stream_query_async(sql, timeout=10, row_format="dict", max_rows=None):
+        yield QueryResult([], [])
+    async def explain_query_async(sql): return {}
+    def close_pool(): return None
+    def pool_stats(): return {}
+    def existing_tables(names): return []
+    def dimension_names(): return [], [], []
+    async def generate_sql_async(prompt): return "SELECT 1;"
+    async def warmup_llm_clients(): return None
+    async def keep_llm_connections_warm(): return None
+    async def close_llm_clients(): return None
+    async def generate_sql_with_vanna_async(question): return None
+    async def warmup_vanna(): return None
+    def is_vanna_warm(): return True
+    def get_vanna_state(): return "unavailable"
     def build_prompt(q): return q
     def validate_and_rewrite(sql): return sql
-    def generate_chart_data(cols, rows): return None
+    def verdict_cache_stats(): return {}
+    def generate_chart_data(cols, rows, column_types=None): return None
+    class IngestError(Exception): status_code = 422
+    def detect_format(content_type): return None
+    ingest_sales_async = None
+    def close_ingest_pool(): return None
+    def ingest_pool_stats(): return {}
+    async def keep_sales_partitions(): return None
+    advise_shape = None
+    def scans_fact_table(shape): return False
 
 # 로깅 설정
 logging.basicConfig(
@@ -58,9 +119,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 백그라운드 태스크 (GC 방지용 참조 보관)
+_background_tasks = set()
+
+# 동시에 들어온 같은 질문(SQL 생성)과 같은 SQL(실행)은 한 번만 처리
+_question_flights = SingleFlight("question")
+_query_flights = SingleFlight("query")
+# Vanna(주)가 늦으면 기본 LLM(보조)을 같이 시작
+_sql_hedger = Hedger("sql_hedge", fixed_delay=settings.SQL_HEDGE_DELAY_SECONDS)
+
+
+def _spawn(coro) -> None:
+    """백그라운드 태스크 실행"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 # 요청/응답 모델
 class ChatRequest(BaseModel):
     question: str
+    # rows: 행마다 {컬럼: 값} (기본), columnar: 컬럼별 값 배열 + 타입 정보
+    format: Literal["rows", "columnar"] = "rows"
 
 class ChatResponse(BaseModel):
     answer: str
@@ -68,6 +147,10 @@ class ChatResponse(BaseModel):
     columns: Optional[List[str]] = None
     rows: Optional[List[Dict[str, Any]]] = None
     chart_data: Optional[Dict[str, Any]] = None
+    truncated: bool = False  # 결과가 행 수/크기 제한으로 잘렸는지 여부
+    format: str = "rows"
+    column_types: Optional[List[str]] = None  # 'integer', 'number', 'date', 'text' 등
+    column_values: Optional[List[List[Any]]] = None  # format=columnar일 때 columns 순서의 값 배열
 
 # 라우트
 
@@ -78,31 +161,306 @@ async def startup_event():
     settings = get_settings()
     logger.info(f"CORS Origins: {settings.CORS_ORIGINS}")
 
+    # LLM 커넥션 미리 연결 (시작을 막지 않도록 백그라운드 실행)
+    _spawn(warmup_llm_clients())
+    _spawn(keep_llm_connections_warm())
+
+    # Vanna 초기화/학습 (끝날 때까지 /health의 ready는 false)
+    _spawn(warmup_vanna())
+
+    # 월 파티션 레이아웃이면 앞으로 쓸 월 파티션을 미리 생성 (하루마다)
+    _spawn(keep_sales_partitions())
+
+    # 이전 실행의 쿼리 기록 복원 (파일 읽기는 워커에서)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_query_log)
+
     # DB 연결 테스트(무시해도 됨 - 오류가 있어도 계속 시작됨)
     try:
-        db_ok = test_db_connection()
+        db_ok = await loop.run_in_executor(None, test_db_connection)
         if db_ok:
             logger.info("✅ 데이터베이스 연결 성공")
+            # 롤업 테이블이 있으면 집계 쿼리를 롤업으로 재작성
+            if settings.ROLLUP_REWRITE_ENABLED:
+                tables = await loop.run_in_executor(None, existing_tables, [r.table for r in ROLLUPS])
+                set_available_rollups(tables)
+            # KPI 템플릿/질문 캐시가 질문의 지점/상품/지역 이름을 알아볼 수 있도록 등록
+            set_dimension_names(*await loop.run_in_executor(None, dimension_names))
         else:
             logger.warning("⚠️ 데이터베이스 연결 실패 - LLM SQL 생성만 사용 가능")
     except Exception as e:
         logger.warning(f"⚠️ 데이터베이스 연결 실패 - LLM SQL 생성만 사용 가능: {str(e)[:100]}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 리소스 정리"""
+    for task in list(_background_tasks):
+        task.cancel()
+    await close_llm_clients()
+
+    # 진행 중인 쿼리가 끝나길 기다린 뒤 DB 커넥션 정리 (블로킹이므로 워커에서 실행)
+    await asyncio.get_running_loop().run_in_executor(None, close_pool)
+    await asyncio.get_running_loop().run_in_executor(None, close_ingest_pool)
+    await asyncio.get_running_loop().run_in_executor(None, close_query_log)
+
 @app.get("/health")
 async def health_check():
-    """상태 체크 엔드포인트"""
-    return {"ok": True}
+    """상태 체크 엔드포인트 (ok: 프로세스 생존, ready: 워밍업 완료)"""
+    return {"ok": True, "ready": is_vanna_warm(), "vanna": get_vanna_state()}
+
+@app.get("/metrics")
+async def get_metrics():
+    """메트릭 엔드포인트 (카운터 및 단계별 지연시간)"""
+    return {
+        **metrics.snapshot(),
+        "question_cache": get_question_cache().stats(),
+        "result_cache": get_result_cache().stats(),
+        "guardrails": verdict_cache_stats(),
+        "query_planner": get_query_planner().stats(),
+        "query_log": get_query_log().stats(),
+        "db_pool": pool_stats(),
+        "ingest_pool": ingest_pool_stats(),
+        "single_flight": {"question": _question_flights.stats(), "query": _query_flights.stats()},
+        "sql_hedge": _sql_hedger.stats(),
+    }
+
+def _record_sql_source(source: str, start: float) -> None:
+    """SQL을 얻은 경로(template/cache/vanna/llm)별 건수와 지연시간 기록"""
+    metrics.increment(f"sql_source.{source}")
+    metrics.observe(f"sql_source.{source}", time.perf_counter() - start)
+
+async def resolve_sql(question: str) -> str:
+    """
+    질문에 대한 검증된 SQL 반환
+
+    정규화한 질문이 같은 요청이 이미 SQL을 만드는 중이면 그 결과(또는 오류)를 같이 받습니다.
+    """
+    key = normalize_question(question) or question
+    return await _question_flights.do(key, lambda: _resolve_sql(question))
+
+async def _resolve_sql(question: str) -> str:
+    """
+    질문에 대한 검증된 SQL 생성
+
+    Flow:
+    1. KPI 템플릿 매칭 (자주 묻는 유형이면 LLM 없이 바로 SQL 생성)
+    2. 질문 캐시 조회 (적중 시 바로 반환)
+    3. Vanna로 SQL 생성, 실패 시 기본 LLM 사용 (Vanna가 늦으면 기본 LLM도 동시에 시작)
+    4. Guardrails 검증 후 캐시에 저장 (템플릿 SQL은 캐시하지 않음)
 
-@app.post("/chat")
-async def chat(request: ChatRequest):
+    Raises:
+        HTTPException: SQL 생성 실패(500) 또는 검증 실패(400)
+    """
+    start = time.perf_counter()
+    template = match_template(question)
+    cache = get_question_cache()
+    if template is not None:
+        source = "template"
+        logger.info(f"KPI 템플릿 적중 ({template.intent})")
+        safe_sql = _validate_sql(template.sql)
+    else:
+        cached_sql = cache.get(question)
+        if cached_sql:
+            _record_sql_source("cache", start)
+            logger.info(f"캐시된 SQL: {cached_sql}")
+            return cached_sql
+
+        logger.info("SQL 생성 중...")
+        source, safe_sql = await _generate_sql(question)
+
+    _record_sql_source(source, start)
+    if source != "template":
+        cache.put(question, safe_sql)
+    return safe_sql
+
+def _validate_sql(raw_sql: Optional[str]) -> str:
+    """
+    Guardrails 검증
+
+    Raises:
+        HTTPException: SQL이 비어 있음(500) 또는 검증 실패(400)
+    """
+    if not raw_sql:
+        raise HTTPException(
+            status_code=500,
+            detail="SQL 생성에 실패했습니다"
+        )
+    try:
+        with metrics.timer("stage.guardrails"):
+            safe_sql = validate_and_rewrite(raw_sql)
+            fp = fingerprint_sql(safe_sql)
+        logger.info(f"검증된 SQL [{fp.fingerprint}, 파라미터 {len(fp.params)}개]: {safe_sql}")
+    except ValueError as e:
+        logger.error(f"SQL 검증 실패: {e}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"생성된 SQL이 안전하지 않습니다: {str(e)}"
+        )
+    return safe_sql
+
+async def _generate_sql(question: str) -> Tuple[str, str]:
+    """
+    LLM으로 SQL 생성 후 검증 (Vanna 우선 시도)
+
+    Vanna가 delay 안에 답하지 않으면 기본 LLM을 같이 시작하고, 먼저 검증을 통과한
+    SQL을 사용합니다. 각 경로는 SQL이 비었거나 검증에 실패하면 실패로 봅니다.
+
+    Returns:
+        (경로 "vanna" | "llm", 검증된 SQL)
+    """
+    async def vanna_path() -> str:
+        with metrics.timer("stage.vanna"):
+            raw_sql = await generate_sql_with_vanna_async(question)
+        if raw_sql:
+            logger.info(f"Vanna로 생성된 SQL: {raw_sql[:100]}...")
+        return _validate_sql(raw_sql)
+
+    async def llm_path() -> str:
+        with metrics.timer("stage.llm"):
+            prompt = build_prompt(question)
+            raw_sql = await generate_sql_async(prompt)
+        logger.info(f"기본 LLM으로 생성된 SQL: {raw_sql[:100] if raw_sql else raw_sql}...")
+        return _validate_sql(raw_sql)
+
+    if not VANNA_ENABLED:
+        return "llm", await llm_path()
+    if not settings.SQL_HEDGE_ENABLED:
+        try:
+            return "vanna", await vanna_path()
+        except Exception as e:
+            logger.warning(f"Vanna 실패, 기본 LLM으로 대체: {e}")
+            return "llm", await llm_path()
+
+    outcome = await _sql_hedger.run("vanna", vanna_path, "llm", llm_path)
+    return outcome.winner, outcome.value
+
+async def plan_sql(safe_sql: str) -> QueryPlan:
+    """
+    실행 전 EXPLAIN으로 비용 점검 후 쿼리별 타임아웃/최대 행 수 결정
+
+    Raises:
+        QueryRejected: 추정 비용/행 수가 한도를 넘는 경우 (실행하지 않음)
+    """
+    with metrics.timer("query_plan.explain"):
+        plan = await explain_query_async(safe_sql)
+    summary = summarize_plan(plan)
+    decision = get_query_planner().decide(safe_sql, summary)
+    logger.info(
+        f"실행 계획 [{fingerprint_sql(safe_sql).fingerprint}]: 비용 {summary.total_cost:,.0f}, 예상 {summary.plan_rows}행, "
+        f"타임아웃 {decision.timeout:.1f}초{' (down-scope)' if decision.downscoped else ''}"
+    )
+    return decision
+
+def record_execution(
+    exec_sql: str, plan: QueryPlan, seconds: float, rows: int = 0, truncated: bool = False, status: str = "ok"
+) -> None:
+    """실행 결과 기록 - 타임아웃 보정용 실행 시간(오류 제외)과 실행 쿼리 기록(/admin/queries)"""
+    if status != "error":
+        get_query_planner().record(exec_sql, plan.cost, seconds)
+    get_query_log().record(exec_sql, plan, seconds, rows, truncated, status)
+
+async def execute_sql(safe_sql: str):
+    """
+    검증된 SQL 실행 (결과 캐시 적중 시 DB 조회 생략)
+
+    팩트 테이블 집계는 롤업 테이블로 재작성해 실행합니다 (캐시 키와 응답의 SQL은 원래 SQL).
+
+    Returns:
+        QueryResult(columns, 행 튜플 리스트, truncated, column_types)
+
+    Raises:
+        QueryRejected: 비용 점검에서 거부된 경우
+        TimeoutError: 쿼리별 타임아웃 초과
+    """
+    cache = get_result_cache()
+    cached = cache.get(safe_sql)
+    if cached is not None:
+        logger.info("결과 캐시 적중")
+        return QueryResult(*cached)
+
+    # 같은 SQL이 실행 중이면 그 결과를 같이 받음
+    return await _query_flights.do(safe_sql, lambda: _execute_uncached(safe_sql))
+
+async def _execute_uncached(safe_sql: str):
+    """EXPLAIN 점검 → 실행 → 결과 캐시 저장"""
+    cache = get_result_cache()
+    exec_sql = rewrite_for_rollup(safe_sql)
+    plan = await plan_sql(exec_sql)
+    data_version = get_data_version()
+    start = time.perf_counter()
+    try:
+        with metrics.timer("stage.db"):
+            result = await run_query_async(exec_sql, plan.timeout, row_format="tuple", max_rows=plan.max_rows)
+    except TimeoutError:
+        record_execution(exec_sql, plan, plan.timeout, status="timeout")
+        raise
+    except Exception:
+        record_execution(exec_sql, plan, time.perf_counter() - start, status="error")
+        raise
+    record_execution(exec_sql, plan, time.perf_counter() - start, len(result.rows), result.truncated)
+    cache.put(
+        safe_sql, result.columns, result.rows, result.truncated,
+        data_version=data_version, column_types=result.column_types,
+    )
+    return result
+
+def build_answer(columns: List[str], rows: List[tuple], truncated: bool) -> str:
+    """쿼리 결과로 자연어 답변 생성"""
+    row_count = len(rows)
+    col_count = len(columns)
+    
+    if row_count == 0:
+        answer = "조회된 데이터가 없습니다."
+    elif row_count == 1 and col_count == 1:
+        # 단일 값 결과 (예: COUNT)
+        value = rows[0][0]
+        answer = f"결과: {value}"
+    else:
+        answer = f"총 {row_count}개의 데이터를 조회했습니다.\n컬럼: {', '.join(columns)}"
+
+    if truncated:
+        answer += f"\n(결과가 많아 처음 {row_count}개 행만 표시합니다)"
+    return answer
+
+def build_chart(
+    columns: List[str], rows: List[tuple], column_types: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """차트 데이터 생성 (실패해도 응답은 계속)"""
+    try:
+        with metrics.timer("stage.chart"):
+            chart_data = generate_chart_data(columns, rows, column_types)
+        if chart_data:
+            logger.info(f"차트 데이터 생성 완료: {chart_data['type']}")
+        return chart_data
+    except Exception as e:
+        logger.warning(f"차트 데이터 생성 실패 (무시): {e}")
+        return None
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
     """
     채팅 엔드포인트 - Text-to-SQL 기반 질의응답
+
+    응답은 서버가 만든 값이므로 재검증/jsonable_encoder 없이 바로 인코딩하고,
+    크기가 크면 Accept-Encoding에 따라 zstd/gzip으로 압축합니다.
+    단계별 소요 시간은 Server-Timing 헤더로 보냅니다 (브라우저 개발자 도구에서 확인).
+    """
+    with metrics.collect_spans() as spans:
+        with metrics.timer("request.chat"):
+            response = await _chat(request)
+            encoded = json_response(dict(response), http_request.headers.get("accept-encoding"))
+    encoded.headers["Server-Timing"] = metrics.server_timing(spans)
+    return encoded
+
+async def _chat(request: ChatRequest) -> ChatResponse:
+    """
+    Text-to-SQL 질의응답 (ChatResponse는 검증 없이 model_construct로 생성)
     
     Flow:
-    1. 사용자 질문 → SQL 프롬프트 생성
+    1. KPI 템플릿 매칭 또는 질문 캐시 조회 (적중 시 2 생략)
     2. LLM 호출 → SQL 생성
-    3. Guardrails 검증 → 안전한 SQL
-    4. DB 실행 → 결과 반환
+    3. Guardrails 검증 → 안전한 SQL (집계는 롤업 테이블로 재작성)
+    4. EXPLAIN 비용 점검 (한도 초과 시 안내 메시지) → DB 실행 → 결과 반환
     5. 자연어 답변 생성
     """
     if not request.question.strip():
@@ -113,7 +471,7 @@ async def chat(request: ChatRequest):
     # LLM이 비활성화된 경우 샘플 응답
     if not LLM_ENABLED:
         logger.warning("LLM 비활성화 상태 - 샘플 응답 반환")
-        return ChatResponse(
+        return ChatResponse.model_construct(
             answer="LLM이 설정되지 않았습니다. LLM_API_KEY 환경 변수를 설정해주세요.",
             sql=None,
             columns=[],
@@ -121,53 +479,28 @@ async def chat(request: ChatRequest):
         )
     
     try:
-        # 1. SQL 프롬프트 생성
         logger.info(f"사용자 질문: {question}")
-        
-        # 2. LLM으로 SQL 생성 (Vanna 우선 시도)
-        logger.info("SQL 생성 중...")
-        raw_sql = None
-        
-        # Vanna 사용 시도
-        if VANNA_ENABLED:
-            try:
-                raw_sql = generate_sql_with_vanna(question)
-                if raw_sql:
-                    logger.info(f"Vanna로 생성된 SQL: {raw_sql[:100]}...")
-            except Exception as e:
-                logger.warning(f"Vanna 실패, 기본 LLM으로 대체: {e}")
-        
-        # Vanna 실패 시 기본 LLM 사용
-        if not raw_sql:
-            prompt = build_prompt(question)
-            raw_sql = generate_sql(prompt)
-            logger.info(f"기본 LLM으로 생성된 SQL: {raw_sql[:100]}...")
-        
-        if not raw_sql:
-            raise HTTPException(
-                status_code=500,
-                detail="SQL 생성에 실패했습니다"
-            )
-        
-        # 3. Guardrails 검증
-        try:
-            safe_sql = validate_and_rewrite(raw_sql)
-            logger.info(f"검증된 SQL: {safe_sql}")
-        except ValueError as e:
-            logger.error(f"SQL 검증 실패: {e}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"생성된 SQL이 안전하지 않습니다: {str(e)}"
-            )
+
+        # 1~3. SQL 생성 및 검증 (질문 캐시 적중 시 LLM 호출 생략)
+        safe_sql = await resolve_sql(question)
         
         # 4. DB에서 쿼리 실행
         try:
             logger.info("쿼리 실행 중...")
-            columns, rows = run_query(safe_sql)
+            columns, rows, truncated, column_types = await execute_sql(safe_sql)
             logger.info(f"결과: {len(rows)}개 행")
+        except QueryRejected as e:
+            # 비용 한도 초과 - 실행하지 않고 범위를 좁히는 방법 안내
+            logger.warning(f"쿼리 거부 (비용 점검): {e}")
+            return ChatResponse.model_construct(
+                answer=f"⚠️ {e}",
+                sql=safe_sql,
+                columns=[],
+                rows=[]
+            )
         except TimeoutError as e:
             # DB 타임아웃 - SQL은 보여주되 에러 메시지 표시
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 answer="⚠️ 쿼리 실행 시간이 초과되었습니다. 생성된 SQL을 확인해주세요.",
                 sql=safe_sql,
                 columns=[],
@@ -176,7 +509,7 @@ async def chat(request: ChatRequest):
         except Exception as e:
             logger.error(f"쿼리 실행 오류: {e}")
             # DB 연결 실패 - SQL은 보여주되 에러 메시지 표시
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 answer=f"⚠️ 데이터베이스 연결 오류가 발생했습니다.\n생성된 SQL은 확인할 수 있습니다.\n\n오류: {str(e)[:100]}",
                 sql=safe_sql,
                 columns=[],
@@ -184,34 +517,33 @@ async def chat(request: ChatRequest):
             )
         
         # 5. 답변 생성
-        row_count = len(rows)
-        col_count = len(columns)
-        
-        if row_count == 0:
-            answer = "조회된 데이터가 없습니다."
-        elif row_count == 1 and col_count == 1:
-            # 단일 값 결과 (예: COUNT)
-            value = list(rows[0].values())[0]
-            answer = f"결과: {value}"
-        else:
-            answer = f"총 {row_count}개의 데이터를 조회했습니다.\n컬럼: {', '.join(columns)}"
+        answer = build_answer(columns, rows, truncated)
         
         # 6. 차트 데이터 생성
-        chart_data = None
-        try:
-            chart_data = generate_chart_data(columns, rows)
-            if chart_data:
-                logger.info(f"차트 데이터 생성 완료: {chart_data['type']}")
-        except Exception as e:
-            logger.warning(f"차트 데이터 생성 실패 (무시): {e}")
+        chart_data = build_chart(columns, rows, column_types)
         
-        # 7. 응답 반환
-        return ChatResponse(
+        # 7. 응답 반환 (columnar: 행마다 컬럼명을 반복하지 않고 컬럼별 배열로 전달)
+        if request.format == "columnar":
+            column_values = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+            return ChatResponse.model_construct(
+                answer=answer,
+                sql=safe_sql,
+                columns=columns,
+                chart_data=chart_data,
+                truncated=truncated,
+                format="columnar",
+                column_types=column_types,
+                column_values=column_values
+            )
+
+        return ChatResponse.model_construct(
             answer=answer,
             sql=safe_sql,
             columns=columns,
-            rows=rows,
-            chart_data=chart_data
+            rows=[dict(zip(columns, row)) for row in rows],
+            chart_data=chart_data,
+            truncated=truncated,
+            column_types=column_types
         )
         
     except HTTPException:
@@ -223,6 +555,142 @@ async def chat(request: ChatRequest):
             detail=f"서버 오류가 발생했습니다: {str(e)}"
         )
 
+def _ndjson(event: str, **payload) -> bytes:
+    """NDJSON 이벤트 한 줄"""
+    return dumps({"event": event, **payload}) + b"\n"
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    스트리밍 채팅 엔드포인트 - 단계별 결과를 NDJSON 이벤트로 순서대로 전송
+
+    Events (한 줄에 하나의 JSON):
+    1. {"event": "sql", "sql": ...} - 검증된 SQL (LLM 응답 직후)
+    2. {"event": "rows", "columns": [...], "rows": [...]} - 커서에서 가져온 배치마다
+    3. {"event": "chart", "chart_data": ...} - 전체 행 기준 차트 데이터
+    4. {"event": "answer", "answer": ..., "truncated": ...} - 최종 답변
+    쿼리 실행 중 오류가 나면 {"event": "error", "detail": ...} 후 종료합니다.
+    SQL 생성/검증 실패는 /chat과 같은 HTTP 오류로 응답합니다.
+    """
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="question이 필수입니다")
+
+    question = request.question.strip()
+
+    if not LLM_ENABLED:
+        raise HTTPException(status_code=503, detail="LLM이 설정되지 않았습니다")
+
+    logger.info(f"사용자 질문 (스트리밍): {question}")
+    safe_sql = await resolve_sql(question)
+
+    async def events():
+        yield _ndjson("sql", sql=safe_sql)
+
+        columns: List[str] = []
+        rows: List[tuple] = []
+        truncated = False
+        column_types = None
+        try:
+            cache = get_result_cache()
+            cached = cache.get(safe_sql)
+            if cached is not None:
+                logger.info("결과 캐시 적중")
+                columns, rows, truncated, column_types = cached
+                yield _ndjson("rows", columns=columns, rows=[dict(zip(columns, row)) for row in rows])
+            else:
+                exec_sql = rewrite_for_rollup(safe_sql)
+                plan = await plan_sql(exec_sql)
+                data_version = get_data_version()
+                start = time.perf_counter()
+                try:
+                    async for chunk in stream_query_async(
+                        exec_sql, plan.timeout, row_format="tuple", max_rows=plan.max_rows
+                    ):
+                        columns, column_types = chunk.columns, chunk.column_types
+                        rows.extend(chunk.rows)
+                        truncated = truncated or chunk.truncated
+                        yield _ndjson("rows", columns=columns, rows=[dict(zip(columns, row)) for row in chunk.rows])
+                except TimeoutError:
+                    record_execution(exec_sql, plan, plan.timeout, len(rows), truncated, status="timeout")
+                    raise
+                except Exception:
+                    record_execution(exec_sql, plan, time.perf_counter() - start, len(rows), truncated, status="error")
+                    raise
+                record_execution(exec_sql, plan, time.perf_counter() - start, len(rows), truncated)
+                cache.put(safe_sql, columns, rows, truncated, data_version=data_version, column_types=column_types)
+        except QueryRejected as e:
+            logger.warning(f"쿼리 거부 (비용 점검): {e}")
+            yield _ndjson("error", detail=f"⚠️ {e}")
+            return
+        except TimeoutError:
+            yield _ndjson("error", detail="⚠️ 쿼리 실행 시간이 초과되었습니다. 생성된 SQL을 확인해주세요.")
+            return
+        except Exception as e:
+            logger.error(f"쿼리 실행 오류: {e}")
+            yield _ndjson("error", detail=f"⚠️ 데이터베이스 연결 오류가 발생했습니다.\n\n오류: {str(e)[:100]}")
+            return
+
+        yield _ndjson("chart", chart_data=build_chart(columns, rows, column_types))
+        yield _ndjson("answer", answer=build_answer(columns, rows, truncated), truncated=truncated)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _check_api_key(http_request: Request, expected: str, label: str, setting: str, metric: str) -> None:
+    """API 키 확인 (Authorization: Bearer <키> 또는 X-API-Key, 설정된 키가 없으면 404)"""
+    if not expected:
+        raise HTTPException(status_code=404, detail=f"{label} API가 비활성화되어 있습니다 ({setting})")
+    authorization = http_request.headers.get("authorization", "")
+    provided = authorization[7:] if authorization[:7].lower() == "bearer " else http_request.headers.get("x-api-key", "")
+    if not hmac.compare_digest(provided.encode(), expected.encode()):
+        metrics.increment(f"{metric}.unauthorized")
+        raise HTTPException(status_code=401, detail=f"{label} API 키가 올바르지 않습니다")
+
+@app.post("/ingest/sales")
+async def ingest_sales(http_request: Request):
+    """
+    판매 데이터 대량 적재 - CSV(text/csv) 또는 NDJSON(application/x-ndjson) 배치를 contract_id 기준 upsert
+
+    컬럼: contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity(선택, 기본 1)
+    CSV는 첫 줄이 헤더여야 하고, 배치 전체가 한 트랜잭션이라 오류가 있으면 아무것도 반영되지 않습니다.
+    반영된 행이 있으면 데이터 버전이 올라가 캐시된 쿼리 결과가 무효화됩니다.
+    """
+    _check_api_key(http_request, get_settings().INGEST_API_KEY, "적재", "INGEST_API_KEY", "ingest")
+    if ingest_sales_async is None:
+        raise HTTPException(status_code=503, detail="데이터베이스 모듈을 사용할 수 없습니다")
+    fmt = detect_format(http_request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="text/csv 또는 application/x-ndjson만 지원합니다")
+
+    try:
+        with metrics.timer("request.ingest"):
+            result = await ingest_sales_async(http_request.stream(), fmt, get_settings().INGEST_MAX_BYTES)
+    except IngestError as e:
+        logger.warning(f"적재 거부: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return result._asdict()
+
+@app.get("/admin/queries")
+async def admin_queries(http_request: Request, limit: int = 20, advise: int = 5):
+    """
+    실행 쿼리 형태(지문)별 통계 - 총 실행 시간 순 상위 limit개 (ADMIN_API_KEY 필요)
+
+    상위 형태 중 fact_loan_sales를 순차 스캔한 형태 advise개까지 hypopg 가상 인덱스로 EXPLAIN을 비교해
+    인덱스를 제안합니다 (쿼리를 실행하거나 인덱스를 만들지 않음, advise=0이면 생략).
+    """
+    _check_api_key(http_request, get_settings().ADMIN_API_KEY, "관리", "ADMIN_API_KEY", "admin")
+    query_log = get_query_log()
+    shapes = query_log.top_shapes(max(1, min(limit, 200)))
+
+    index_advice = []
+    if advise_shape is not None and advise > 0:
+        for shape in [s for s in shapes if scans_fact_table(s)][:advise]:
+            try:
+                index_advice.append(await advise_shape(shape))
+            except Exception as e:
+                logger.warning(f"인덱스 제안 실패 [{shape['fingerprint']}]: {str(e)[:100]}")
+                index_advice.append({"fingerprint": shape["fingerprint"], "error": str(e)[:200]})
+    return {"log": query_log.stats(), "shapes": shapes, "index_advice": index_advice}
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -231,6 +699,10 @@ async def root():
         "docs": "/docs",
         "health": "/health",
         "chat": "/chat",
+        "chat_stream": "/chat/stream",
+        "metrics": "/metrics",
+        "ingest": "/ingest/sales",
+        "admin_queries": "/admin/queries",
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+"""애플리케이션 메트릭 - 카운터 및 지연시간 히스토그램 집계
+
+지연시간은 고정 버킷 히스토그램으로 모아 p50/p90/p99를 추정합니다.
+요청 처리 중(collect_spans 안)에 기록한 지연시간은 그 요청의 구간 목록에도 쌓여
+Server-Timing 헤더로 보낼 수 있습니다. 컨텍스트 변수를 쓰므로 워커 스레드
+(run_in_executor)에서 기록한 값은 전역 집계에만 반영됩니다.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_timings: Dict[str, Dict[str, Any]] = {}
+
+# 히스토그램 버킷 상한 (ms), 마지막 버킷은 그보다 큰 값
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# 현재 요청의 (이름, 초) 구간 목록
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("metrics_spans", default=None)
+
+
+def increment(name: str, value: int = 1) -> None:
+    """카운터 증가"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, seconds: float) -> None:
+    """지연시간(초) 기록 (요청 구간 수집 중이면 그 요청의 구간에도 추가)"""
+    bucket = bisect.bisect_left(BUCKETS_MS, seconds * 1000)
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = {"count": 0, "total": 0.0, "max": 0.0, "buckets": [0] * (len(BUCKETS_MS) + 1)}
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["buckets"][bucket] += 1
+        if seconds > timing["max"]:
+            timing["max"] = seconds
+
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def timer(name: str):
+    """with 블록 실행 시간을 name으로 기록"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_spans():
+    """
+    with 블록(한 요청) 안에서 기록된 지연시간 구간 수집
+
+    블록 안에서 만든 태스크도 같은 목록에 기록합니다 (태스크는 생성 시 컨텍스트를 복사).
+
+        with metrics.collect_spans() as spans:
+            ...
+        headers["Server-Timing"] = metrics.server_timing(spans)
+    """
+    spans: List[Tuple[str, float]] = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]]) -> str:
+    """구간 목록을 Server-Timing 헤더 값으로 (같은 이름은 합산, 기록 순서 유지)"""
+    totals: Dict[str, float] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def _percentile(buckets: List[int], count: int, max_seconds: float, q: float) -> float:
+    """히스토그램에서 백분위 추정 (해당 버킷 상한, 최댓값보다 크지 않게)"""
+    rank = q * count
+    seen = 0
+    for index, n in enumerate(buckets):
+        seen += n
+        if seen >= rank and n:
+            upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else max_seconds * 1000
+            return round(min(upper, max_seconds * 1000), 2)
+    return round(max_seconds * 1000, 2)
+
+
+def snapshot() -> Dict[str, Any]:
+    """현재 메트릭 스냅샷 (지연시간은 ms 단위, histogram은 버킷 상한(ms) → 건수)"""
+    with _lock:
+        timings = {}
+        for name, t in _timings.items():
+            count, buckets = t["count"], t["buckets"]
+            timings[name] = {
+                "count": count,
+                "avg_ms": round(t["total"] / count * 1000, 2) if count else 0.0,
+                "max_ms": round(t["max"] * 1000, 2),
+                "p50_ms": _percentile(buckets, count, t["max"], 0.5),
+                "p90_ms": _percentile(buckets, count, t["max"], 0.9),
+                "p99_ms": _percentile(buckets, count, t["max"], 0.99),
+                "histogram": {
+                    (str(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else "+Inf"): n
+                    for i, n in enumerate(buckets) if n
+                },
+            }
+        return {"counters": dict(_counters), "timings": timings}
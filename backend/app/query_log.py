@@ -0,0 +1,235 @@
+"""실행 쿼리 기록 - DB로 보낸 SQL을 지문 단위로 모아 시간이 많이 드는 쿼리 형태 파악
+
+/chat, /chat/stream에서 실제로 실행한 SQL(롤업 재작성 후)마다 한 줄씩 로컬 JSON Lines 파일
+(QUERY_LOG_PATH)에 추가합니다. 기존 줄은 고치지 않습니다.
+
+    {"ts": 1767225600.123, "fingerprint": "3f2a...", "status": "ok", "duration_ms": 41.8, "rows": 5,
+     "truncated": false, "cost": 1834.2, "plan_rows": 5, "downscoped": false,
+     "seq_scans": [["fact_loan_sales", "(sale_date >= '2024-01-01'::date)"]], "sql": "SELECT ..."}
+
+- status: ok / timeout (duration_ms는 타임아웃 값) / error
+- 파일 쓰기는 전용 스레드 하나가 순서대로 처리해 이벤트 루프를 막지 않으며, 파일이 QUERY_LOG_MAX_BYTES를
+  넘으면 .1로 옮기고 새로 시작합니다 (이전 .1은 덮어씀)
+- 지문별 집계(횟수, 총/최대/p95 시간, 행 수, 최근 SQL과 계획)는 메모리에 두고 시작 시 두 파일을 다시 읽어 복원
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app import metrics
+from app.fingerprint import fingerprint_sql
+from app.json_response import dumps
+from app.query_planner import QueryPlan
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # 선택 의존성 - 없으면 표준 json 사용
+    _loads = json.loads
+
+# 지문별 p95 계산에 쓰는 최근 실행 시간 수 / 메모리에 집계할 지문 수
+DURATIONS_PER_SHAPE = 100
+MAX_SHAPES = 1000
+# 기록할 SQL 최대 길이 (인덱스 제안 시 이 SQL로 EXPLAIN)
+MAX_SQL_CHARS = 10_000
+
+
+class QueryLog:
+    """
+    실행 쿼리 추가 기록 + 지문별 집계
+
+    Args:
+        path: JSON Lines 파일 경로 (비어 있으면 메모리 집계만)
+        max_bytes: 파일 교체 크기
+    """
+
+    def __init__(self, path: str = "", max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._shapes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._records = 0
+        self._write_errors = 0
+        self._file = None
+        self._size = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-log") if path else None
+        if path:
+            self._replay()
+
+    def record(
+        self,
+        sql: str,
+        plan: Optional[QueryPlan],
+        seconds: float,
+        rows: int = 0,
+        truncated: bool = False,
+        status: str = "ok",
+    ) -> Dict[str, Any]:
+        """실행 한 건 기록 (파일 쓰기는 백그라운드)"""
+        summary = plan.summary if plan is not None else None
+        entry = {
+            "ts": round(time.time(), 3),
+            "fingerprint": fingerprint_sql(sql).fingerprint,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "truncated": truncated,
+            "cost": plan.cost if plan is not None else None,
+            "plan_rows": summary.plan_rows if summary is not None else None,
+            "downscoped": plan.downscoped if plan is not None else False,
+            "seq_scans": [list(scan) for scan in summary.seq_scans] if summary is not None else [],
+            "sql": sql[:MAX_SQL_CHARS],
+        }
+        self._add(entry)
+        metrics.increment(f"query_log.{status}")
+        if self._executor is not None:
+            self._executor.submit(self._write, dumps(entry) + b"\n")
+        return entry
+
+    def _add(self, entry: Dict[str, Any]) -> None:
+        """지문별 집계에 반영"""
+        key = entry["fingerprint"]
+        with self._lock:
+            self._records += 1
+            shape = self._shapes.get(key)
+            if shape is None:
+                shape = self._shapes[key] = {
+                    "template": fingerprint_sql(entry["sql"]).template,
+                    "count": 0, "errors": 0, "timeouts": 0,
+                    "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                    "durations": deque(maxlen=DURATIONS_PER_SHAPE),
+                }
+                while len(self._shapes) > MAX_SHAPES:
+                    self._shapes.popitem(last=False)
+            else:
+                self._shapes.move_to_end(key)
+            duration = entry["duration_ms"]
+            shape["count"] += 1
+            shape["errors"] += entry["status"] == "error"
+            shape["timeouts"] += entry["status"] == "timeout"
+            shape["total_ms"] += duration
+            shape["max_ms"] = max(shape["max_ms"], duration)
+            shape["rows"] += entry["rows"]
+            shape["durations"].append(duration)
+            shape["last_seen"] = entry["ts"]
+            shape["sql"] = entry["sql"]
+            shape["plan"] = {
+                "cost": entry["cost"], "plan_rows": entry["plan_rows"],
+                "downscoped": entry["downscoped"], "seq_scans": entry["seq_scans"],
+            }
+
+    def _write(self, line: bytes) -> None:
+        """파일 끝에 추가 (쓰기 스레드에서만 호출)"""
+        try:
+            if self._file is not None and self._size + len(line) > self.max_bytes:
+                self._file.close()
+                self._file = None
+                os.replace(self.path, f"{self.path}.1")
+            if self._file is None:
+                self._file = open(self.path, "ab")
+                self._size = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+        except OSError as e:
+            self._write_errors += 1
+            if self._write_errors == 1:
+                logger.warning(f"쿼리 기록 파일 쓰기 실패 ({self.path}): {e}")
+
+    def _replay(self) -> None:
+        """이전 실행의 기록으로 집계 복원 (교체된 .1 파일부터)"""
+        start = time.perf_counter()
+        for path in (f"{self.path}.1", self.path):
+            try:
+                with open(path, "rb") as f:
+                    for line in f:
+                        try:
+                            self._add(_loads(line))
+                        except (ValueError, KeyError, TypeError):
+                            continue  # 쓰는 도중 종료되어 잘린 줄 등
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"쿼리 기록 읽기 실패 ({path}): {e}")
+        if self._records:
+            logger.info(
+                f"쿼리 기록 복원: {self._records:,}건, {len(self._shapes):,}개 형태 ({time.perf_counter() - start:.2f}초)"
+            )
+
+    def top_shapes(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """총 실행 시간 순 상위 쿼리 형태"""
+        with self._lock:
+            items = sorted(self._shapes.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:limit]
+            result = []
+            for key, shape in items:
+                durations = sorted(shape["durations"])
+                count = shape["count"]
+                result.append({
+                    "fingerprint": key,
+                    "template": shape["template"],
+                    "count": count,
+                    "total_ms": round(shape["total_ms"], 2),
+                    "avg_ms": round(shape["total_ms"] / count, 2),
+                    "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                    "max_ms": shape["max_ms"],
+                    "avg_rows": round(shape["rows"] / count, 1),
+                    "errors": shape["errors"],
+                    "timeouts": shape["timeouts"],
+                    "last_seen": shape["last_seen"],
+                    "plan": shape["plan"],
+                    "sql": shape["sql"],
+                })
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path or None,
+                "records": self._records,
+                "shapes": len(self._shapes),
+                "write_errors": self._write_errors,
+            }
+
+    def close(self) -> None:
+        """대기 중인 쓰기를 마치고 파일 닫기"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_query_log: Optional[QueryLog] = None
+_query_log_lock = threading.Lock()
+
+
+def get_query_log() -> QueryLog:
+    """실행 쿼리 기록 인스턴스 가져오기 (싱글톤, 처음 호출 시 기존 파일 복원)"""
+    global _query_log
+
+    if _query_log is None:
+        with _query_log_lock:
+            if _query_log is None:
+                settings = get_settings()
+                _query_log = QueryLog(settings.QUERY_LOG_PATH, settings.QUERY_LOG_MAX_BYTES)
+
+    return _query_log
+
+
+def close_query_log() -> None:
+    """쿼리 기록 종료"""
+    global _query_log
+    with _query_log_lock:
+        query_log, _query_log = _query_log, None
+    if query_log is not None:
+        query_log.close()
@@ -0,0 +1,228 @@
+"""쿼리 사전 점검 - EXPLAIN 계획으로 비용 제한 및 쿼리별 타임아웃 결정
+
+실행 전에 EXPLAIN (FORMAT JSON)의 추정 비용/행 수를 보고
+
+- 한도를 넘는 쿼리(조건 없는 대용량 스캔, 카테시안 조인 등)는 커넥션을 잡기 전에 바로 거부하고
+- 조금 비싼 쿼리는 가져올 행 수를 줄여(down-scope) 서버 측 커서가 일찍 멈추도록 하며
+- statement_timeout은 고정값 대신 추정 비용과 같은 지문(app.fingerprint) 쿼리의 과거 실행 시간으로 정합니다.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app import metrics
+from app.settings import get_settings
+from app.fingerprint import fingerprint_sql
+
+logger = logging.getLogger(__name__)
+
+# 조인 조건 없는 조인이 이 행 수를 넘으면 거부 (작은 차원 테이블끼리의 조합은 허용)
+CARTESIAN_MAX_ROWS = 100_000
+
+# 타임아웃 = max(비용 기반 예상, 과거 p95) × 여유 배수
+TIMEOUT_HEADROOM = 3.0
+
+# 비용 1단위당 실행 시간 초기값 (초). 실행 기록으로 계속 보정됨
+INITIAL_SECONDS_PER_COST = 5e-5
+# 이보다 싼 쿼리는 고정 오버헤드(왕복, 커서 생성)가 대부분이라 환산 계수 보정에서 제외
+CALIBRATION_MIN_COST = 1000
+
+# 쿼리 지문별로 보관할 최근 실행 시간 수 / 지문 수
+HISTORY_PER_SHAPE = 20
+MAX_SHAPES = 1000
+
+_JOIN_NODES = {"Nested Loop", "Hash Join", "Merge Join"}
+
+
+class QueryRejected(Exception):
+    """비용 한도를 넘어 실행하지 않는 쿼리 (메시지는 사용자에게 그대로 표시)"""
+
+
+class PlanSummary(NamedTuple):
+    total_cost: float
+    plan_rows: int            # 최종 결과 추정 행 수
+    max_join_rows: int        # 조인 노드 중 최대 추정 행 수
+    cartesian_rows: int       # 조인 조건 없는 조인의 최대 추정 행 수 (없으면 0)
+    full_scans: Tuple[str, ...]  # 필터 없이 전체를 읽는 테이블
+    seq_scans: Tuple[Tuple[str, str], ...] = ()  # 순차 스캔 (테이블, Filter 식 - 없으면 "")
+
+
+class QueryPlan(NamedTuple):
+    """실행 방식 결정 결과"""
+    timeout: float
+    max_rows: Optional[int] = None  # None이면 QUERY_MAX_ROWS
+    cost: float = 0.0
+    downscoped: bool = False
+    summary: Optional[PlanSummary] = None  # 실행 기록용 EXPLAIN 요약
+
+
+def _has_index_condition(node: Dict[str, Any]) -> bool:
+    if "Index Cond" in node or "Recheck Cond" in node or "Join Filter" in node:
+        return True
+    return any(_has_index_condition(child) for child in node.get("Plans", ()))
+
+
+def summarize_plan(plan: Dict[str, Any]) -> PlanSummary:
+    """EXPLAIN (FORMAT JSON)의 Plan 노드 트리 요약"""
+    max_join_rows = 0
+    cartesian_rows = 0
+    full_scans: List[str] = []
+    seq_scans: List[Tuple[str, str]] = []
+
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        node_type = node.get("Node Type")
+        rows = int(node.get("Plan Rows", 0))
+        children = node.get("Plans", [])
+
+        if node_type in _JOIN_NODES:
+            max_join_rows = max(max_join_rows, rows)
+            if (
+                node_type == "Nested Loop"
+                and "Join Filter" not in node
+                and len(children) == 2
+                and not _has_index_condition(children[1])
+            ):
+                cartesian_rows = max(cartesian_rows, rows)
+        elif node_type == "Seq Scan" and node.get("Relation Name"):
+            seq_scans.append((node["Relation Name"], node.get("Filter", "")))
+            if "Filter" not in node:
+                full_scans.append(node["Relation Name"])
+
+        stack.extend(children)
+
+    return PlanSummary(
+        total_cost=float(plan.get("Total Cost", 0.0)),
+        plan_rows=int(plan.get("Plan Rows", 0)),
+        max_join_rows=max_join_rows,
+        cartesian_rows=cartesian_rows,
+        full_scans=tuple(sorted(set(full_scans))),
+        seq_scans=tuple(sorted(set(seq_scans))),
+    )
+
+
+class QueryPlanner:
+    """
+    EXPLAIN 요약으로 거부/down-scope/타임아웃 결정, 실행 시간 기록으로 타임아웃 보정
+
+    Args:
+        max_cost: 이 추정 비용을 넘으면 거부 (0이면 비용 제한 없음)
+        downscope_cost: 이 추정 비용을 넘으면 가져올 행 수를 downscope_rows로 제한
+        downscope_rows: down-scope 시 최대 행 수
+        max_join_rows: 조인 결과 추정 행 수 한도
+        min_timeout / max_timeout: 쿼리별 statement_timeout 범위 (초)
+    """
+
+    def __init__(
+        self,
+        max_cost: float = 1_000_000,
+        downscope_cost: float = 200_000,
+        downscope_rows: int = 100,
+        max_join_rows: int = 10_000_000,
+        min_timeout: float = 1.0,
+        max_timeout: float = 10.0,
+    ):
+        self.max_cost = max_cost
+        self.downscope_cost = downscope_cost
+        self.downscope_rows = downscope_rows
+        self.max_join_rows = max_join_rows
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self._lock = threading.Lock()
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._seconds_per_cost = INITIAL_SECONDS_PER_COST
+
+    def decide(self, sql: str, summary: PlanSummary) -> QueryPlan:
+        """
+        실행 방식 결정
+
+        Raises:
+            QueryRejected: 비용/행 수 한도 초과
+        """
+        cost = summary.total_cost
+
+        if summary.cartesian_rows > CARTESIAN_MAX_ROWS:
+            metrics.increment("query_plan.rejected")
+            raise QueryRejected(
+                f"조인 조건 없이 테이블을 조합하는 쿼리입니다 (약 {summary.cartesian_rows:,}행 생성 예상). "
+                "어떤 기준으로 연결할지 질문에 포함해주세요."
+            )
+        if summary.max_join_rows > self.max_join_rows:
+            metrics.increment("query_plan.rejected")
+            raise QueryRejected(
+                f"조인 결과가 너무 큽니다 (약 {summary.max_join_rows:,}행 예상). "
+                "기간이나 지점/상품 조건을 추가해 범위를 좁혀주세요."
+            )
+        if self.max_cost and cost > self.max_cost:
+            metrics.increment("query_plan.rejected")
+            hint = "기간(예: 이번 달, 지난 분기)이나 지점/상품 조건을 추가해 범위를 좁혀주세요."
+            if summary.full_scans:
+                hint = f"{', '.join(summary.full_scans)} 전체를 읽는 쿼리입니다. " + hint
+            raise QueryRejected(f"예상 실행 비용이 너무 큽니다 (추정 {cost:,.0f}, 한도 {self.max_cost:,.0f}). {hint}")
+
+        downscoped = bool(self.downscope_cost) and cost > self.downscope_cost
+        metrics.increment("query_plan.downscoped" if downscoped else "query_plan.allowed")
+        return QueryPlan(
+            timeout=self.timeout_for(sql, cost),
+            max_rows=self.downscope_rows if downscoped else None,
+            cost=cost,
+            downscoped=downscoped,
+            summary=summary,
+        )
+
+    def timeout_for(self, sql: str, cost: float) -> float:
+        """추정 비용과 같은 지문 쿼리의 최근 실행 시간(p95)으로 타임아웃 계산"""
+        shape = fingerprint_sql(sql).fingerprint
+        with self._lock:
+            estimate = cost * self._seconds_per_cost
+            history = self._history.get(shape)
+            if history:
+                runtimes = sorted(history)
+                estimate = max(estimate, runtimes[min(len(runtimes) - 1, int(len(runtimes) * 0.95))])
+        return min(self.max_timeout, max(self.min_timeout, estimate * TIMEOUT_HEADROOM))
+
+    def record(self, sql: str, cost: float, seconds: float) -> None:
+        """실행 시간 기록 (타임아웃으로 중단된 경우 타임아웃 값을 기록)"""
+        shape = fingerprint_sql(sql).fingerprint
+        with self._lock:
+            history = self._history.get(shape)
+            if history is None:
+                history = self._history[shape] = deque(maxlen=HISTORY_PER_SHAPE)
+                while len(self._history) > MAX_SHAPES:
+                    self._history.popitem(last=False)
+            else:
+                self._history.move_to_end(shape)
+            history.append(seconds)
+
+            # 비용 → 시간 환산 계수를 지수 이동 평균으로 보정
+            if cost >= CALIBRATION_MIN_COST:
+                self._seconds_per_cost = 0.9 * self._seconds_per_cost + 0.1 * (seconds / cost)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"shapes": len(self._history), "seconds_per_cost": self._seconds_per_cost}
+
+
+_planner: Optional[QueryPlanner] = None
+
+
+def get_query_planner() -> QueryPlanner:
+    """쿼리 플래너 인스턴스 가져오기 (싱글톤)"""
+    global _planner
+
+    if _planner is None:
+        settings = get_settings()
+        _planner = QueryPlanner(
+            max_cost=settings.QUERY_MAX_COST,
+            downscope_cost=settings.QUERY_DOWNSCOPE_COST,
+            downscope_rows=settings.QUERY_DOWNSCOPE_ROWS,
+            max_join_rows=settings.QUERY_MAX_JOIN_ROWS,
+            min_timeout=settings.QUERY_TIMEOUT_MIN_SECONDS,
+            max_timeout=settings.QUERY_TIMEOUT_MAX_SECONDS,
+        )
+
+    return _planner
@@ -0,0 +1,348 @@
+"""질문 → SQL 캐시 - 같은(또는 거의 같은) 질문은 LLM 호출 없이 검증된 SQL 재사용
+
+조회 순서:
+1. exact: 공백만 정리한 원문 질문이 같은 경우
+2. normalized: 공백/문장부호/조사/숫자 표기/군더더기 표현을 정규화한 키가 같은 경우
+3. similar: 오타 수준의 차이만 있고 문자 bigram 유사도가 임계값 이상인 경우
+
+스키마(sql_prompt) 또는 Vanna 학습 데이터가 바뀌면 캐시 전체가 무효화됩니다.
+"""
+
+import re
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict, Counter
+from typing import Optional, List, Dict, Any
+
+from app import metrics
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 의미에 영향을 주지 않는 군더더기 표현
+FILLER_WORDS = {
+    "좀", "알려줘", "알려주세요", "알려줄래", "보여줘", "보여주세요", "얼마", "얼마야", "얼마임",
+    "뭐야", "어때", "주세요", "해줘", "해주세요", "조회", "조회해줘", "확인", "확인해줘",
+    "궁금해", "궁금합니다", "인가요", "입니까", "있어", "있나요", "요",
+}
+
+# 토큰 끝에서 제거할 조사 (긴 것부터 검사). 값은 조사를 떼고 남아야 하는 최소 글자 수
+# 떼어도 묻는 내용이 같은 조사만 둠 - 범위의 끝을 나타내는 까지/부터는 떼면
+# "3월부터"/"3월까지"/"3월"이 같은 질문이 되므로 토큰에 남김
+PARTICLES = [
+    ("에서는", 1), ("에서", 1), ("으로", 1), ("에게", 1), ("이나", 2),
+    ("은", 1), ("는", 1), ("을", 1), ("를", 1), ("의", 1),
+    ("이", 2), ("가", 2), ("에", 2), ("로", 2), ("와", 2), ("과", 2), ("도", 2), ("만", 2),
+]
+
+_PUNCT_RE = re.compile(r"[^\w%]+")
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3})")
+_KOREAN_UNIT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(억|만)")
+_DIGITS_RE = re.compile(r"\d+")
+_KOREAN_UNITS = {"억": 100_000_000, "만": 10_000}
+
+
+def _expand_korean_units(match: re.Match) -> str:
+    value = float(match.group(1)) * _KOREAN_UNITS[match.group(2)]
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def _strip_particle(token: str) -> str:
+    for particle, min_len in PARTICLES:
+        if token.endswith(particle) and len(token) - len(particle) >= min_len:
+            return token[: -len(particle)]
+    return token
+
+
+def tokenize_question(question: str) -> List[str]:
+    """
+    질문을 정규화된 토큰 목록으로 변환
+
+    - 유니코드 NFKC 정규화 및 소문자화 (전각 숫자/문자 통일)
+    - 천 단위 구분 기호 제거, '3억'/'5만' 같은 한국어 단위를 숫자로 전개
+    - 문장부호 제거, 토큰 끝 조사 제거, 군더더기 표현 제거
+    """
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = _THOUSANDS_RE.sub("", text)
+    text = _KOREAN_UNIT_RE.sub(_expand_korean_units, text)
+    text = _PUNCT_RE.sub(" ", text)
+
+    tokens = []
+    for token in text.split():
+        token = _strip_particle(token)
+        if token and token not in FILLER_WORDS:
+            tokens.append(token)
+    return tokens
+
+
+def normalize_question(question: str) -> str:
+    """
+    정규화 키 생성 - 한국어 띄어쓰기가 일정하지 않으므로 토큰을 공백 없이 연결
+    ("지난 달 전체 판매액은?" == "지난달 전체 판매액 알려줘")
+    """
+    return "".join(tokenize_question(question))
+
+
+def _bigrams(text: str) -> Counter:
+    if len(text) < 2:
+        return Counter([text])
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _dice(a: Counter, b: Counter) -> float:
+    total = sum(a.values()) + sum(b.values())
+    if total == 0:
+        return 0.0
+    return 2 * sum((a & b).values()) / total
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """편집 거리 1 이하 여부 (오타 판정)"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return edits + (len(b) - j) <= 1
+
+
+def _only_typos(tokens_a: List[str], tokens_b: List[str]) -> bool:
+    """
+    두 질문의 차이가 오타뿐인지 확인
+
+    지점명/기간/숫자가 다른 질문은 bigram 유사도가 높아도 다른 SQL이 필요하므로
+    서로 다른 토큰은 길이 3 이상이면서 편집 거리 1 이내로 짝지어져야 합니다.
+    지점/상품/지역 이름이 들어 있는 토큰은 한 글자 차이도 다른 대상이므로
+    ("대구지점" / "대전지점") 오타로 보지 않습니다.
+    """
+    from app.kpi_templates import contains_dimension_name
+
+    diff_a = sorted(set(tokens_a) - set(tokens_b))
+    diff_b = sorted(set(tokens_b) - set(tokens_a))
+    if len(diff_a) != len(diff_b):
+        return False
+
+    if any(contains_dimension_name(t) for t in diff_a + diff_b):
+        return False
+    for token in diff_a:
+        if _DIGITS_RE.search(token) or len(token) < 3:
+            return False
+        match = next((t for t in diff_b if len(t) >= 3 and _within_one_edit(token, t)), None)
+        if match is None:
+            return False
+        diff_b.remove(match)
+    return True
+
+
+def schema_version() -> int:
+    """
+    SQL 생성에 영향을 주는 스키마/학습 텍스트의 버전
+
+    문자열 해시는 객체에 캐시되므로 매 조회마다 호출해도 비용이 거의 없습니다.
+    """
+    from app import sql_prompt, vanna_client
+
+    training = (
+        tuple(vanna_client.DDL_STATEMENTS),
+        tuple(vanna_client.DOCUMENTATIONS),
+        tuple((e["question"], e["sql"]) for e in vanna_client.SQL_EXAMPLES),
+    )
+    return hash((sql_prompt.SCHEMA_INFO, sql_prompt.KPI_DEFINITIONS, sql_prompt.SQL_RULES, sql_prompt.EXAMPLES, training))
+
+
+class _Entry:
+    __slots__ = ("sql", "tokens", "bigrams", "expires_at", "aliases")
+
+    def __init__(self, sql: str, tokens: List[str], bigrams: Counter, expires_at: float):
+        self.sql = sql
+        self.tokens = tokens
+        self.bigrams = bigrams
+        self.expires_at = expires_at
+        self.aliases = set()  # 이 항목을 가리키는 원문 질문들
+
+
+class QuestionCache:
+    """
+    질문 → 검증된 SQL LRU/TTL 캐시
+
+    Args:
+        max_entries: 최대 항목 수 (초과 시 가장 오래 사용되지 않은 항목 제거)
+        ttl_seconds: 항목 유효 시간
+        similarity_threshold: 유사 질문 판정 bigram Dice 계수 임계값 (0이면 유사 조회 비활성)
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, similarity_threshold: float = 0.85):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()  # 정규화 키 → 항목
+        self._exact: Dict[str, str] = {}  # 원문 질문 → 정규화 키
+        # 서로 다른 토큰 수 → 정규화 키들 (오타 판정은 토큰 수가 같아야 하므로 유사 조회 후보를 좁힘)
+        self._by_token_count: Dict[int, set] = {}
+        self._version: Optional[int] = None
+        self._stats = {"exact": 0, "normalized": 0, "similar": 0, "miss": 0, "evicted": 0, "invalidated": 0}
+
+    def get(self, question: str) -> Optional[str]:
+        """캐시된 SQL 조회 (없으면 None)"""
+        question = " ".join(question.split())
+        with self._lock:
+            self._check_version()
+            now = time.monotonic()
+
+            key = self._exact.get(question)
+            if key is not None:
+                sql = self._lookup(key, now)
+                if sql is not None:
+                    return self._hit("exact", sql)
+
+            tokens = tokenize_question(question)
+            key = "".join(tokens)
+            sql = self._lookup(key, now)
+            if sql is not None:
+                self._remember_exact(question, key)
+                return self._hit("normalized", sql)
+
+            if self.similarity_threshold > 0 and key:
+                similar_key = self._find_similar(tokens, _bigrams(key), now)
+                if similar_key is not None:
+                    sql = self._lookup(similar_key, now)
+                    self._remember_exact(question, similar_key)
+                    return self._hit("similar", sql)
+
+            self._stats["miss"] += 1
+            metrics.increment("question_cache.miss")
+            return None
+
+    def put(self, question: str, sql: str) -> None:
+        """검증된 SQL 저장"""
+        question = " ".join(question.split())
+        tokens = tokenize_question(question)
+        key = "".join(tokens)
+        if not key:
+            return
+
+        with self._lock:
+            self._check_version()
+            entry = _Entry(sql, tokens, _bigrams(key), time.monotonic() + self.ttl_seconds)
+            previous = self._entries.get(key)
+            if previous is not None:
+                entry.aliases = previous.aliases
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_token_count.setdefault(len(set(tokens)), set()).add(key)
+            self._remember_exact(question, key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evicted"] += 1
+
+    def clear(self) -> None:
+        """모든 항목 제거"""
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._by_token_count.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """적중률 통계"""
+        with self._lock:
+            hits = self._stats["exact"] + self._stats["normalized"] + self._stats["similar"]
+            lookups = hits + self._stats["miss"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _check_version(self) -> None:
+        version = schema_version()
+        if version != self._version:
+            if self._version is not None and self._entries:
+                logger.info("스키마/학습 데이터 변경 - 질문 캐시 무효화")
+                self._stats["invalidated"] += len(self._entries)
+            self._entries.clear()
+            self._exact.clear()
+            self._by_token_count.clear()
+            self._version = version
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.sql
+
+    def _find_similar(self, tokens: List[str], bigrams: Counter, now: float) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        size = sum(bigrams.values())
+        for key in self._by_token_count.get(len(set(tokens)), ()):
+            entry = self._entries[key]
+            if entry.expires_at <= now:
+                continue
+            # Dice 계수 상한 2*min/(합) - bigram 수 차이가 크면 계산할 필요 없음
+            other = sum(entry.bigrams.values())
+            if 2 * min(size, other) < best_score * (size + other):
+                continue
+            score = _dice(bigrams, entry.bigrams)
+            if score >= best_score and _only_typos(tokens, entry.tokens):
+                best_key, best_score = key, score
+        return best_key
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        bucket = self._by_token_count.get(len(set(entry.tokens)))
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._by_token_count[len(set(entry.tokens))]
+        self._forget_exact(entry)
+
+    def _remember_exact(self, question: str, key: str) -> None:
+        self._exact[question] = key
+        self._entries[key].aliases.add(question)
+
+    def _forget_exact(self, entry: _Entry) -> None:
+        for question in entry.aliases:
+            self._exact.pop(question, None)
+
+    def _hit(self, tier: str, sql: str) -> str:
+        self._stats[tier] += 1
+        metrics.increment(f"question_cache.hit.{tier}")
+        logger.info(f"질문 캐시 적중 ({tier})")
+        return sql
+
+
+_question_cache: Optional[QuestionCache] = None
+
+
+def get_question_cache() -> QuestionCache:
+    """질문 캐시 인스턴스 가져오기 (싱글톤)"""
+    global _question_cache
+
+    if _question_cache is None:
+        settings = get_settings()
+        _question_cache = QuestionCache(
+            max_entries=settings.QUESTION_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUESTION_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.QUESTION_CACHE_SIMILARITY,
+        )
+
+    return _question_cache
@@ -0,0 +1,296 @@
+"""쿼리 결과 캐시 - 정규화된 SQL 키로 DB 결과 재사용
+
+CURRENT_DATE 기반 상대 기간 SQL은 원문 그대로 키로 쓰면 날짜가 바뀌어도 같은 결과를
+돌려주게 되므로, 키를 만들 때 상대 날짜 표현을 실제 날짜로 치환합니다.
+
+    DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')  →  date '2024-05-01'
+
+따라서 월 단위로 잘린 조건은 한 달 동안 같은 키를 갖고, CURRENT_DATE를 그대로 쓰는
+조건은 날짜가 바뀌면 새 키가 됩니다. NOW()처럼 시각에 의존하는 쿼리는 캐시하지 않습니다.
+"""
+
+import re
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from zoneinfo import ZoneInfo
+
+from app import metrics
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 문자열 리터럴 / 따옴표 식별자 / 공백 / 그 외 토큰
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+")
+
+# 호출 시각에 따라 결과가 달라지는 표현 (캐시 불가)
+_VOLATILE_RE = re.compile(
+    r"\b(now\s*\(|current_timestamp|current_time|localtime|localtimestamp|clock_timestamp|"
+    r"statement_timestamp|transaction_timestamp|timeofday|random\s*\()"
+)
+_CURRENT_DATE_RE = re.compile(r"\bcurrent_date\b(\s*\(\s*\))?")
+_DATE_ARITH_RE = re.compile(
+    r"date '(\d{4}-\d{2}-\d{2})'\s*([+-])\s*interval\s*'(\d+)\s*(day|week|month|quarter|year)s?'",
+    re.IGNORECASE,
+)
+_DATE_TRUNC_RE = re.compile(
+    r"date_trunc\s*\(\s*'(day|week|month|quarter|year)'\s*,\s*date '(\d{4}-\d{2}-\d{2})'\s*\)",
+    re.IGNORECASE,
+)
+
+# 데이터 버전 (적재 시 증가, 버전이 다른 항목은 무효)
+_data_version = 0
+
+
+def get_data_version() -> int:
+    """현재 데이터 버전"""
+    return _data_version
+
+
+def set_data_version(version: int) -> None:
+    """데이터 버전 설정 (값이 바뀌면 기존 결과는 모두 무효)"""
+    global _data_version
+    if version != _data_version:
+        logger.info(f"데이터 버전 변경: {_data_version} → {version}")
+        _data_version = version
+
+
+def bump_data_version() -> int:
+    """데이터 버전 1 증가"""
+    set_data_version(_data_version + 1)
+    return _data_version
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    SQL 정규화 - 리터럴/따옴표 식별자 밖의 공백을 한 칸으로 줄이고 소문자화,
+    끝의 세미콜론 제거
+    """
+    parts = []
+    for token in _TOKEN_RE.findall(sql.strip().rstrip(";").strip()):
+        if token[0] in "'\"":
+            parts.append(token)
+        elif token.isspace():
+            parts.append(" ")
+        else:
+            parts.append(token.lower())
+    return "".join(parts).strip()
+
+
+def _add_interval(d: date, sign: int, amount: int, unit: str) -> date:
+    if unit == "day":
+        return d + timedelta(days=sign * amount)
+    if unit == "week":
+        return d + timedelta(weeks=sign * amount)
+
+    months = amount * {"month": 1, "quarter": 3, "year": 12}[unit] * sign
+    total = d.year * 12 + (d.month - 1) + months
+    year, month = divmod(total, 12)
+    month += 1
+    # 월말 보정 (1/31 + 1개월 → 2/28 또는 2/29)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return date(year, month, min(d.day, last_day))
+
+
+def _truncate(d: date, unit: str) -> date:
+    if unit == "day":
+        return d
+    if unit == "week":
+        return d - timedelta(days=d.weekday())
+    if unit == "month":
+        return d.replace(day=1)
+    if unit == "quarter":
+        return date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+    return date(d.year, 1, 1)
+
+
+def resolve_relative_dates(canonical_sql: str, today: date) -> Optional[str]:
+    """
+    정규화된 SQL의 상대 날짜 표현을 실제 날짜 리터럴로 치환
+
+    CURRENT_DATE → 날짜 리터럴, 날짜 ± INTERVAL → 계산된 날짜, DATE_TRUNC(단위, 날짜) → 잘린 날짜
+    순서로 더 이상 바뀌지 않을 때까지 반복합니다.
+
+    Returns:
+        치환된 SQL, 시각에 의존하는 표현이 있으면 None (캐시 불가)
+    """
+    if _VOLATILE_RE.search(canonical_sql):
+        return None
+
+    sql = _CURRENT_DATE_RE.sub(f"date '{today.isoformat()}'", canonical_sql)
+    while True:
+        resolved = _DATE_ARITH_RE.sub(
+            lambda m: "date '{}'".format(
+                _add_interval(date.fromisoformat(m.group(1)), 1 if m.group(2) == "+" else -1, int(m.group(3)), m.group(4).lower())
+            ),
+            sql,
+        )
+        resolved = _DATE_TRUNC_RE.sub(
+            lambda m: "date '{}'".format(_truncate(date.fromisoformat(m.group(2)), m.group(1).lower())),
+            resolved,
+        )
+        if resolved == sql:
+            return sql
+        sql = resolved
+
+
+def _estimate_size(columns: Tuple[str, ...], rows: List[tuple]) -> int:
+    """결과의 대략적인 메모리 사용량 (바이트)"""
+    size = sys.getsizeof(columns) + sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("columns", "rows", "truncated", "column_types", "size", "expires_at", "data_version")
+
+    def __init__(self, columns, rows, truncated, column_types, size, expires_at, data_version):
+        self.columns = columns
+        self.rows = rows
+        self.truncated = truncated
+        self.column_types = column_types
+        self.size = size
+        self.expires_at = expires_at
+        self.data_version = data_version
+
+
+class ResultCache:
+    """
+    SQL → 쿼리 결과 LRU 캐시 (메모리 예산 기준)
+
+    결과는 컬럼명 튜플 + 행 튜플 리스트로 저장하여 행마다 컬럼명을 반복하지 않습니다.
+
+    Args:
+        max_bytes: 전체 메모리 예산 (초과 시 가장 오래 사용되지 않은 항목부터 제거)
+        ttl_seconds: 항목 유효 시간
+        timezone: CURRENT_DATE 해석 기준 시간대 (DB 세션 시간대와 같아야 함)
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300, timezone: str = "UTC"):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.timezone = ZoneInfo(timezone)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hit": 0, "miss": 0, "uncacheable": 0, "evicted": 0, "expired": 0}
+
+    def make_key(self, sql: str) -> Optional[str]:
+        """캐시 키 생성 (캐시 불가 쿼리면 None)"""
+        today = datetime.now(self.timezone).date()
+        return resolve_relative_dates(canonicalize_sql(sql), today)
+
+    def get(self, sql: str) -> Optional[Tuple[List[str], List[tuple], bool, Optional[List[str]]]]:
+        """캐시된 (컬럼, 행 튜플, 잘림 여부, 컬럼 타입) 조회 (없으면 None)"""
+        key = self.make_key(sql)
+        if key is None:
+            self._count("uncacheable")
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires_at <= time.monotonic() or entry.data_version != _data_version):
+                self._remove(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["miss"] += 1
+                metrics.increment("result_cache.miss")
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hit"] += 1
+
+        metrics.increment("result_cache.hit")
+        return list(entry.columns), entry.rows, entry.truncated, entry.column_types
+
+    def put(
+        self,
+        sql: str,
+        columns: List[str],
+        rows: List[tuple],
+        truncated: bool = False,
+        data_version: Optional[int] = None,
+        column_types: Optional[List[str]] = None,
+    ) -> None:
+        """
+        쿼리 결과 저장 (메모리 예산보다 큰 결과는 저장하지 않음)
+
+        Args:
+            rows: 행 튜플 리스트 (컬럼 순서), 저장 후 변경하면 안 됨
+            data_version: 쿼리 실행 직전의 데이터 버전. 실행 중 적재가 일어나면
+                          이 버전이 현재 버전과 달라 다음 조회에서 무효 처리됩니다.
+        """
+        if data_version is None:
+            data_version = _data_version
+        key = self.make_key(sql)
+        if key is None:
+            return
+
+        columns = tuple(columns)
+        compact_rows = [row if isinstance(row, tuple) else tuple(row) for row in rows]
+        size = _estimate_size(columns, compact_rows)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(columns, compact_rows, truncated, column_types, size, time.monotonic() + self.ttl_seconds, data_version)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self._stats["evicted"] += 1
+
+    def clear(self) -> None:
+        """모든 항목 제거"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """적중률 및 메모리 사용량"""
+        with self._lock:
+            lookups = self._stats["hit"] + self._stats["miss"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "data_version": _data_version,
+                "hit_rate": round(self._stats["hit"] / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """결과 캐시 인스턴스 가져오기 (싱글톤)"""
+    global _result_cache
+
+    if _result_cache is None:
+        settings = get_settings()
+        _result_cache = ResultCache(
+            max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            timezone=settings.RESULT_CACHE_TIMEZONE,
+        )
+
+    return _result_cache
@@ -0,0 +1,365 @@
+"""롤업 재작성 - 팩트 테이블 집계 쿼리를 가장 작은 롤업 테이블로 바꿔 실행
+
+db/rollups.sql의 롤업은 (기간, 지점, 상품)별 건수/판매액 합계를 미리 들고 있으므로
+다음 형태의 쿼리는 fact_loan_sales를 다시 훑지 않고 롤업에서 같은 결과를 얻습니다.
+
+    SELECT b.branch_name, SUM(f.disbursed_amount) AS total FROM fact_loan_sales f
+    JOIN dim_branch b ON f.branch_id = b.branch_id WHERE f.sale_date >= DATE '2024-01-01' ...
+    → SELECT b.branch_name, SUM(f.total_amount) AS total FROM agg_sales_daily f ...
+
+sale_date가 모두 DATE_TRUNC('month'|'quarter'|'year', ...) / EXTRACT(YEAR|QUARTER|MONTH FROM ...)
+안에서만 쓰이면 월별 롤업, 그 외에는 일별 롤업을 씁니다.
+
+결과가 같다고 확신할 수 있는 경우에만 바꾸고, 조금이라도 벗어나면 원래 SQL을 그대로 씁니다.
+- 하위 쿼리/CTE/UNION/윈도 함수 없음, 테이블은 팩트 + 차원(dim_branch, dim_product)만
+- 차원 조인은 [INNER | LEFT [OUTER]] JOIN ... ON 팩트.키 = 차원.키 (또는 USING (키))
+  (외래 키라서 팩트 행마다 차원 행이 정확히 하나 - 조인해도 행 수가 그대로)
+- 팩트 컬럼은 branch_id, product_id, sale_date와 다음 집계로만 사용
+  SUM/AVG(disbursed_amount), COUNT(*), COUNT(1), COUNT([DISTINCT] contract_id | sale_id)
+- 그 외 집계는 행 중복 수와 무관한 COUNT(DISTINCT ...), MIN, MAX만 허용
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from app import metrics
+from app.sql_lexer import tokenize, WORD, STRING, SPACE, COMMENT, SEMICOLON, OPEN, CLOSE
+
+logger = logging.getLogger(__name__)
+
+FACT_TABLE = "fact_loan_sales"
+
+# 차원 테이블 → 팩트와 조인하는 키
+DIMENSION_KEYS = {"dim_branch": "branch_id", "dim_product": "product_id"}
+
+
+class Rollup(NamedTuple):
+    table: str
+    date_column: str   # 팩트의 sale_date에 대응하는 컬럼
+    monthly: bool      # 월 단위 집계 여부
+
+
+# 작은 것부터 (조건을 만족하는 첫 롤업 사용)
+ROLLUPS = (
+    Rollup("agg_sales_monthly", "sale_month", True),
+    Rollup("agg_sales_daily", "sale_date", False),
+)
+
+# 롤업에 그대로 있는 팩트 컬럼
+_KEY_COLUMNS = {"branch_id", "product_id"}
+# 행마다 고유하고 NULL이 없는 팩트 컬럼 (COUNT(col) == COUNT(DISTINCT col) == COUNT(*))
+_ROW_ID_COLUMNS = {"contract_id", "sale_id"}
+# 팩트에만 있는 컬럼 (한정자 없이 써도 팩트 컬럼)
+_FACT_ONLY_COLUMNS = {"sale_date", "disbursed_amount", "contract_id", "sale_id", "quantity"}
+
+_AGGREGATES = {
+    "sum", "count", "avg", "min", "max", "array_agg", "string_agg", "json_agg", "jsonb_agg",
+    "stddev", "stddev_pop", "stddev_samp", "variance", "var_pop", "var_samp",
+    "bool_and", "bool_or", "every", "percentile_cont", "percentile_disc", "mode", "bit_and", "bit_or",
+}
+# 행 중복 수와 무관한 집계 (롤업 행에 그대로 적용 가능)
+_DUPLICATE_INSENSITIVE = {"min", "max"}
+
+# 월 단위로 잘라도 값이 같은 날짜 단위
+_MONTH_SAFE_UNITS = {"month", "quarter", "year"}
+
+# 이 단어가 있으면 재작성하지 않음
+_UNSUPPORTED_WORDS = {"with", "union", "intersect", "except", "over", "window", "lateral", "right", "full", "cross", "natural"}
+
+# 테이블 이름 뒤에서 별칭이 아닌 단어
+_AFTER_TABLE_WORDS = {
+    "join", "inner", "left", "outer", "on", "using",
+    "where", "group", "order", "having", "limit", "offset", "fetch", "for",
+}
+
+# 별칭 없는 집계의 결과 컬럼명 (재작성 후에도 같은 이름이 나오도록 AS로 고정)
+_DEFAULT_COLUMN_NAMES = {"count": "count", "avg": "avg"}
+
+
+class _Unsupported(Exception):
+    """롤업으로 같은 결과를 보장할 수 없는 쿼리 (메시지는 건너뛴 이유)"""
+
+
+class _Ref(NamedTuple):
+    """팩트 컬럼 참조 (한정자 포함 토큰 범위 [start, end])"""
+    column: str
+    start: int
+    end: int
+
+
+class _Tables(NamedTuple):
+    fact_index: int        # FROM 절의 fact_loan_sales 토큰 위치
+    qualifier: str         # 팩트 컬럼 한정자 (별칭, 없으면 테이블명)
+    dim_aliases: Set[str]
+    from_index: int        # FROM 토큰 위치 (이전은 SELECT 목록)
+    skip: Set[int]         # FROM/JOIN 절 토큰 위치 (컬럼 검사 제외)
+
+
+def _significant(sql: str) -> List[Tuple[str, str]]:
+    """공백/주석/세미콜론을 뺀 (kind, 소문자 text) 토큰"""
+    return [
+        (kind, text.lower() if kind == WORD else text)
+        for kind, text in tokenize(sql)
+        if kind not in (SPACE, COMMENT, SEMICOLON)
+    ]
+
+
+def _word(tokens, i: int) -> Optional[str]:
+    if 0 <= i < len(tokens) and tokens[i][0] == WORD:
+        return tokens[i][1]
+    return None
+
+
+def _is(tokens, i: int, text: str) -> bool:
+    return 0 <= i < len(tokens) and tokens[i][1] == text
+
+
+def _closing(tokens, i: int) -> int:
+    """tokens[i]의 여는 괄호에 대응하는 닫는 괄호 위치"""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j][0] == OPEN:
+            depth += 1
+        elif tokens[j][0] == CLOSE:
+            depth -= 1
+            if depth == 0:
+                return j
+    raise _Unsupported("괄호 불일치")
+
+
+def _join_condition_end(tokens, j: int, key: str, alias: str, fact_qualifier: str) -> int:
+    """ON a.key = b.key 또는 USING (key) 확인 후 조건 다음 위치"""
+    if _word(tokens, j) == "using":
+        if [text for _, text in tokens[j + 1:j + 4]] == ["(", key, ")"]:
+            return j + 4
+        raise _Unsupported("USING 조건")
+    if _word(tokens, j) != "on":
+        raise _Unsupported("조인 조건 없음")
+
+    cond = [text for _, text in tokens[j + 1:j + 8]]
+    if (
+        len(cond) != 7
+        or cond[1] != "." or cond[3] != "=" or cond[5] != "."
+        or cond[2] != key or cond[6] != key
+        or {cond[0], cond[4]} != {alias, fact_qualifier}
+    ):
+        raise _Unsupported("조인 조건이 차원 키 등호가 아님")
+    if j + 8 < len(tokens) and _word(tokens, j + 8) not in _AFTER_TABLE_WORDS:
+        raise _Unsupported("추가 조인 조건")
+    return j + 8
+
+
+def _parse_tables(tokens) -> _Tables:
+    """FROM/JOIN 절이 팩트 + 차원 키 조인뿐인지 확인"""
+    fact_index = from_index = None
+    qualifier = FACT_TABLE
+    dim_aliases: Set[str] = set()
+    skip: Set[int] = set()
+
+    depth = 0
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        if kind == OPEN:
+            depth += 1
+        elif kind == CLOSE:
+            depth -= 1
+        if depth or text not in ("from", "join") or kind != WORD:
+            i += 1
+            continue
+
+        table = _word(tokens, i + 1)
+        if table is None or _is(tokens, i + 2, "."):
+            raise _Unsupported("스키마 한정/따옴표/하위 쿼리 테이블")
+        j = i + 2
+        if _word(tokens, j) == "as":
+            j += 1
+        alias = table
+        if _word(tokens, j) is not None and _word(tokens, j) not in _AFTER_TABLE_WORDS:
+            alias = _word(tokens, j)
+            j += 1
+        if _is(tokens, j, ","):
+            raise _Unsupported("쉼표 조인")
+
+        if table == FACT_TABLE and text == "from" and fact_index is None:
+            fact_index, from_index, qualifier = i + 1, i, alias
+        elif table in DIMENSION_KEYS and text == "join" and fact_index is not None:
+            if alias in dim_aliases or alias == qualifier:
+                raise _Unsupported("별칭 중복")
+            dim_aliases.add(alias)
+            j = _join_condition_end(tokens, j, DIMENSION_KEYS[table], alias, qualifier)
+        else:
+            raise _Unsupported(f"롤업으로 답할 수 없는 테이블 구성: {table}")
+        skip.update(range(i, j))
+        i = j
+
+    if fact_index is None:
+        raise _Unsupported("팩트 테이블 없음")
+    return _Tables(fact_index, qualifier, dim_aliases, from_index, skip)
+
+
+def _column_refs(tokens, tables: _Tables) -> List[_Ref]:
+    """FROM 절 밖의 팩트 컬럼 참조"""
+    refs: List[_Ref] = []
+    for i, (kind, text) in enumerate(tokens):
+        if kind != WORD or i in tables.skip or _is(tokens, i - 1, "."):
+            continue
+        if _is(tokens, i + 1, "."):
+            column = _word(tokens, i + 2)
+            if column is None:
+                raise _Unsupported("따옴표 컬럼")
+            if text == tables.qualifier:
+                refs.append(_Ref(column, i, i + 2))
+            elif text not in tables.dim_aliases:
+                raise _Unsupported(f"알 수 없는 한정자: {text}")
+        elif text in _FACT_ONLY_COLUMNS:
+            refs.append(_Ref(text, i, i))
+        elif text == "created_at":
+            raise _Unsupported("created_at")
+    return refs
+
+
+def _month_safe(tokens, ref: _Ref) -> bool:
+    """DATE_TRUNC('month', sale_date) / EXTRACT(YEAR FROM sale_date) 안의 sale_date인지"""
+    if ref.start < 4 or not _is(tokens, ref.end + 1, ")"):
+        return False
+    before = [text for _, text in tokens[ref.start - 4:ref.start]]
+    if before[:2] == ["date_trunc", "("] and before[3] == ",":
+        unit = tokens[ref.start - 2]
+        return unit[0] == STRING and unit[1][1:-1].lower() in _MONTH_SAFE_UNITS
+    if before[:2] == ["extract", "("] and before[3] == "from":
+        return before[2] in _MONTH_SAFE_UNITS
+    return False
+
+
+def _aggregate_replacement(tokens, name: str, start: int, end: int, refs: List[_Ref]) -> Optional[str]:
+    """
+    집계 호출 tokens[start..end]의 롤업용 식 ({q}는 롤업 한정자, 그대로 두면 None)
+
+    Raises:
+        _Unsupported: 롤업 행으로 같은 값을 낼 수 없는 집계
+    """
+    args = [text for _, text in tokens[start + 2:end]]
+    distinct = args[:1] == ["distinct"]
+    inner = [r for r in refs if start < r.start and r.end < end]
+    whole = len(inner) == 1 and inner[0].start == start + 2 + distinct and inner[0].end == end - 1
+    amount = any(r.column == "disbursed_amount" for r in inner)
+    row_id = any(r.column in _ROW_ID_COLUMNS for r in inner)
+
+    if name in ("sum", "avg") and not distinct and whole and inner[0].column == "disbursed_amount":
+        if name == "sum":
+            return "SUM({q}.total_amount)"
+        return "(SUM({q}.total_amount) / NULLIF(SUM({q}.sale_count), 0))"
+    if name == "count" and (args in (["*"], ["1"]) or (whole and row_id)):
+        # 맞는 행이 없을 때 COUNT는 0, SUM은 NULL
+        return "COALESCE(SUM({q}.sale_count), 0)::BIGINT"
+    if (name == "count" and distinct or name in _DUPLICATE_INSENSITIVE) and not amount and not row_id:
+        return None
+    raise _Unsupported(f"롤업으로 계산할 수 없는 집계: {name.upper()}")
+
+
+@lru_cache(maxsize=1024)
+def _rewrite(sql: str, available: FrozenSet[str]) -> Tuple[Optional[str], str]:
+    """(재작성된 SQL 또는 None, 사용한 롤업 테이블 또는 건너뛴 이유)"""
+    try:
+        tokens = _significant(sql)
+        words = [text for kind, text in tokens if kind == WORD]
+        if words.count("select") != 1:
+            raise _Unsupported("하위 쿼리")
+        unsupported = _UNSUPPORTED_WORDS.intersection(words)
+        if unsupported:
+            raise _Unsupported(", ".join(sorted(unsupported)))
+
+        tables = _parse_tables(tokens)
+        refs = _column_refs(tokens, tables)
+
+        replaced: Dict[int, Tuple[int, str]] = {}  # 시작 위치 → (끝 위치, 대체 텍스트)
+        for i, (kind, text) in enumerate(tokens):
+            if kind == WORD and text in _AGGREGATES and _is(tokens, i + 1, "(") and i not in tables.skip:
+                end = _closing(tokens, i + 1)
+                replacement = _aggregate_replacement(tokens, text, i, end, refs)
+                if replacement is None:
+                    continue
+                if any(start < i <= e for start, (e, _) in replaced.items()):
+                    raise _Unsupported("중첩 집계")
+                # SELECT 목록의 별칭 없는 집계는 원래 컬럼명 유지
+                if (
+                    text in _DEFAULT_COLUMN_NAMES
+                    and end < tables.from_index
+                    and (_is(tokens, i - 1, ",") or _word(tokens, i - 1) == "select")
+                    and (_is(tokens, end + 1, ",") or end + 1 == tables.from_index)
+                ):
+                    replacement += f" AS {_DEFAULT_COLUMN_NAMES[text]}"
+                replaced[i] = (end, replacement)
+        if not replaced:
+            raise _Unsupported("롤업 대상 집계 없음")
+    except (_Unsupported, ValueError) as e:
+        return None, str(e)
+
+    def covered(ref: _Ref) -> bool:
+        return any(start < ref.start and ref.end < end for start, (end, _) in replaced.items())
+
+    free_refs = [r for r in refs if not covered(r)]
+    for ref in free_refs:
+        if ref.column not in _KEY_COLUMNS and ref.column != "sale_date":
+            return None, f"집계 밖의 {ref.column}"
+
+    date_refs = [r for r in free_refs if r.column == "sale_date"]
+    monthly = all(_month_safe(tokens, r) for r in date_refs)
+    rollup = next((r for r in ROLLUPS if r.table in available and (monthly or not r.monthly)), None)
+    if rollup is None:
+        return None, "사용 가능한 롤업 없음"
+
+    qualifier = rollup.table if tables.qualifier == FACT_TABLE else tables.qualifier
+    replaced = {start: (end, text.format(q=qualifier)) for start, (end, text) in replaced.items()}
+    for ref in date_refs:
+        replaced[ref.end] = (ref.end, rollup.date_column)
+
+    # 원본 토큰(공백 포함)을 이어 붙이며 치환 (치환 범위 안의 공백/주석은 버림)
+    output: List[str] = []
+    index = -1
+    skip_to = -1
+    for kind, text in tokenize(sql):
+        if kind in (SPACE, COMMENT, SEMICOLON):
+            if index >= skip_to:
+                output.append(" " if kind == COMMENT else text)
+            continue
+        index += 1
+        if index <= skip_to:
+            continue
+        if index in replaced:
+            skip_to, text = replaced[index]
+        elif kind == WORD and text.lower() == FACT_TABLE:
+            text = rollup.table
+        output.append(text)
+
+    return "".join(output), rollup.table
+
+
+_available: FrozenSet[str] = frozenset()
+
+
+def set_available_rollups(tables) -> None:
+    """DB에 실제로 있는 롤업 테이블 등록 (없는 롤업으로는 재작성하지 않음)"""
+    global _available
+    _available = frozenset(t for t in tables if any(r.table == t for r in ROLLUPS))
+    logger.info(f"사용 가능한 롤업: {', '.join(sorted(_available)) or '없음'}")
+
+
+def rewrite_for_rollup(sql: str) -> str:
+    """
+    검증된 SQL을 롤업으로 답할 수 있으면 롤업 쿼리로, 아니면 그대로 반환
+
+    같은 SQL의 판정은 캐시되므로 반복 호출 비용이 거의 없습니다.
+    """
+    if not _available:
+        return sql
+    rewritten, detail = _rewrite(sql, _available)
+    if rewritten is None:
+        metrics.increment("rollup.skipped")
+        logger.debug(f"롤업 재작성 안 함: {detail}")
+        return sql
+    metrics.increment(f"rollup.rewritten.{detail}")
+    logger.info(f"롤업 재작성 ({detail}): {rewritten[:100]}...")
+    return rewritten
@@ -16,7 +16,83 @@ class Settings:
         # LLM API
         self.LLM_API_KEY = os.getenv("LLM_API_KEY", "")
         self.LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
-        self.LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        default_model = "claude-3-5-sonnet-20241022" if self.LLM_PROVIDER.lower() == "anthropic" else "gpt-4o-mini"
+        self.LLM_MODEL = os.getenv("LLM_MODEL", default_model)
+
+        # 쿼리 결과 제한 (서버 측 커서에서 이 한도까지만 가져옴)
+        self.QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "1000"))
+        self.QUERY_MAX_BYTES = int(os.getenv("QUERY_MAX_BYTES", str(8 * 1024 * 1024)))
+        self.QUERY_FETCH_SIZE = int(os.getenv("QUERY_FETCH_SIZE", "200"))
+
+        # 실행 전 EXPLAIN 비용 점검 (추정 비용 기준, 0이면 해당 제한 비활성)
+        self.QUERY_MAX_COST = float(os.getenv("QUERY_MAX_COST", "1000000"))
+        self.QUERY_DOWNSCOPE_COST = float(os.getenv("QUERY_DOWNSCOPE_COST", "200000"))
+        self.QUERY_DOWNSCOPE_ROWS = int(os.getenv("QUERY_DOWNSCOPE_ROWS", "100"))
+        self.QUERY_MAX_JOIN_ROWS = int(os.getenv("QUERY_MAX_JOIN_ROWS", "10000000"))
+        # 쿼리별 statement_timeout 범위 (추정 비용과 과거 실행 시간으로 이 안에서 결정)
+        self.QUERY_TIMEOUT_MIN_SECONDS = float(os.getenv("QUERY_TIMEOUT_MIN_SECONDS", "1"))
+        self.QUERY_TIMEOUT_MAX_SECONDS = float(os.getenv("QUERY_TIMEOUT_MAX_SECONDS", "10"))
+        # 집계 쿼리를 롤업 테이블(db/rollups.sql)로 재작성 (롤업 테이블이 있을 때만 적용)
+        self.ROLLUP_REWRITE_ENABLED = os.getenv("ROLLUP_REWRITE_ENABLED", "true").lower() == "true"
+
+        # 동시성 (이벤트 루프를 막지 않도록 블로킹 호출을 실행할 워커 수)
+        self.DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "10"))
+        self.DB_MIN_CONNECTIONS = int(os.getenv("DB_MIN_CONNECTIONS", "1"))
+        # 커넥션이 모두 사용 중일 때 기다리는 최대 시간
+        self.DB_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_ACQUIRE_TIMEOUT_SECONDS", "5"))
+        # 유휴/수명 초과 커넥션은 닫고 새로 연결 (DB 재시작 후 끊긴 커넥션 정리)
+        self.DB_MAX_IDLE_SECONDS = float(os.getenv("DB_MAX_IDLE_SECONDS", "300"))
+        self.DB_MAX_LIFETIME_SECONDS = float(os.getenv("DB_MAX_LIFETIME_SECONDS", "3600"))
+        # 커넥션마다 보관할 준비된 문장 수 (같은 형태 쿼리의 파싱/계획 생략, 0이면 비활성)
+        self.DB_PREPARED_STATEMENTS = int(os.getenv("DB_PREPARED_STATEMENTS", "100"))
+        self.VANNA_MAX_WORKERS = int(os.getenv("VANNA_MAX_WORKERS", "4"))
+        # Vanna 학습 내용 해시 기록 (같으면 재시작 시 학습 생략)
+        self.VANNA_MANIFEST_PATH = os.getenv("VANNA_MANIFEST_PATH", ".vanna_manifest.json")
+        # 이 크기(바이트) 이상인 /chat 응답은 zstd/gzip 압축 (Accept-Encoding 기준)
+        self.RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+        # 라인 차트 최대 점 수 (넘으면 LTTB로 다운샘플링, 0이면 비활성)
+        self.CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "300"))
+        # 질문과 관련된 테이블/KPI/규칙만 프롬프트에 포함 (false면 전체를 캐시 가능한 프리픽스로)
+        self.PROMPT_PRUNING_ENABLED = os.getenv("PROMPT_PRUNING_ENABLED", "true").lower() == "true"
+        # Vanna가 지연되면 기본 LLM을 동시에 시작해 먼저 검증을 통과한 SQL 사용
+        self.SQL_HEDGE_ENABLED = os.getenv("SQL_HEDGE_ENABLED", "true").lower() == "true"
+        # 기본 LLM 시작 전 대기 시간 (초, 0이면 최근 Vanna 지연시간 p90)
+        self.SQL_HEDGE_DELAY_SECONDS = float(os.getenv("SQL_HEDGE_DELAY_SECONDS", "0"))
+
+        # 판매 데이터 적재 API (/ingest/sales, 키가 비어 있으면 비활성)
+        self.INGEST_API_KEY = os.getenv("INGEST_API_KEY", "")
+        # 동시에 처리할 적재 배치 수 (적재 전용 커넥션 수, /chat 풀과 별개)
+        self.INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "2"))
+        self.INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.INGEST_TIMEOUT_SECONDS = float(os.getenv("INGEST_TIMEOUT_SECONDS", "300"))
+        # 월 파티션 레이아웃(db/partitioned.sql)이면 시작 시와 하루마다 이만큼 앞의 월 파티션 생성 (0이면 비활성)
+        self.SALES_PARTITION_AHEAD_MONTHS = int(os.getenv("SALES_PARTITION_AHEAD_MONTHS", "3"))
+
+        # 실행 쿼리 기록 (지문/실행 시간/행 수/계획 요약을 JSON Lines로 추가, 비우면 메모리 집계만)
+        self.QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", ".query_log.jsonl")
+        self.QUERY_LOG_MAX_BYTES = int(os.getenv("QUERY_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+        # 관리 API (/admin/queries, 키가 비어 있으면 비활성)
+        self.ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
+        # LLM HTTP 커넥션 (프로세스당 한 번 생성되어 재사용)
+        self.LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+        self.LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+        self.LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+        # 유휴 시간이 이 값을 넘으면 백그라운드에서 커넥션을 다시 데워둠 (0이면 비활성)
+        self.LLM_WARMUP_INTERVAL_SECONDS = float(os.getenv("LLM_WARMUP_INTERVAL_SECONDS", "60"))
+
+        # 질문 → SQL 캐시
+        self.QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", "1000"))
+        self.QUESTION_CACHE_TTL_SECONDS = float(os.getenv("QUESTION_CACHE_TTL_SECONDS", "3600"))
+        # 유사 질문 판정 임계값 (0이면 유사 조회 비활성)
+        self.QUESTION_CACHE_SIMILARITY = float(os.getenv("QUESTION_CACHE_SIMILARITY", "0.85"))
+
+        # 쿼리 결과 캐시
+        self.RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+        # CURRENT_DATE 해석 기준 (DB 세션 시간대와 같아야 함, Supabase 기본값 UTC)
+        self.RESULT_CACHE_TIMEZONE = os.getenv("RESULT_CACHE_TIMEZONE", "UTC")
         
         # CORS
         cors_origins_str = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173,http://127.0.0.1:8080")
@@ -0,0 +1,77 @@
+"""Single-flight - 같은 키로 동시에 들어온 작업은 한 번만 실행하고 결과 공유
+
+대시보드 새로고침처럼 같은 질문이 한꺼번에 들어오면 첫 요청(leader)만 SQL 생성/쿼리를
+실행하고, 실행 중에 들어온 같은 요청(follower)은 그 결과를 기다립니다.
+
+- 결과와 예외(HTTPException, TimeoutError 등)는 기다리던 모든 요청에 그대로 전달
+- 작업은 별도 태스크로 실행되므로 leader 요청이 취소되어도 follower는 계속 기다림
+- 기다리는 요청이 모두 취소되면 작업도 취소
+- 작업이 끝나면 키를 지우므로 결과를 보관하지 않음 (보관은 질문/결과 캐시의 역할)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    키별 진행 중 작업 공유 (이벤트 루프 안에서만 사용, 스레드 안전하지 않음)
+
+    Args:
+        name: 메트릭 이름 (single_flight.<name>.leader / .coalesced)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = {"leader": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """key로 진행 중인 작업이 있으면 그 결과를, 없으면 fn()을 실행해 결과를 반환"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self._count("leader")
+        else:
+            self._count("coalesced")
+            logger.info(f"진행 중인 같은 요청 결과 대기 ({self.name})")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 기다리는 요청이 없으면 (모두 취소됨) 작업도 중단
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._calls)}
+
+    def _count(self, kind: str) -> None:
+        self._stats[kind] += 1
+        metrics.increment(f"single_flight.{self.name}.{kind}")
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 모두 취소된 뒤 실패한 작업의 예외는 아무도 받지 않으므로 여기서 꺼내 경고 방지
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,95 @@
+"""SQL 토크나이저 - 문자열 리터럴/따옴표 식별자/주석을 구분하는 단일 패스 렉서
+
+정규식 대안(alternation) 하나로 SQL을 앞에서부터 한 번만 훑으므로 O(n)입니다.
+문자열 안의 'DROP'이나 주석 안의 세미콜론을 키워드/구분자로 오인하지 않습니다.
+
+PostgreSQL 렉서와 같은 규칙을 따릅니다:
+- 식별자는 첫 글자 이후 '$'를 포함할 수 있음 (a$b$는 식별자 하나)
+- 달러 인용($tag$...$tag$)은 식별자/숫자 바로 뒤에서 시작할 수 없음
+- 블록 주석은 중첩됨 (/* /* */ */)
+"""
+
+import re
+from typing import List, NamedTuple
+
+# 토큰 종류
+WORD = "word"            # 키워드/식별자 (select, sale_date)
+QUOTED = "quoted"        # 따옴표 식별자 ("지점명")
+STRING = "string"        # 문자열 리터럴 ('2024-01-01', E'...', $$...$$)
+NUMBER = "number"        # 숫자 리터럴 (1000, 3.5, 1e6)
+PARAM = "param"          # 위치 파라미터 ($1)
+COMMENT = "comment"      # -- 한 줄 주석 / /* 블록 주석 */
+SPACE = "space"          # 공백
+SEMICOLON = "semicolon"  # 문장 구분자
+OPEN = "open"            # (
+CLOSE = "close"          # )
+OP = "op"                # 그 외 연산자/구두점
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*)
+    | (?P<block>/\*)
+    | (?P<string>[eE]'(?:\\.|''|[^'\\])*'|'(?:''|[^'])*'|\$(?P<tag>(?:[^\W\d]\w*)?)\$.*?\$(?P=tag)\$)
+    | (?P<quoted>"(?:""|[^"])*")
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<param>\$\d+)
+    | (?P<unterminated>['"$])
+    | (?P<word>[^\W\d][\w$]*)
+    | (?P<semicolon>;)
+    | (?P<open>\()
+    | (?P<close>\))
+    | (?P<op>::|<=|>=|<>|!=|\|\||[^\s\w'"()$;])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# 짝이 맞지 않아 토큰이 될 수 없는 시작 문자
+_UNTERMINATED = {"'": "문자열 리터럴", '"': "따옴표 식별자", "$": "달러 인용 문자열"}
+
+# 블록 주석 안에서 중첩 열기/닫기를 찾는 패턴
+_BLOCK_RE = re.compile(r"/\*|\*/")
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+
+
+def _block_comment_end(sql: str, start: int) -> int:
+    """start의 /* 로 시작한 (중첩 가능한) 블록 주석이 끝나는 위치"""
+    depth = 0
+    for m in _BLOCK_RE.finditer(sql, start):
+        depth += 1 if m.group() == "/*" else -1
+        if depth == 0:
+            return m.end()
+    raise ValueError(f"닫히지 않은 블록 주석 (위치 {start})")
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    SQL을 토큰 리스트로 분해 (토큰 text를 이어 붙이면 원문과 같음)
+
+    Raises:
+        ValueError: 닫히지 않은 문자열/식별자/주석 등 토큰화할 수 없는 입력
+    """
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if m is None:
+            raise ValueError(f"토큰화할 수 없는 문자 (위치 {pos})")
+        kind = m.lastgroup
+        if kind == "unterminated":
+            raise ValueError(f"닫히지 않은 {_UNTERMINATED[m.group()]} (위치 {pos})")
+        if kind == "block":
+            end = _block_comment_end(sql, pos)
+            tokens.append(Token(COMMENT, sql[pos:end]))
+            pos = end
+            continue
+        if kind in (STRING, PARAM) and m.group()[0] == "$" and tokens and tokens[-1].kind in (WORD, NUMBER):
+            # 식별자/숫자에 붙은 '$'는 달러 인용이나 파라미터가 아님
+            raise ValueError(f"잘못된 위치의 '$' (위치 {pos})")
+        tokens.append(Token(kind, m.group()))
+        pos = m.end()
+    return tokens
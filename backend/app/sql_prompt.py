@@ -1,63 +1,108 @@
-"""SQL 생성을 위한 프롬프트 템플릿"""
+"""SQL 생성을 위한 프롬프트 템플릿
 
-# 데이터베이스 스키마 정의
-SCHEMA_INFO = """
-## 데이터베이스 스키마
+프롬프트는 두 부분으로 나뉩니다.
 
-### 1. dim_branch (지점 테이블)
+- 정적 프리픽스: 역할/전체 테이블 스키마/공통 규칙/예시 질문-SQL/요구사항. 모든 질문에 바이트 단위로
+  같으므로 system 메시지로 보내 제공자 프롬프트 캐시(Anthropic cache_control, OpenAI 자동 프리픽스 캐시)가
+  적중하게 함. 제공자 캐시는 프리픽스가 최소 길이(MIN_CACHEABLE_TOKENS) 이상일 때만 적용되므로
+  스키마와 예시를 모두 프리픽스에 둠
+- 질문별 부분: 질문과 관련된 KPI 정의/추가 규칙만 골라 붙인 뒤 질문
+
+KPI/규칙 섹션은 키워드(공백 제거, 소문자 기준)나 패턴으로 고르며, 확실하지 않으면 포함합니다
+(지표를 알 수 없으면 판매량/판매액 정의 모두 포함). 한 글자 기간 단어(월/년/일)는 다른 단어
+("제일", "월요일")에도 들어 있으므로 숫자 뒤("3월", "2024년")에 올 때만 기간으로 봅니다.
+PROMPT_PRUNING_ENABLED=false이면 모든 섹션을 정적 프리픽스에 넣습니다.
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app import metrics
+from app.kpi_templates import mentioned_dimensions
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PromptSection(NamedTuple):
+    name: str
+    text: str
+    keywords: Tuple[str, ...] = ()  # 질문에 하나라도 있으면 포함
+    pattern: Optional[re.Pattern] = None  # 질문에서 찾으면 포함 (키워드와 함께 사용)
+
+
+class SqlPrompt(NamedTuple):
+    static: str                 # 모든 질문에 같은 프리픽스 (system 메시지, 캐시 대상)
+    dynamic: str                # 질문별 KPI/규칙 + 질문 (user 메시지)
+    sections: Tuple[str, ...]   # 포함한 섹션 이름
+
+    def __str__(self) -> str:
+        return f"{self.static}\n\n{self.dynamic}"
+
+
+_BRANCH_KEYWORDS = (
+    "지점", "본점", "점포", "지역", "담당", "어디", "어느곳", "branch", "region", "manager",
+)
+_PRODUCT_KEYWORDS = (
+    "상품", "카테고리", "금융", "대출", "리스", "보증", "신차", "중고", "product", "category",
+)
+_PERIOD_KEYWORDS = (
+    "월별", "매월", "월간", "이달", "전월", "연도별", "년도", "연간", "연별", "일별", "일자", "일간",
+    "분기", "기간", "추이", "최근", "지난", "이번", "작년", "올해", "금년", "전년", "날짜", "오늘", "어제",
+    "date", "month", "quarter", "year",
+)
+# "3월", "2024년", "15일", "6개월" 처럼 숫자 뒤의 기간 단위
+_PERIOD_PATTERN = re.compile(r"\d+(?:년|월|일|주|개월|분기)")
+
+# 데이터베이스 스키마 정의 (테이블별, 모두 정적 프리픽스)
+TABLE_SECTIONS = [
+    PromptSection("dim_branch", """### dim_branch (지점 테이블)
 - branch_id (INT, PRIMARY KEY): 지점 ID
 - branch_name (VARCHAR): 지점명 (예: '서울본점', '부산지점')
 - region (VARCHAR): 지역 (예: '서울', '부산')
 - manager_name (VARCHAR): 담당자명
-
-### 2. dim_product (상품 테이블)
+- 관계: fact_loan_sales.branch_id → dim_branch.branch_id"""),
+    PromptSection("dim_product", """### dim_product (상품 테이블)
 - product_id (INT, PRIMARY KEY): 상품 ID
 - product_name (VARCHAR): 상품명 (예: '신차구매금융', '중고차금융')
 - product_category (VARCHAR): 상품 카테고리 (예: '신차', '중고차', '담보대출', '리스', '보증')
 - description (VARCHAR): 상품 설명
-
-### 3. fact_loan_sales (대출 판매 실적 테이블)
+- 관계: fact_loan_sales.product_id → dim_product.product_id"""),
+    PromptSection("fact_loan_sales", """### fact_loan_sales (대출 판매 실적 테이블)
 - contract_id (VARCHAR, PRIMARY KEY): 계약 ID
 - branch_id (INT, FOREIGN KEY): 지점 ID
 - product_id (INT, FOREIGN KEY): 상품 ID
 - sale_date (DATE): 판매일자
 - disbursed_amount (BIGINT): 대출 실행금액 (원 단위)
-- quantity (INT): 수량 (보통 1)
-
-## 테이블 관계
-- fact_loan_sales.branch_id → dim_branch.branch_id
-- fact_loan_sales.product_id → dim_product.product_id
-"""
+- quantity (INT): 수량 (보통 1)"""),
+]
 
 # KPI 정의
-KPI_DEFINITIONS = """
-## 주요 KPI 정의
-
-1. **판매량 (계약 건수)**
-   - COUNT(DISTINCT contract_id) 또는 COUNT(*)
-   - 모든 계약 건수 집계
-
-2. **판매액 (대출 실행액)**
-   - SUM(disbursed_amount)
-   - 단위: 원 (억원으로 표시할 경우 /100000000)
-
-3. **지점별 실적**
-   - dim_branch.branch_name으로 그룹화
-   - JOIN을 통해 지점명 표시
-
-4. **상품별 실적**
-   - dim_product.product_name으로 그룹화
-   - JOIN을 통해 상품명 표시
-
-5. **기간별 집계**
-   - sale_date로 필터링 및 그룹화
-   - 월별: DATE_TRUNC('month', sale_date)
-   - 분기별: DATE_TRUNC('quarter', sale_date)
-"""
+KPI_SECTIONS = [
+    PromptSection("kpi_count", """- **판매량 (계약 건수)**
+  - COUNT(DISTINCT contract_id) 또는 COUNT(*)
+  - 모든 계약 건수 집계""", ("건수", "판매량", "계약", "몇", "수량", "개수", "count")),
+    PromptSection("kpi_amount", """- **판매액 (대출 실행액)**
+  - SUM(disbursed_amount)
+  - 단위: 원 (억원으로 표시할 경우 /100000000)""", (
+        "판매액", "금액", "실행액", "매출", "억", "평균", "합계", "총", "실적", "amount",
+    )),
+    PromptSection("kpi_branch", """- **지점별 실적**
+  - dim_branch.branch_name으로 그룹화
+  - JOIN을 통해 지점명 표시""", _BRANCH_KEYWORDS),
+    PromptSection("kpi_product", """- **상품별 실적**
+  - dim_product.product_name으로 그룹화
+  - JOIN을 통해 상품명 표시""", _PRODUCT_KEYWORDS),
+    PromptSection("kpi_period", """- **기간별 집계**
+  - sale_date로 필터링 및 그룹화
+  - 월별: DATE_TRUNC('month', sale_date)
+  - 분기별: DATE_TRUNC('quarter', sale_date)""", _PERIOD_KEYWORDS, _PERIOD_PATTERN),
+]
 
-# SQL 작성 규칙
-SQL_RULES = """
-## SQL 작성 규칙
+# SQL 작성 규칙 (공통 규칙은 정적 프리픽스, 날짜 처리는 기간 질문에만)
+RULES_CORE = """## SQL 작성 규칙
 
 1. **필수 사항**
    - SELECT 문만 사용
@@ -75,44 +120,181 @@ SQL_RULES = """
 3. **금지 사항**
    - DROP, TRUNCATE, INSERT, UPDATE, DELETE 등 DML/DDL
    - 여러 개의 SQL 문 (;로 구분된 다중 쿼리)
-   - 시스템 테이블이나 정보 스키마 접근
+   - 시스템 테이블이나 정보 스키마 접근"""
 
-4. **날짜 처리**
-   - PostgreSQL 날짜 함수 사용
-   - 예: WHERE sale_date >= '2024-01-01' AND sale_date < '2024-02-01'
-   - 예: DATE_TRUNC('month', sale_date) AS month
-"""
+RULE_SECTIONS = [
+    PromptSection("rule_date", """- **날짜 처리**
+  - PostgreSQL 날짜 함수 사용
+  - 예: WHERE sale_date >= '2024-01-01' AND sale_date < '2024-02-01'
+  - 예: DATE_TRUNC('month', sale_date) AS month""", _PERIOD_KEYWORDS, _PERIOD_PATTERN),
+]
+
+# 예시 질문 → SQL (정적 프리픽스, 자주 묻는 유형과 작성 방식)
+FEW_SHOT_EXAMPLES = [
+    ("지난 달 전체 판매액은?", """SELECT SUM(f.disbursed_amount) AS total_sales_amount
+FROM fact_loan_sales f
+WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+  AND f.sale_date < DATE_TRUNC('month', CURRENT_DATE);"""),
+    ("서울본점의 이번 달 계약 건수는?", """SELECT COUNT(*) AS contract_count
+FROM fact_loan_sales f
+JOIN dim_branch b ON f.branch_id = b.branch_id
+WHERE b.branch_name = '서울본점'
+  AND f.sale_date >= DATE_TRUNC('month', CURRENT_DATE);"""),
+    ("상위 5개 지점의 올해 판매액은?", """SELECT b.branch_name, SUM(f.disbursed_amount) AS total_sales_amount
+FROM fact_loan_sales f
+JOIN dim_branch b ON f.branch_id = b.branch_id
+WHERE f.sale_date >= DATE_TRUNC('year', CURRENT_DATE)
+GROUP BY b.branch_name
+ORDER BY total_sales_amount DESC
+LIMIT 5;"""),
+    ("최근 6개월 상품별 월별 판매액 추이", """SELECT DATE_TRUNC('month', f.sale_date) AS month, p.product_name,
+       SUM(f.disbursed_amount) AS total_sales_amount
+FROM fact_loan_sales f
+JOIN dim_product p ON f.product_id = p.product_id
+WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '5 months')
+GROUP BY DATE_TRUNC('month', f.sale_date), p.product_name
+ORDER BY month, p.product_name;"""),
+    ("지역별 상품 카테고리별 평균 대출 실행액", """SELECT b.region, p.product_category, AVG(f.disbursed_amount) AS avg_sales_amount
+FROM fact_loan_sales f
+JOIN dim_branch b ON f.branch_id = b.branch_id
+JOIN dim_product p ON f.product_id = p.product_id
+GROUP BY b.region, p.product_category
+ORDER BY b.region, avg_sales_amount DESC;"""),
+    ("지점별 이번 달과 지난 달 판매액 비교", """SELECT b.branch_name,
+       SUM(f.disbursed_amount) FILTER (WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE)) AS this_month_amount,
+       SUM(f.disbursed_amount) FILTER (WHERE f.sale_date < DATE_TRUNC('month', CURRENT_DATE)) AS last_month_amount
+FROM fact_loan_sales f
+JOIN dim_branch b ON f.branch_id = b.branch_id
+WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+GROUP BY b.branch_name
+ORDER BY this_month_amount DESC NULLS LAST;"""),
+    ("2024년 분기별 신차구매금융 계약 건수와 판매액(억원)", """SELECT DATE_TRUNC('quarter', f.sale_date) AS quarter,
+       COUNT(*) AS contract_count,
+       ROUND(SUM(f.disbursed_amount) / 100000000.0, 2) AS total_sales_amount_100m
+FROM fact_loan_sales f
+JOIN dim_product p ON f.product_id = p.product_id
+WHERE p.product_name = '신차구매금융'
+  AND f.sale_date >= DATE '2024-01-01' AND f.sale_date < DATE '2025-01-01'
+GROUP BY DATE_TRUNC('quarter', f.sale_date)
+ORDER BY quarter;"""),
+]
+
+INTRO = "당신은 PostgreSQL SQL 전문가입니다. 아래 규칙과 데이터베이스 스키마를 참고하여 사용자 질문에 대한 SQL 쿼리를 생성하세요."
+
+REQUIREMENTS = """## 요구사항
+- 사용자 질문에 답변할 수 있는 PostgreSQL SELECT 쿼리를 생성하세요
+- 한국어 질문이므로 적절한 테이블과 컬럼을 매핑하세요
+- 명확한 컬럼명과 별칭을 사용하세요
+- 필요시 JOIN을 사용하여 지점명, 상품명을 포함하세요
+- 결과가 많을 경우 LIMIT을 추가하세요
+- SQL 쿼리만 반환하고 설명은 포함하지 마세요"""
+
+_SCHEMA_HEADER = "## 데이터베이스 스키마"
+_KPI_HEADER = "## 주요 KPI 정의"
+_RULES_HEADER = "## 추가 규칙"
+
+
+def _block(header: str, sections: List[PromptSection]) -> str:
+    return header + "\n\n" + "\n\n".join(s.text for s in sections) if sections else ""
+
+
+# 전체 스키마/KPI/규칙/예시 (질문 캐시 무효화 기준, 가지치기 비활성 시 정적 프리픽스)
+SCHEMA_INFO = _block(_SCHEMA_HEADER, TABLE_SECTIONS)
+KPI_DEFINITIONS = _block(_KPI_HEADER, KPI_SECTIONS)
+SQL_RULES = RULES_CORE + "\n\n" + _block(_RULES_HEADER, RULE_SECTIONS)
+EXAMPLES = "## 예시\n\n" + "\n\n".join(f"질문: {q}\nSQL:\n{sql}" for q, sql in FEW_SHOT_EXAMPLES)
+
+STATIC_PREFIX = f"{INTRO}\n\n{SCHEMA_INFO}\n\n{RULES_CORE}\n\n{EXAMPLES}\n\n{REQUIREMENTS}"
+FULL_STATIC_PREFIX = f"{INTRO}\n\n{SCHEMA_INFO}\n\n{KPI_DEFINITIONS}\n\n{SQL_RULES}\n\n{EXAMPLES}\n\n{REQUIREMENTS}"
+
+# 제공자 프롬프트 캐시가 적용되는 최소 프리픽스 길이 (Anthropic/OpenAI 모두 1024토큰)
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 대략 추정 (ASCII 4자당 1토큰, 한글 등은 글자당 1토큰)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+# 섹션별 토큰 수는 고정이므로 한 번만 계산
+_SECTION_TOKENS: Dict[str, int] = {s.name: estimate_tokens(s.text) for s in KPI_SECTIONS + RULE_SECTIONS}
+_STATIC_TOKENS = estimate_tokens(STATIC_PREFIX)
+_FULL_TOKENS = estimate_tokens(FULL_STATIC_PREFIX)
+
+
+def _matches(section: PromptSection, text: str) -> bool:
+    if not section.keywords and section.pattern is None:
+        return True
+    return any(k in text for k in section.keywords) or bool(section.pattern and section.pattern.search(text))
 
 
-def build_prompt(user_question: str) -> str:
+def select_sections(user_question: str) -> Tuple[List[PromptSection], List[PromptSection]]:
+    """
+    질문과 관련된 (KPI, 규칙) 섹션 선택
+
+    지점/상품은 키워드나 등록된 이름("부산", "중고차금융")이 있으면 포함합니다.
+    """
+    text = unicodedata.normalize("NFKC", user_question).lower().replace(" ", "")
+    has_branch, has_product = mentioned_dimensions(user_question)
+    forced = {"kpi_branch": has_branch, "kpi_product": has_product}
+
+    def pick(sections: List[PromptSection]) -> List[PromptSection]:
+        return [s for s in sections if forced.get(s.name) or _matches(s, text)]
+
+    kpis = pick(KPI_SECTIONS)
+    if not any(s.name in ("kpi_count", "kpi_amount") for s in kpis):
+        # 지표를 알 수 없으면 판매량/판매액 정의 모두 포함
+        kpis = [s for s in KPI_SECTIONS if s.name in ("kpi_count", "kpi_amount")] + kpis
+    return kpis, pick(RULE_SECTIONS)
+
+
+def build_prompt(user_question: str) -> SqlPrompt:
     """
     사용자 질문을 기반으로 SQL 생성 프롬프트 구성
-    
+
     Args:
         user_question: 사용자의 자연어 질문
-        
+
     Returns:
-        LLM에 전달할 완전한 프롬프트
+        정적 프리픽스와 질문별 부분으로 나뉜 프롬프트 (str()은 전체 프롬프트)
     """
-    prompt = f"""당신은 PostgreSQL SQL 전문가입니다. 다음 데이터베이스 스키마를 참고하여 사용자 질문에 대한 SQL 쿼리를 생성하세요.
+    question_block = f"## 사용자 질문\n{user_question}\n\nSQL:"
 
-{SCHEMA_INFO}
+    if not get_settings().PROMPT_PRUNING_ENABLED:
+        return SqlPrompt(FULL_STATIC_PREFIX, question_block, ("full",))
 
-{KPI_DEFINITIONS}
+    kpis, rules = select_sections(user_question)
+    dynamic = "\n\n".join(
+        block for block in (
+            _block(_KPI_HEADER, kpis),
+            _block(_RULES_HEADER, rules),
+            question_block,
+        ) if block
+    )
+    names = tuple(s.name for s in kpis + rules)
+    _log_tokens(names, question_block)
+    return SqlPrompt(STATIC_PREFIX, dynamic, names)
 
-{SQL_RULES}
 
-## 사용자 질문
-{user_question}
+def _log_tokens(names: Tuple[str, ...], question_block: str) -> None:
+    """섹션별 추정 토큰 수 기록 (prompt.tokens.<섹션>, 전체 스키마 대비 절약분)"""
+    static = _STATIC_TOKENS
+    sections = {name: _SECTION_TOKENS[name] for name in names}
+    question = estimate_tokens(question_block)
+    total = static + sum(sections.values()) + question
+    saved = max(0, _FULL_TOKENS + question - total)
 
-## 요구사항
-- 위 질문에 답변할 수 있는 PostgreSQL SELECT 쿼리를 생성하세요
-- 한국어 질문이므로 적절한 테이블과 컬럼을 매핑하세요
-- 명확한 컬럼명과 별칭을 사용하세요
-- 필요시 JOIN을 사용하여 지점명, 상품명을 포함하세요
-- 결과가 많을 경우 LIMIT을 추가하세요
-- SQL 쿼리만 반환하고 설명은 포함하지 마세요
+    metrics.increment("prompt.builds")
+    metrics.increment("prompt.tokens.static", static)
+    metrics.increment("prompt.tokens.question", question)
+    metrics.increment("prompt.tokens.pruned", saved)
+    for name, tokens in sections.items():
+        metrics.increment(f"prompt.tokens.{name}", tokens)
+
+    logger.info(
+        f"프롬프트 토큰(추정) {total} = 정적 {static} + "
+        + " + ".join(f"{name} {tokens}" for name, tokens in sections.items())
+        + f" + 질문 {question} (전체 KPI/규칙 대비 -{saved})"
+    )
 
-SQL:"""
-    
-    return prompt
@@ -1,9 +1,17 @@
 """Vanna AI - Text-to-SQL 프레임워크"""
 
 import os
+import json
+import asyncio
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+from app.settings import get_settings
+
 try:
     import vanna
     from vanna.remote import VannaDefault
@@ -16,22 +24,61 @@ logger = logging.getLogger(__name__)
 # Vanna 클라이언트 인스턴스
 _vanna_instance = None
 
+# 초기화 상태: pending → warming → ready | unavailable(패키지/키 없음) | failed
+_vanna_state = "pending"
+_init_lock = threading.Lock()
+
+# Vanna 호출(동기 HTTP)을 실행할 제한된 워커
+_vanna_executor = None
+
 
 def get_vanna_client():
-    """Vanna 클라이언트 가져오기 (싱글톤)"""
-    global _vanna_instance
+    """
+    Vanna 클라이언트 가져오기 (싱글톤)
+
+    동시에 여러 요청이 처음 호출해도 초기화(학습)는 한 번만 실행되도록 잠금으로 보호합니다.
+    """
+    global _vanna_instance, _vanna_state
     
-    if _vanna_instance is None:
-        _vanna_instance = initialize_vanna()
+    if _vanna_instance is not None or _vanna_state == "unavailable":
+        return _vanna_instance
+
+    with _init_lock:
+        if _vanna_instance is None and _vanna_state != "unavailable":
+            _vanna_state = "warming"
+            _vanna_instance = initialize_vanna()
+            if _vanna_instance is not None:
+                _vanna_state = "ready"
+            elif _vanna_state == "warming":
+                _vanna_state = "failed"
     
     return _vanna_instance
 
 
+def get_vanna_state() -> str:
+    """Vanna 초기화 상태"""
+    return _vanna_state
+
+
+def is_vanna_warm() -> bool:
+    """워밍업이 끝났는지 여부 (실패/미사용도 끝난 것으로 간주)"""
+    return _vanna_state not in ("pending", "warming")
+
+
+async def warmup_vanna() -> None:
+    """시작 시 백그라운드에서 Vanna 초기화 및 학습 (요청 경로와 같은 워커 사용)"""
+    loop = asyncio.get_running_loop()
+    vn = await loop.run_in_executor(get_vanna_executor(), get_vanna_client)
+    logger.info(f"Vanna 워밍업 종료 (상태: {_vanna_state}, 클라이언트: {'있음' if vn else '없음'})")
+
+
 def initialize_vanna():
-    """Vanna 초기화 및 스키마 학습"""
+    """Vanna 초기화 및 스키마 학습 (학습 내용이 매니페스트와 같으면 학습 생략)"""
+    global _vanna_state
     
     if not VANNA_AVAILABLE:
         logger.warning("Vanna 패키지가 설치되지 않음")
+        _vanna_state = "unavailable"
         return None
     
     api_key = os.getenv("LLM_API_KEY")
@@ -39,6 +86,7 @@ def initialize_vanna():
     
     if not api_key:
         logger.warning("LLM_API_KEY가 설정되지 않음")
+        _vanna_state = "unavailable"
         return None
     
     try:
@@ -46,8 +94,14 @@ def initialize_vanna():
         vn = VannaDefault(api_key=api_key, model=model)
         logger.info(f"Vanna 초기화 완료 (모델: {model})")
         
-        # 스키마 학습
-        train_vanna(vn)
+        # 스키마 학습 (이미 같은 내용으로 학습했으면 생략)
+        manifest_key = _manifest_key(api_key, model)
+        fingerprint = training_fingerprint()
+        if _load_manifest().get(manifest_key, {}).get("fingerprint") == fingerprint:
+            logger.info("학습 데이터 변경 없음 - Vanna 학습 생략")
+        else:
+            train_vanna(vn)
+            _save_manifest(manifest_key, fingerprint)
         
         return vn
         
@@ -56,128 +110,176 @@ def initialize_vanna():
         return None
 
 
-def train_vanna(vn):
-    """데이터베이스 스키마 및 KPI 정의 학습"""
-    
-    # 1. DDL 학습 - 테이블 스키마
-    ddl_statements = [
-        """
-        CREATE TABLE dim_branch (
-            branch_id INT PRIMARY KEY,
-            branch_name VARCHAR(100) NOT NULL,
-            region VARCHAR(50),
-            manager_name VARCHAR(100)
-        );
-        """,
+def _manifest_key(api_key: str, model: str) -> str:
+    """매니페스트 항목 키 (Vanna 계정/모델별로 학습 상태가 다름, 키 원문은 저장하지 않음)"""
+    return hashlib.sha256(f"{api_key}:{model}".encode("utf-8")).hexdigest()[:16]
+
+
+def _load_manifest() -> dict:
+    """학습 매니페스트 읽기 (없거나 손상되면 빈 dict)"""
+    path = get_settings().VANNA_MANIFEST_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Vanna 매니페스트 읽기 실패 (재학습): {e}")
+        return {}
+
+
+def _save_manifest(manifest_key: str, fingerprint: str) -> None:
+    """학습 완료 기록 (임시 파일에 쓴 뒤 교체하여 부분 기록 방지)"""
+    path = get_settings().VANNA_MANIFEST_PATH
+    manifest = _load_manifest()
+    manifest[manifest_key] = {"fingerprint": fingerprint, "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Vanna 매니페스트 저장 실패 (다음 시작 시 재학습): {e}")
+
+
+# Vanna 학습 데이터 (변경 시 질문 캐시가 무효화되고 재학습됨)
+
+# 1. DDL - 테이블 스키마
+DDL_STATEMENTS = [
+    """
+    CREATE TABLE dim_branch (
+        branch_id INT PRIMARY KEY,
+        branch_name VARCHAR(100) NOT NULL,
+        region VARCHAR(50),
+        manager_name VARCHAR(100)
+    );
+    """,
+    """
+    CREATE TABLE dim_product (
+        product_id INT PRIMARY KEY,
+        product_name VARCHAR(100) NOT NULL,
+        product_category VARCHAR(50),
+        description TEXT
+    );
+    """,
+    """
+    CREATE TABLE fact_loan_sales (
+        contract_id VARCHAR(50) PRIMARY KEY,
+        branch_id INT,
+        product_id INT,
+        sale_date DATE NOT NULL,
+        disbursed_amount BIGINT NOT NULL,
+        quantity INT DEFAULT 1,
+        FOREIGN KEY (branch_id) REFERENCES dim_branch(branch_id),
+        FOREIGN KEY (product_id) REFERENCES dim_product(product_id)
+    );
+    """
+]
+
+# 2. Documentation - 비즈니스 용어 및 KPI 정의
+DOCUMENTATIONS = [
+    """
+    판매량(계약 건수)은 fact_loan_sales 테이블의 contract_id를 카운트하여 계산합니다.
+    예: SELECT COUNT(*) FROM fact_loan_sales 또는 COUNT(DISTINCT contract_id)
+    """,
+    """
+    판매액(대출 실행액)은 fact_loan_sales 테이블의 disbursed_amount를 합산하여 계산합니다.
+    예: SELECT SUM(disbursed_amount) FROM fact_loan_sales
+    단위는 원(KRW)이며, 억원으로 표시할 경우 100000000으로 나눕니다.
+    """,
+    """
+    지점별 실적을 조회할 때는 dim_branch 테이블과 조인하여 branch_name을 사용합니다.
+    예: SELECT b.branch_name, SUM(f.disbursed_amount)
+        FROM fact_loan_sales f
+        JOIN dim_branch b ON f.branch_id = b.branch_id
+        GROUP BY b.branch_name
+    """,
+    """
+    상품별 실적을 조회할 때는 dim_product 테이블과 조인하여 product_name을 사용합니다.
+    예: SELECT p.product_name, COUNT(*)
+        FROM fact_loan_sales f
+        JOIN dim_product p ON f.product_id = p.product_id
+        GROUP BY p.product_name
+    """,
+    """
+    기간별 조회 시 sale_date 컬럼을 사용합니다.
+    '지난 달', '이번 달'과 같은 상대적 기간은 현재 날짜 기준으로 계산합니다.
+    예: WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+        AND sale_date < DATE_TRUNC('month', CURRENT_DATE)
+    """,
+    """
+    '서울본점', '부산지점'과 같은 지점명은 dim_branch.branch_name에 저장되어 있습니다.
+    지점명으로 검색할 때는 LIKE 연산자를 사용할 수 있습니다.
+    예: WHERE branch_name LIKE '%서울%'
+    """,
+    """
+    대출 상품은 product_category로 분류됩니다 (신차, 중고차, 담보대출, 리스, 보증 등).
+    상품 카테고리별 조회 시: WHERE product_category = '신차'
+    """
+]
+
+# 3. SQL 예제
+SQL_EXAMPLES = [
+    {
+        "question": "지난 달 전체 판매액은?",
+        "sql": """
+            SELECT SUM(disbursed_amount) AS total_sales_amount
+            FROM fact_loan_sales
+            WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+              AND sale_date < DATE_TRUNC('month', CURRENT_DATE)
         """
-        CREATE TABLE dim_product (
-            product_id INT PRIMARY KEY,
-            product_name VARCHAR(100) NOT NULL,
-            product_category VARCHAR(50),
-            description TEXT
-        );
-        """,
+    },
+    {
+        "question": "서울본점의 이번 달 계약 건수는?",
+        "sql": """
+            SELECT COUNT(*) AS contract_count
+            FROM fact_loan_sales f
+            JOIN dim_branch b ON f.branch_id = b.branch_id
+            WHERE b.branch_name LIKE '%서울본점%'
+              AND sale_date >= DATE_TRUNC('month', CURRENT_DATE)
         """
-        CREATE TABLE fact_loan_sales (
-            contract_id VARCHAR(50) PRIMARY KEY,
-            branch_id INT,
-            product_id INT,
-            sale_date DATE NOT NULL,
-            disbursed_amount BIGINT NOT NULL,
-            quantity INT DEFAULT 1,
-            FOREIGN KEY (branch_id) REFERENCES dim_branch(branch_id),
-            FOREIGN KEY (product_id) REFERENCES dim_product(product_id)
-        );
+    },
+    {
+        "question": "상위 5개 지점의 판매액은?",
+        "sql": """
+            SELECT b.branch_name, SUM(f.disbursed_amount) AS total_sales
+            FROM fact_loan_sales f
+            JOIN dim_branch b ON f.branch_id = b.branch_id
+            GROUP BY b.branch_name
+            ORDER BY total_sales DESC
+            LIMIT 5
         """
-    ]
+    }
+]
+
+
+def training_fingerprint() -> str:
+    """학습 데이터(DDL/문서/SQL 예제) 내용의 해시"""
+    payload = json.dumps(
+        {"ddl": DDL_STATEMENTS, "documentation": DOCUMENTATIONS, "sql": SQL_EXAMPLES},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def train_vanna(vn):
+    """데이터베이스 스키마 및 KPI 정의 학습"""
     
-    for ddl in ddl_statements:
+    # 1. DDL 학습 - 테이블 스키마
+    for ddl in DDL_STATEMENTS:
         vn.train(ddl=ddl)
     
     logger.info("DDL 학습 완료")
     
     # 2. Documentation 학습 - 비즈니스 용어 및 KPI 정의
-    documentations = [
-        """
-        판매량(계약 건수)은 fact_loan_sales 테이블의 contract_id를 카운트하여 계산합니다.
-        예: SELECT COUNT(*) FROM fact_loan_sales 또는 COUNT(DISTINCT contract_id)
-        """,
-        """
-        판매액(대출 실행액)은 fact_loan_sales 테이블의 disbursed_amount를 합산하여 계산합니다.
-        예: SELECT SUM(disbursed_amount) FROM fact_loan_sales
-        단위는 원(KRW)이며, 억원으로 표시할 경우 100000000으로 나눕니다.
-        """,
-        """
-        지점별 실적을 조회할 때는 dim_branch 테이블과 조인하여 branch_name을 사용합니다.
-        예: SELECT b.branch_name, SUM(f.disbursed_amount)
-            FROM fact_loan_sales f
-            JOIN dim_branch b ON f.branch_id = b.branch_id
-            GROUP BY b.branch_name
-        """,
-        """
-        상품별 실적을 조회할 때는 dim_product 테이블과 조인하여 product_name을 사용합니다.
-        예: SELECT p.product_name, COUNT(*)
-            FROM fact_loan_sales f
-            JOIN dim_product p ON f.product_id = p.product_id
-            GROUP BY p.product_name
-        """,
-        """
-        기간별 조회 시 sale_date 컬럼을 사용합니다.
-        '지난 달', '이번 달'과 같은 상대적 기간은 현재 날짜 기준으로 계산합니다.
-        예: WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-            AND sale_date < DATE_TRUNC('month', CURRENT_DATE)
-        """,
-        """
-        '서울본점', '부산지점'과 같은 지점명은 dim_branch.branch_name에 저장되어 있습니다.
-        지점명으로 검색할 때는 LIKE 연산자를 사용할 수 있습니다.
-        예: WHERE branch_name LIKE '%서울%'
-        """,
-        """
-        대출 상품은 product_category로 분류됩니다 (신차, 중고차, 담보대출, 리스, 보증 등).
-        상품 카테고리별 조회 시: WHERE product_category = '신차'
-        """
-    ]
-    
-    for doc in documentations:
+    for doc in DOCUMENTATIONS:
         vn.train(documentation=doc)
     
     logger.info("Documentation 학습 완료")
     
     # 3. SQL 예제 학습 (선택사항)
-    sql_examples = [
-        {
-            "question": "지난 달 전체 판매액은?",
-            "sql": """
-                SELECT SUM(disbursed_amount) AS total_sales_amount
-                FROM fact_loan_sales
-                WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
-                  AND sale_date < DATE_TRUNC('month', CURRENT_DATE)
-            """
-        },
-        {
-            "question": "서울본점의 이번 달 계약 건수는?",
-            "sql": """
-                SELECT COUNT(*) AS contract_count
-                FROM fact_loan_sales f
-                JOIN dim_branch b ON f.branch_id = b.branch_id
-                WHERE b.branch_name LIKE '%서울본점%'
-                  AND sale_date >= DATE_TRUNC('month', CURRENT_DATE)
-            """
-        },
-        {
-            "question": "상위 5개 지점의 판매액은?",
-            "sql": """
-                SELECT b.branch_name, SUM(f.disbursed_amount) AS total_sales
-                FROM fact_loan_sales f
-                JOIN dim_branch b ON f.branch_id = b.branch_id
-                GROUP BY b.branch_name
-                ORDER BY total_sales DESC
-                LIMIT 5
-            """
-        }
-    ]
-    
-    for example in sql_examples:
+    for example in SQL_EXAMPLES:
         vn.train(question=example["question"], sql=example["sql"])
     
     logger.info("SQL 예제 학습 완료")
@@ -185,6 +287,11 @@ def train_vanna(vn):
 
 def generate_sql_with_vanna(question: str) -> Optional[str]:
     """Vanna를 사용하여 자연어 질문을 SQL로 변환"""
+    if _vanna_state == "warming":
+        # 학습이 끝날 때까지 기다리지 않고 기본 LLM 경로를 사용하도록 함
+        logger.info("Vanna 워밍업 중 - 기본 LLM으로 대체")
+        return None
+
     vn = get_vanna_client()
     
     if vn is None:
@@ -205,3 +312,27 @@ def generate_sql_with_vanna(question: str) -> Optional[str]:
     except Exception as e:
         logger.error(f"Vanna SQL 생성 실패: {e}")
         return None
+
+
+def get_vanna_executor() -> ThreadPoolExecutor:
+    """Vanna 호출용 스레드 풀 가져오기 (VANNA_MAX_WORKERS 개로 제한)"""
+    global _vanna_executor
+
+    if _vanna_executor is None:
+        _vanna_executor = ThreadPoolExecutor(
+            max_workers=get_settings().VANNA_MAX_WORKERS,
+            thread_name_prefix="vanna",
+        )
+
+    return _vanna_executor
+
+
+async def generate_sql_with_vanna_async(question: str) -> Optional[str]:
+    """
+    generate_sql_with_vanna의 비동기 버전
+
+    Vanna SDK는 동기 호출만 제공하므로 제한된 워커에서 실행합니다.
+    워커가 모두 사용 중이면 이벤트 루프를 막지 않고 대기합니다.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_vanna_executor(), generate_sql_with_vanna, question)
@@ -0,0 +1,81 @@
+"""벤치마크 공통 함수 - 벤치 스키마 준비, 스키마 파일 실행, 팩트 생성 SQL, 반복 실행 시간 측정, 결과 비교
+
+단독 실행하지 않습니다. 같은 폴더의 벤치마크 스크립트가 가져다 씁니다.
+"""
+
+import statistics
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Optional
+
+DB_DIR = Path(__file__).resolve().parents[2] / "db"
+BRANCHES = 20
+PRODUCTS = 10
+DAYS = 3 * 365
+
+
+def run_file(cursor, name: str) -> None:
+    """db/ 아래 SQL 파일 실행"""
+    cursor.execute((DB_DIR / name).read_text(encoding="utf-8"))
+
+
+def setup_database(url: str, schema: str, rollups: bool) -> None:
+    """schema를 다시 만들고 스키마/시드(/롤업) 적재"""
+    import psycopg2
+
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}; SET search_path TO {schema}")
+            for name in ("schema.sql", "seed.sql") + (("rollups.sql",) if rollups else ()):
+                run_file(cursor, name)
+            cursor.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"{schema} 스키마 적재 완료 (롤업 {'포함' if rollups else '제외'})")
+
+
+def with_search_path(url: str, schema: str) -> str:
+    """앱 커넥션이 schema를 보도록 libpq options 추가"""
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}options=-csearch_path%3D{schema}"
+
+
+def fact_insert_sql(prefix: str, first_date: Optional[str] = None) -> str:
+    """
+    generate_series(%s, %s) 범위만큼 무작위 팩트 행을 넣는 INSERT
+
+    Args:
+        prefix: contract_id 접두사
+        first_date: 첫 날짜('YYYY-MM-DD', 이후 DAYS일 안에서 무작위),
+            없으면 CURRENT_DATE 기준 최근 DAYS일 (CURRENT_DATE 기준 기간 쿼리에 데이터가 있도록)
+    """
+    sale_date = (
+        f"DATE '{first_date}' + floor(random() * {DAYS})::int" if first_date
+        else f"CURRENT_DATE - floor(random() * {DAYS})::int"
+    )
+    return (
+        "INSERT INTO fact_loan_sales (contract_id, branch_id, product_id, sale_date, disbursed_amount) "
+        f"SELECT '{prefix}' || g, 1 + floor(random() * {BRANCHES})::int, 1 + floor(random() * {PRODUCTS})::int, "
+        f"{sale_date}, round((5000000 + random() * 45000000)::numeric, -4) "
+        "FROM generate_series(%s, %s) AS g"
+    )
+
+
+def timed(cursor, sql: str, repeat: int):
+    """repeat회 실행 시간 중앙값 (ms)과 마지막 결과"""
+    samples = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), rows
+
+
+def normalize(row) -> tuple:
+    """결과 비교용 - NUMERIC 스케일 차이(AVG vs SUM/SUM)는 무시"""
+    return tuple(round(float(v), 4) if isinstance(v, Decimal) else v for v in row)
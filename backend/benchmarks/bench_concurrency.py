@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""/chat 동시성 벤치마크 - 블로킹 핸들러(이전) vs 비동기 파이프라인(이후)
+
+실제 LLM/DB 없이 Vanna와 DB 호출을 고정 지연으로 대체하여
+동시 질문 수(1/8/32/128)별 처리량을 비교합니다.
+
+    cd backend
+    python benchmarks/bench_concurrency.py --vanna-ms 300 --db-ms 50
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import db, main, vanna_client  # noqa: E402
+
+SQL = "SELECT COUNT(*) AS total FROM fact_loan_sales WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE)"
+
+
+class FakeVanna:
+    """고정 지연 후 SQL을 반환하는 Vanna 대체 객체 (동기 HTTP 호출 흉내)"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_sql(self, question: str) -> str:
+        time.sleep(self.latency)
+        return SQL
+
+
+def install_fakes(vanna_latency: float, db_latency: float) -> None:
+    """Vanna 클라이언트와 run_query를 지연 시뮬레이터로 교체"""
+    fake = FakeVanna(vanna_latency)
+    vanna_client.get_vanna_client = lambda: fake
+
+    def fake_run_query(sql, timeout=10, **kwargs):
+        time.sleep(db_latency)
+        rows = [(1,)] if kwargs.get("row_format") == "tuple" else [{"total": 1}]
+        return db.QueryResult(["total"], rows, False, ["integer"])
+
+    db.run_query = fake_run_query
+    db.explain_query = lambda sql, timeout=2: {"Node Type": "Result", "Total Cost": 10.0, "Plan Rows": 1}
+
+    # 처리량만 비교하도록 결과 캐시 비활성 (질문은 모두 달라 질문 캐시는 적중하지 않음)
+    main.get_result_cache().max_bytes = 0
+
+
+async def legacy_chat(question: str):
+    """이전 구현: async 핸들러 안에서 동기 Vanna/DB 호출"""
+    sql = vanna_client.generate_sql_with_vanna(question)
+    safe_sql = main.validate_and_rewrite(sql)
+    return db.run_query(safe_sql)
+
+
+async def async_chat(question: str):
+    """현재 구현: app.main의 /chat 파이프라인 그대로 호출 (응답 인코딩 제외)"""
+    return await main._chat(main.ChatRequest(question=question))
+
+
+async def drive(handler, concurrency: int, total: int) -> float:
+    """concurrency개의 동시 클라이언트로 total개 질문을 보내고 처리량(q/s) 반환"""
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(f"지난 달 전체 판매액은? #{i}")
+
+    async def client():
+        while not queue.empty():
+            await handler(queue.get_nowait())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vanna-ms", type=float, default=300)
+    parser.add_argument("--db-ms", type=float, default=50)
+    parser.add_argument("--levels", default="1,8,32,128")
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    install_fakes(args.vanna_ms / 1000, args.db_ms / 1000)
+
+    print(f"{'동시성':>6} | {'이전 (q/s)':>10} | {'이후 (q/s)':>10} | {'배율':>6}")
+    print("-" * 44)
+    for level in (int(x) for x in args.levels.split(",")):
+        total = level * args.requests_per_client
+        before = asyncio.run(drive(legacy_chat, level, total))
+        after = asyncio.run(drive(async_chat, level, total))
+        print(f"{level:>6} | {before:>10.1f} | {after:>10.1f} | {after / before:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
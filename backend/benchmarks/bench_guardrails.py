@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""SQL 가드레일 마이크로벤치마크 - 키워드별 정규식 검사(이전) vs 단일 패스 렉서(이후)
+
+호출당 비용(µs)을 SQL 길이별로 비교합니다. 렉서는 캐시를 비운 첫 호출(cold)과
+같은 SQL 재검증(memoized)을 따로 측정합니다.
+
+    cd backend
+    python benchmarks/bench_guardrails.py --number 2000
+"""
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import guardrails  # noqa: E402
+
+SHORT_SQL = "SELECT COUNT(*) AS total FROM fact_loan_sales WHERE sale_date >= DATE_TRUNC('month', CURRENT_DATE)"
+LONG_SQL = """
+SELECT b.branch_name, DATE_TRUNC('month', f.sale_date) AS month,
+       COUNT(*) AS contract_count, SUM(f.disbursed_amount) AS total_amount
+FROM fact_loan_sales f
+JOIN dim_branch b ON b.branch_id = f.branch_id
+JOIN dim_product p ON p.product_id = f.product_id
+WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '12 months')
+  AND f.sale_date < DATE_TRUNC('month', CURRENT_DATE)
+  AND p.product_name <> 'DELETE ME'  -- 리터럴 안의 키워드
+GROUP BY b.branch_name, DATE_TRUNC('month', f.sale_date)
+ORDER BY month, total_amount DESC
+"""
+
+
+def legacy_validate(sql: str) -> str:
+    """이전 구현 (금지 키워드마다 패턴 문자열 생성 + re.search)"""
+    sql = sql.strip()
+    if not re.match(r"^\s*SELECT\s+", sql, re.IGNORECASE | re.MULTILINE):
+        raise ValueError("SELECT 문만 허용됩니다")
+    if sql.count(";") > 1:
+        raise ValueError("여러 개의 SQL 문은 허용되지 않습니다")
+    sql = sql.rstrip(";").strip()
+    sql_upper = sql.upper()
+    for keyword in guardrails.FORBIDDEN_KEYWORDS:
+        if re.search(r"\b" + keyword + r"\b", sql_upper):
+            raise ValueError(f"금지된 키워드가 포함되어 있습니다: {keyword}")
+    if not re.search(r"\bLIMIT\s+\d+", sql, re.IGNORECASE):
+        sql = sql + " LIMIT 1000"
+    "sale_date" in sql.lower()
+    sql = re.sub(r"--.*$", "", sql, flags=re.MULTILINE)
+    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.DOTALL)
+    return sql.strip() + ";"
+
+
+def per_call_us(fn, number: int) -> float:
+    """number회 호출의 호출당 평균 (µs, 5회 중 최소)"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'SQL':>6} | {'정규식':>8} | {'렉서 cold':>9} | {'렉서 memo':>9}   (µs/호출)")
+    print("-" * 52)
+    for label, sql in (("short", SHORT_SQL), ("long", LONG_SQL.replace("'DELETE ME'", "'X'"))):
+        regex_us = per_call_us(lambda: legacy_validate(sql), args.number)
+        cold_us = per_call_us(lambda: guardrails.analyze(sql), args.number)
+        memo_us = per_call_us(lambda: guardrails._cached_verdict(sql), args.number)
+        print(f"{label:>6} | {regex_us:>8.1f} | {cold_us:>9.1f} | {memo_us:>9.2f}")
+
+    # 리터럴 안 키워드: 이전 구현은 거부, 렉서는 통과
+    for name, fn in (("정규식", legacy_validate), ("렉서", guardrails.validate_and_rewrite)):
+        try:
+            fn(LONG_SQL)
+            verdict = "통과"
+        except ValueError as e:
+            verdict = f"거부 ({e})"
+        print(f"리터럴 안 'DELETE' - {name}: {verdict}")
+
+
+if __name__ == "__main__":
+    main_cli()
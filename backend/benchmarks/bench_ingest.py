@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""적재 벤치마크 - 행 단위 INSERT(이전) vs /ingest/sales COPY 스테이징 upsert(이후), 초당 행 수
+
+DATABASE_URL의 DB에 별도 스키마(bench_ingest)를 만들고 db/schema.sql + db/seed.sql(+ --rollups면
+db/rollups.sql)을 적용한 뒤 측정합니다. /ingest/sales는 앱(main.app)을 ASGI로 직접 호출하며
+본문은 64KB 청크로 스트리밍합니다.
+
+- 이전: 같은 행을 한 트랜잭션에서 INSERT ... ON CONFLICT 한 줄씩 (--baseline-rows만큼)
+- 이후: 배치 크기별 CSV/NDJSON 신규 삽입, 금액을 바꾼 재전송(갱신), 같은 배치 재전송(변경 없음)
+
+--min-rows-per-sec를 주면 CSV 신규 삽입 처리량이 그보다 낮을 때 종료 코드 1로 끝납니다.
+
+    cd backend
+    DATABASE_URL=postgresql://... python benchmarks/bench_ingest.py --batches 10000,100000,1000000
+    python benchmarks/bench_ingest.py --rollups --min-rows-per-sec 100000
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_common import setup_database, with_search_path  # noqa: E402
+
+SCHEMA = "bench_ingest"
+API_KEY = "bench-ingest"
+CHUNK_BYTES = 64 * 1024
+COLUMNS = ["contract_id", "branch_id", "product_id", "sale_date", "disbursed_amount", "quantity"]
+
+
+def make_rows(prefix: str, n: int, seed: int) -> List[list]:
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [
+        [f"{prefix}-{i:09d}", rng.randint(1, 5), rng.randint(1, 5),
+         (start + timedelta(days=rng.randint(0, 364))).isoformat(),
+         f"{rng.randint(500, 9000) * 10000}.00", 1]
+        for i in range(n)
+    ]
+
+
+def to_csv(rows: List[list]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def to_ndjson(rows: List[list]) -> bytes:
+    return "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows).encode("utf-8")
+
+
+async def chunked(body: bytes) -> AsyncIterator[bytes]:
+    for i in range(0, len(body), CHUNK_BYTES):
+        yield body[i:i + CHUNK_BYTES]
+
+
+def insert_row_by_row(url: str, rows: List[list]) -> float:
+    """이전 방식: 한 줄씩 INSERT ... ON CONFLICT (한 트랜잭션), 초당 행 수"""
+    import psycopg2
+
+    conn = psycopg2.connect(url)
+    try:
+        start = time.perf_counter()
+        with conn.cursor() as cursor:
+            for row in rows:
+                cursor.execute(
+                    "INSERT INTO fact_loan_sales (contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity) "
+                    "VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (contract_id) DO UPDATE SET "
+                    "disbursed_amount = EXCLUDED.disbursed_amount",
+                    row,
+                )
+        conn.commit()
+        return len(rows) / (time.perf_counter() - start)
+    finally:
+        conn.close()
+
+
+async def post(client, body: bytes, content_type: str) -> Dict:
+    start = time.perf_counter()
+    response = await client.post(
+        "/ingest/sales", content=chunked(body),
+        headers={"authorization": f"Bearer {API_KEY}", "content-type": content_type},
+    )
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        sys.exit(f"적재 실패 ({response.status_code}): {response.text[:300]}")
+    result = response.json()
+    result["rows_per_sec"] = result["rows"] / elapsed
+    return result
+
+
+async def run(args, url: str) -> int:
+    import httpx
+    from app import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'방식':<24} | {'배치 행':>10} | {'삽입':>10} | {'갱신':>10} | {'변경 없음':>9} | {'행/초':>10}")
+        print("-" * 88)
+
+        baseline = make_rows("row", args.baseline_rows, seed=0)
+        print(f"{'이전: 행 단위 INSERT':<24} | {len(baseline):>10,} | {'':>10} | {'':>10} | {'':>9} | "
+              f"{insert_row_by_row(url, baseline):>10,.0f}")
+
+        csv_insert_rates = []
+        for n in (int(x) for x in args.batches.split(",")):
+            for fmt, content_type, encode in (("csv", "text/csv", to_csv), ("ndjson", "application/x-ndjson", to_ndjson)):
+                rows = make_rows(f"{fmt}{n}", n, seed=n)
+                body = encode(rows)
+                changed = [row[:4] + [f"{int(float(row[4])) + 10000}.00"] + row[5:] for row in rows]
+                for label, payload in (
+                    ("신규", body),
+                    ("금액 변경", encode(changed)),
+                    ("같은 배치", encode(changed)),
+                ):
+                    result = await post(client, payload, content_type)
+                    print(f"{'이후: ' + fmt + ' ' + label:<24} | {result['rows']:>10,} | {result['inserted']:>10,} | "
+                          f"{result['updated']:>10,} | {result['unchanged']:>9,} | {result['rows_per_sec']:>10,.0f}")
+                    if fmt == "csv" and label == "신규":
+                        csv_insert_rates.append(result["rows_per_sec"])
+
+    if args.min_rows_per_sec and min(csv_insert_rates) < args.min_rows_per_sec:
+        print(f"\n목표 미달: CSV 신규 삽입 최저 {min(csv_insert_rates):,.0f}행/초 < {args.min_rows_per_sec:,.0f}행/초")
+        return 1
+    return 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batches", default="10000,100000", help="배치 행 수 (쉼표 구분)")
+    parser.add_argument("--baseline-rows", type=int, default=10000, help="행 단위 INSERT 비교 행 수")
+    parser.add_argument("--rollups", action="store_true", help="rollups.sql 트리거를 켠 상태로 측정")
+    parser.add_argument("--min-rows-per-sec", type=float, default=0, help="CSV 신규 삽입 처리량 목표 (0이면 확인 안 함)")
+    args = parser.parse_args()
+
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        sys.exit("DATABASE_URL이 필요합니다")
+    setup_database(url, SCHEMA, args.rollups)
+    print()
+
+    # 앱 설정은 처음 읽을 때 고정되므로 import 전에 환경 변수 지정
+    os.environ["DATABASE_URL"] = with_search_path(url, SCHEMA)
+    os.environ["INGEST_API_KEY"] = API_KEY
+    os.environ["INGEST_MAX_BYTES"] = str(1 << 40)
+    sys.exit(asyncio.run(run(args, with_search_path(url, SCHEMA))))
+
+
+if __name__ == "__main__":
+    main_cli()
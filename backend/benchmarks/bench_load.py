@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""/chat 부하 테스트 - 실제 PostgreSQL + 가짜 LLM/Vanna로 처리량과 꼬리 지연시간 측정
+
+OpenAI/Vanna 키 없이 앱 전체(라우팅, 템플릿/캐시, 가드레일, EXPLAIN, DB, 차트, 인코딩)를
+ASGI로 직접 호출합니다. LLM과 Vanna는 지연시간 분포를 설정할 수 있는 결정적 가짜 제공자로
+바꾸고, 학습 예제 질문에는 해당 SQL을, 나머지 질문에는 집계 SQL을 돌려줍니다.
+
+동시성 단계마다 p50/p95/p99, 처리량, 오류 수, 단계별 지연시간(Server-Timing 헤더 기준),
+SQL 경로별 건수(/metrics 카운터 증가분)를 출력하고 JSON으로 저장합니다.
+--baseline으로 이전 결과와 비교해 회귀를 확인할 수 있습니다.
+
+    cd backend
+    # bench_load 스키마에 db/schema.sql + seed.sql (+ rollups.sql) 적재 후 실행
+    DATABASE_URL=postgresql://... python benchmarks/bench_load.py --setup --levels 1,8,32
+    # LLM 지연시간 분포: fixed:MS, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA
+    python benchmarks/bench_load.py --llm-latency lognormal:800:0.4 --vanna-latency lognormal:1200:0.6 \\
+        --vanna-fail-rate 0.1 --output after.json --baseline before.json --max-regression 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_common import setup_database, with_search_path  # noqa: E402
+
+SCHEMA = "bench_load"
+DEFAULT_SQL = "SELECT COUNT(*) AS contract_count, SUM(disbursed_amount) AS total_sales_amount FROM fact_loan_sales"
+
+# 템플릿/캐시로 답하는 질문과 LLM이 필요한 질문을 섞음
+EXTRA_QUESTIONS = [
+    "부산 이번 분기 계약 건수",
+    "지점별 월별 판매액과 건수",
+    "중고차금융 작년 평균 판매액",
+    "신규 고객 비율은?",
+    "판매액이 전월보다 늘어난 지점은?",
+    "담당자별 판매 실적은?",
+]
+
+
+class Latency:
+    """지연시간 분포 (ms 단위 설정, 초 단위 샘플)"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        kind, *params = spec.split(":")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self.rng = rng
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"지원하지 않는 분포: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.params[0], self.params[1])
+        else:
+            median, sigma = self.params
+            ms = self.rng.lognormvariate(math.log(median), sigma)
+        return ms / 1000
+
+
+class FakeProvider:
+    """질문 → SQL을 결정적으로 돌려주는 가짜 LLM/Vanna (지연시간은 분포에서 샘플)"""
+
+    def __init__(self, examples: Dict[str, str], latency: Latency, fail_rate: float, rng: random.Random):
+        self.examples = examples
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = rng
+        self.calls = 0
+
+    def answer(self, question: str) -> Optional[str]:
+        self.calls += 1
+        if self.fail_rate and self.rng.random() < self.fail_rate:
+            return None
+        base = question.split(" #")[0].strip()
+        return self.examples.get(base, DEFAULT_SQL)
+
+    # Vanna 클라이언트 인터페이스 (워커 스레드에서 동기 호출)
+    def generate_sql(self, question: str) -> Optional[str]:
+        time.sleep(self.latency.sample())
+        return self.answer(question)
+
+    # 기본 LLM 인터페이스 (프롬프트에서 질문 추출)
+    async def generate_sql_async(self, prompt: Any) -> str:
+        await asyncio.sleep(self.latency.sample())
+        return self.answer(_question_from_prompt(prompt)) or DEFAULT_SQL
+
+    def generate_sql_sync(self, prompt: Any) -> str:
+        time.sleep(self.latency.sample())
+        return self.answer(_question_from_prompt(prompt)) or DEFAULT_SQL
+
+
+def _question_from_prompt(prompt: Any) -> str:
+    text = str(prompt)
+    marker = "## 사용자 질문\n"
+    if marker in text:
+        return text.split(marker, 1)[1].split("\n", 1)[0]
+    return text
+
+
+def install_fakes(main, llm: FakeProvider, vanna: FakeProvider) -> None:
+    """app.llm_client / Vanna 경로를 가짜 제공자로 교체"""
+    from app import llm_client, vanna_client
+
+    llm_client.generate_sql = llm.generate_sql_sync
+    llm_client.generate_sql_async = llm.generate_sql_async
+    main.generate_sql_async = llm.generate_sql_async  # main은 이름을 직접 가져옴
+    vanna_client.get_vanna_client = lambda: vanna
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """'name;dur=12.3, ...' → {name: ms}"""
+    spans: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        if name and rest:
+            spans[name] = spans.get(name, 0.0) + float(rest)
+    return spans
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_questions(total: int, base: List[str], unique_ratio: float, rng: random.Random) -> List[str]:
+    """base 질문을 섞어 total개 생성 (unique_ratio 비율은 ' #n'을 붙여 캐시/템플릿을 피함)"""
+    questions = []
+    for i in range(total):
+        question = rng.choice(base)
+        if rng.random() < unique_ratio:
+            question = f"{question} #{i}"
+        questions.append(question)
+    return questions
+
+
+async def run_level(client, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    """closed-loop 클라이언트 concurrency개로 questions 전송"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for q in questions:
+        queue.put_nowait(q)
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+
+    async def worker():
+        while not queue.empty():
+            question = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post("/chat", json={"question": question})
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+            for name, ms in parse_server_timing(response.headers.get("server-timing")).items():
+                stages.setdefault(name, []).append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(questions),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "max": round(max(latencies), 2) if latencies else 0.0,
+        },
+        "stages_ms": {
+            name: {"count": len(v), "mean": round(statistics.fmean(v), 2), "p95": round(percentile(v, 0.95), 2)}
+            for name, v in sorted(stages.items())
+        },
+    }
+
+
+def counter_delta(before: Dict[str, int], after: Dict[str, int], prefixes=("sql_source.", "sql_hedge.", "single_flight.", "rollup.")) -> Dict[str, int]:
+    return {
+        name: value - before.get(name, 0)
+        for name, value in sorted(after.items())
+        if name.startswith(prefixes) and value != before.get(name, 0)
+    }
+
+
+async def run(args, main) -> List[Dict[str, Any]]:
+    import httpx
+
+    rng = random.Random(args.seed)
+    base = [example["question"] for example in main_examples()] + EXTRA_QUESTIONS
+
+    await main.startup_event()
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for level in (int(x) for x in args.levels.split(",")):
+            if args.cold:
+                main.get_question_cache().clear()
+                main.get_result_cache().clear()
+            questions = make_questions(args.requests, base, args.unique_ratio, rng)
+            before = main.metrics.snapshot()["counters"]
+            result = await run_level(client, questions, level)
+            result["counters"] = counter_delta(before, main.metrics.snapshot()["counters"])
+            results.append(result)
+            print_level(result)
+    await main.shutdown_event()
+    return results
+
+
+def main_examples():
+    from app.vanna_client import SQL_EXAMPLES
+    return SQL_EXAMPLES
+
+
+def print_level(result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    errors = sum(result["errors"].values())
+    print(
+        f"{result['concurrency']:>6} | {result['throughput_rps']:>8.1f} | {latency['p50']:>8.1f} | "
+        f"{latency['p95']:>8.1f} | {latency['p99']:>8.1f} | {errors:>5}"
+    )
+    stages = ", ".join(f"{name} {s['mean']:.1f}/{s['p95']:.1f}" for name, s in result["stages_ms"].items())
+    print(f"       단계 평균/p95(ms): {stages}")
+    print(f"       경로: {result['counters']}")
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, max_regression: Optional[float]) -> bool:
+    """기준 결과 대비 p95/처리량 변화 출력, max_regression(%)을 넘으면 False"""
+    baseline = {r["concurrency"]: r for r in json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]}
+    ok = True
+    print(f"\n기준 대비 ({baseline_path})")
+    print(f"{'동시성':>6} | {'p95 변화':>9} | {'처리량 변화':>10}")
+    print("-" * 34)
+    for result in results:
+        base = baseline.get(result["concurrency"])
+        if base is None:
+            continue
+        p95 = _change(base["latency_ms"]["p95"], result["latency_ms"]["p95"])
+        rps = _change(base["throughput_rps"], result["throughput_rps"])
+        print(f"{result['concurrency']:>6} | {p95:>+8.1f}% | {rps:>+9.1f}%")
+        if max_regression is not None and (p95 > max_regression or -rps > max_regression):
+            ok = False
+    return ok
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--setup", action="store_true", help=f"{SCHEMA} 스키마를 새로 만들고 schema/seed 적재")
+    parser.add_argument("--no-rollups", action="store_true", help="--setup 시 rollups.sql 적용 안 함")
+    parser.add_argument("--levels", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=200, help="동시성 단계별 요청 수")
+    parser.add_argument("--llm-latency", default="lognormal:800:0.4")
+    parser.add_argument("--vanna-latency", default="lognormal:1200:0.5")
+    parser.add_argument("--vanna-fail-rate", type=float, default=0.05)
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="캐시/템플릿을 피하는 고유 질문 비율")
+    parser.add_argument("--cold", action="store_true", help="단계마다 질문/결과 캐시 비우기")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_load.json")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, help="p95/처리량이 이 비율(%%) 넘게 나빠지면 종료 코드 1")
+    args = parser.parse_args()
+
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        sys.exit("DATABASE_URL이 필요합니다")
+    if args.setup:
+        setup_database(url, SCHEMA, rollups=not args.no_rollups)
+    # 앱 설정은 import 시 읽으므로 환경 변수를 먼저 바꾼 뒤 import
+    # LLM_API_KEY는 설정하지 않음 (시작 시 실제 제공자에 미리 연결하지 않도록)
+    os.environ["DATABASE_URL"] = with_search_path(url, SCHEMA)
+
+    logging.disable(logging.CRITICAL)
+    from app import main
+
+    # 의존성이 없어 main이 대체 구현으로 뜬 경우 측정 결과가 의미 없음
+    if not main.LLM_ENABLED:
+        sys.exit("app 모듈을 불러오지 못했습니다 (requirements.txt 설치 확인)")
+    if not main.test_db_connection():
+        sys.exit("DB에 연결하지 못했습니다 (DATABASE_URL, --setup 확인)")
+
+    # 제공자마다 난수 생성기를 따로 둬 호출 순서가 바뀌어도 분포가 섞이지 않게 함
+    examples = {example["question"]: example["sql"] for example in main_examples()}
+    llm = FakeProvider(examples, Latency(args.llm_latency, random.Random(args.seed + 1)), 0.0,
+                       random.Random(args.seed + 2))
+    vanna = FakeProvider(examples, Latency(args.vanna_latency, random.Random(args.seed + 3)), args.vanna_fail_rate,
+                         random.Random(args.seed + 4))
+    install_fakes(main, llm, vanna)
+
+    print(f"{'동시성':>6} | {'처리량/s':>8} | {'p50(ms)':>8} | {'p95(ms)':>8} | {'p99(ms)':>8} | {'오류':>5}")
+    print("-" * 60)
+    results = asyncio.run(run(args, main))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "fake_calls": {"llm": llm.calls, "vanna": vanna.calls},
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {args.output}")
+
+    if args.baseline and not compare(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
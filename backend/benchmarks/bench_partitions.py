@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""팩트 레이아웃 벤치마크 - 단일 테이블 + 단일 컬럼 인덱스(schema.sql) vs 월 파티션 + BRIN/커버링 인덱스(partitioned.sql)
+
+DATABASE_URL의 DB에 두 스키마를 만듭니다.
+- bench_heap: schema.sql + rollups.sql, 팩트 --rows행 (최근 3년, 날짜 무작위 순서)
+- bench_partitioned: 같은 데이터를 schema.sql 레이아웃으로 넣은 뒤 db/migrate_partitioned.py로 전환
+  (전환 스크립트 자체도 함께 검증)
+
+Vanna 학습 예제와 같은 유형(기간 필터 + 지점/상품 그룹)의 쿼리를 롤업 재작성 없이 팩트에 직접 실행해
+지연시간 중앙값, 결과 일치 여부, 파티션 레이아웃에서 읽은 파티션 수를 비교합니다. 마지막으로 파티션
+부모에서 INSERT/UPDATE(월 이동 포함)/DELETE 후 롤업 트리거 합계가 팩트와 같은지 확인합니다.
+
+    cd backend
+    DATABASE_URL=postgresql://... python benchmarks/bench_partitions.py --rows 10000000
+    python benchmarks/bench_partitions.py --reuse   # 이미 만든 두 스키마로 쿼리만 다시 측정
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "db"))
+
+import psycopg2  # noqa: E402
+
+from bench_common import BRANCHES, DAYS, PRODUCTS, fact_insert_sql, normalize, run_file, timed  # noqa: E402
+from app.vanna_client import SQL_EXAMPLES  # noqa: E402
+from migrate_partitioned import migrate  # noqa: E402
+
+HEAP = "bench_heap"
+PARTITIONED = "bench_partitioned"
+BATCH_ROWS = 1_000_000
+
+QUERIES = {example["question"]: example["sql"] for example in SQL_EXAMPLES}
+QUERIES.update({
+    "지점별 올해 판매액": """
+        SELECT b.branch_name, SUM(f.disbursed_amount) AS total_sales
+        FROM fact_loan_sales f JOIN dim_branch b ON f.branch_id = b.branch_id
+        WHERE f.sale_date >= DATE_TRUNC('year', CURRENT_DATE)
+        GROUP BY b.branch_name ORDER BY total_sales DESC
+    """,
+    "최근 7일 일별 판매액": """
+        SELECT f.sale_date, SUM(f.disbursed_amount) AS total_sales
+        FROM fact_loan_sales f
+        WHERE f.sale_date >= CURRENT_DATE - INTERVAL '7 days'
+        GROUP BY f.sale_date ORDER BY f.sale_date
+    """,
+    "지난 분기 상품별 판매량": """
+        SELECT p.product_name, COUNT(DISTINCT f.contract_id) AS sales_count
+        FROM fact_loan_sales f JOIN dim_product p ON f.product_id = p.product_id
+        WHERE f.sale_date >= DATE_TRUNC('quarter', CURRENT_DATE - INTERVAL '3 months')
+          AND f.sale_date < DATE_TRUNC('quarter', CURRENT_DATE)
+        GROUP BY p.product_name ORDER BY sales_count DESC
+    """,
+    "최근 12개월 월별 추이": """
+        SELECT DATE_TRUNC('month', f.sale_date) AS month, COUNT(*) AS contract_count,
+               SUM(f.disbursed_amount) AS total_sales
+        FROM fact_loan_sales f
+        WHERE f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '11 months')
+        GROUP BY DATE_TRUNC('month', f.sale_date) ORDER BY month
+    """,
+    "한 지점 지난 달 판매액": """
+        SELECT SUM(f.disbursed_amount) AS total_sales, COUNT(*) AS contract_count
+        FROM fact_loan_sales f
+        WHERE f.branch_id = 3
+          AND f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+          AND f.sale_date < DATE_TRUNC('month', CURRENT_DATE)
+    """,
+    "전체 기간 상품별 판매액": """
+        SELECT p.product_name, SUM(f.disbursed_amount) AS total_sales
+        FROM fact_loan_sales f JOIN dim_product p ON f.product_id = p.product_id
+        GROUP BY p.product_name ORDER BY total_sales DESC
+    """,
+})
+
+
+def vacuum_analyze(conn) -> None:
+    """인덱스 전용 스캔이 가능하도록 가시성 맵까지 갱신"""
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+
+
+def load_heap(conn, rows: int) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {HEAP} CASCADE; CREATE SCHEMA {HEAP}; SET search_path TO {HEAP}")
+        run_file(cursor, "schema.sql")
+        cursor.execute(
+            f"INSERT INTO dim_branch (branch_name, region) "
+            f"SELECT CASE WHEN g = 1 THEN '서울본점' ELSE '지점' || LPAD(g::text, 2, '0') END, '지역' || (g % 5) "
+            f"FROM generate_series(1, {BRANCHES}) AS g"
+        )
+        cursor.execute(
+            f"INSERT INTO dim_product (product_name, product_category) "
+            f"SELECT '상품' || LPAD(g::text, 2, '0'), '분류' || (g % 3) FROM generate_series(1, {PRODUCTS}) AS g"
+        )
+        cursor.execute("SELECT setseed(0.42)")
+        conn.commit()
+
+        start = time.perf_counter()
+        for low in range(1, rows + 1, BATCH_ROWS):
+            high = min(rows, low + BATCH_ROWS - 1)
+            cursor.execute(fact_insert_sql("B"), (low, high))
+            conn.commit()
+            print(f"  팩트 적재 {high:,}/{rows:,}행 ({time.perf_counter() - start:.0f}초)", flush=True)
+        run_file(cursor, "rollups.sql")
+        conn.commit()
+    vacuum_analyze(conn)
+
+
+def load_partitioned(conn) -> None:
+    """bench_heap과 같은 데이터를 단일 테이블로 복사한 뒤 migrate_partitioned로 전환"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"DROP SCHEMA IF EXISTS {PARTITIONED} CASCADE; CREATE SCHEMA {PARTITIONED}; SET search_path TO {PARTITIONED}"
+        )
+        run_file(cursor, "schema.sql")
+        for table in ("dim_branch", "dim_product", "fact_loan_sales"):
+            cursor.execute(f"INSERT INTO {table} SELECT * FROM {HEAP}.{table}")
+        run_file(cursor, "rollups.sql")
+        conn.commit()
+        start = time.perf_counter()
+        migrate(cursor, log=lambda message: print(f"  {message}", flush=True))
+        conn.commit()
+        print(f"  전환 {time.perf_counter() - start:.1f}초")
+    vacuum_analyze(conn)
+
+
+def scanned_partitions(cursor, sql: str) -> str:
+    """실행 계획에서 읽는 파티션 수 / 전체 파티션 수"""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+    plan = cursor.fetchone()[0][0]["Plan"]
+    relations = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if node.get("Relation Name", "").startswith("fact_loan_sales_"):
+            relations.add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    cursor.execute("SELECT COUNT(*) FROM pg_inherits WHERE inhparent = 'fact_loan_sales'::regclass")
+    return f"{len(relations)}/{cursor.fetchone()[0]}"
+
+
+def storage(cursor) -> str:
+    """팩트 테이블(파티션 포함) 데이터/인덱스 크기"""
+    cursor.execute(
+        "SELECT pg_size_pretty(SUM(pg_table_size(relid))), pg_size_pretty(SUM(pg_indexes_size(relid))) "
+        "FROM pg_partition_tree('fact_loan_sales') WHERE isleaf"
+    )
+    table, indexes = cursor.fetchone()
+    return f"테이블 {table}, 인덱스 {indexes}"
+
+
+def bench_queries(heap_conn, part_conn, repeat: int) -> None:
+    with heap_conn.cursor() as heap, part_conn.cursor() as part:
+        print(f"\n단일 테이블: {storage(heap)}")
+        print(f"월 파티션:   {storage(part)}")
+        print(f"\n{'쿼리':<22} | {'단일(ms)':>9} | {'파티션(ms)':>10} | {'배수':>6} | {'읽은 파티션':>10} | 결과")
+        print("-" * 84)
+        for label, sql in QUERIES.items():
+            sql = " ".join(sql.split())
+            timed(heap, sql, 1)  # 캐시 데우기
+            timed(part, sql, 1)
+            heap_ms, heap_rows = timed(heap, sql, repeat)
+            part_ms, part_rows = timed(part, sql, repeat)
+            same = sorted(map(normalize, heap_rows)) == sorted(map(normalize, part_rows))
+            print(
+                f"{label:<22} | {heap_ms:>9.1f} | {part_ms:>10.1f} | {heap_ms / part_ms:>5.1f}x | "
+                f"{scanned_partitions(part, sql):>10} | {'일치' if same else '불일치'}"
+            )
+    heap_conn.rollback()
+    part_conn.rollback()
+
+
+def check_rollups(conn, batch: int) -> None:
+    """파티션 부모에서 INSERT/UPDATE(월 이동 포함)/DELETE 후 롤업 합계 확인 (롤백)"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(sale_id), 0) FROM fact_loan_sales")
+        base = cursor.fetchone()[0] + 1
+        # 월 이동으로 가장 오래된 월보다 앞으로 가는 행이 있으므로 앞 달 파티션도 준비
+        cursor.execute(f"SELECT create_sales_partitions(CURRENT_DATE - {DAYS + 31}, CURRENT_DATE)")
+        start = time.perf_counter()
+        cursor.execute(fact_insert_sql("X"), (base, base + batch - 1))
+        insert_ms = (time.perf_counter() - start) * 1000
+        cursor.execute("UPDATE fact_loan_sales SET sale_date = sale_date - 31 WHERE contract_id LIKE 'X1%'")
+        cursor.execute("UPDATE fact_loan_sales SET disbursed_amount = disbursed_amount + 1 WHERE contract_id LIKE 'X2%'")
+        cursor.execute("DELETE FROM fact_loan_sales WHERE contract_id LIKE 'X3%'")
+        cursor.execute(
+            "SELECT (SELECT (COUNT(*), SUM(disbursed_amount)) FROM fact_loan_sales), "
+            "(SELECT (SUM(sale_count), SUM(total_amount)) FROM agg_sales_daily), "
+            "(SELECT (SUM(sale_count), SUM(total_amount)) FROM agg_sales_monthly)"
+        )
+        fact, daily, monthly = cursor.fetchone()
+    conn.rollback()
+    print(f"\n파티션 부모 배치 {batch:,}행 INSERT (롤업 증분 반영 포함) {insert_ms:.0f}ms")
+    print(f"INSERT/UPDATE/DELETE 반영 후 합계 - 팩트 {fact}, 일별 {daily}, 월별 {monthly} → {'일치' if fact == daily == monthly else '불일치'}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--reuse", action="store_true", help="기존 두 스키마 재사용")
+    parser.add_argument("--keep", action="store_true", help="끝난 뒤 스키마를 남김")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        sys.exit("DATABASE_URL이 필요합니다")
+
+    heap_conn = psycopg2.connect(dsn, options=f"-c search_path={HEAP}")
+    part_conn = psycopg2.connect(dsn, options=f"-c search_path={PARTITIONED}")
+    try:
+        if not args.reuse:
+            print(f"{HEAP} 스키마에 {args.rows:,}행 적재 중...")
+            load_heap(heap_conn, args.rows)
+            print(f"{PARTITIONED} 스키마로 복사 후 파티션 전환 중...")
+            load_partitioned(part_conn)
+        bench_queries(heap_conn, part_conn, args.repeat)
+        check_rollups(part_conn, args.batch)
+    finally:
+        if not args.keep and not args.reuse:
+            with heap_conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {PARTITIONED} CASCADE; DROP SCHEMA IF EXISTS {HEAP} CASCADE")
+            heap_conn.commit()
+        heap_conn.close()
+        part_conn.close()
+
+
+if __name__ == "__main__":
+    main_cli()
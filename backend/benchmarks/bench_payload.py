@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""/chat 응답 페이로드 벤치마크 - 행 dict + Decimal(이전) vs columnar + int/float(이후)
+
+DB 없이 fact_loan_sales 형태(지점, 날짜, 건수, 금액)의 결과를 만들어
+응답 JSON 크기와 인코딩 시간, NUMERIC 디코딩 시간을 비교합니다.
+
+    cd backend
+    python benchmarks/bench_payload.py --rows 1000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.db import _cast_numeric  # noqa: E402
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:  # FastAPI 없이 실행할 때는 json default로 대체
+    jsonable_encoder = None
+
+COLUMNS = ["branch_name", "sale_date", "contract_count", "total_amount"]
+COLUMN_TYPES = ["text", "date", "integer", "number"]
+
+
+def make_raw_rows(n: int):
+    """DB가 돌려주는 문자열 형태의 행 (금액은 NUMERIC(15,2) 텍스트)"""
+    rng = random.Random(42)
+    start = date(2024, 1, 1)
+    return [
+        (
+            f"지점{rng.randint(1, 20):02d}",
+            start + timedelta(days=rng.randint(0, 364)),
+            rng.randint(1, 500),
+            f"{rng.randint(1_000_000, 900_000_000)}.{rng.choice(['00', '50', '25'])}",
+        )
+        for _ in range(n)
+    ]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value.isoformat()
+
+
+def encode_rows(rows):
+    """이전 형식: 행마다 {컬럼: 값} + Decimal"""
+    payload = {"columns": COLUMNS, "rows": [dict(zip(COLUMNS, row)) for row in rows]}
+    if jsonable_encoder is not None:
+        return json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode()
+    return json.dumps(payload, default=_json_default, ensure_ascii=False).encode()
+
+
+def encode_columnar(rows):
+    """이후 형식: 컬럼별 배열 + 타입 정보, 숫자는 int/float"""
+    payload = {
+        "columns": COLUMNS,
+        "column_types": COLUMN_TYPES,
+        "column_values": [list(values) for values in zip(*rows)],
+    }
+    return json.dumps(payload, default=_json_default, ensure_ascii=False).encode()
+
+
+def best_of(fn, repeat: int) -> float:
+    """repeat회 중 최소 실행 시간 (ms)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'행 수':>6} | {'형식':>8} | {'디코딩(ms)':>10} | {'인코딩(ms)':>10} | {'바이트':>9}")
+    print("-" * 58)
+    for n in (int(x) for x in args.rows.split(",")):
+        raw = make_raw_rows(n)
+        decode_decimal = lambda: [(b, d, c, Decimal(a)) for b, d, c, a in raw]  # noqa: E731
+        decode_number = lambda: [(b, d, c, _cast_numeric(a, None)) for b, d, c, a in raw]  # noqa: E731
+        decimal_rows, number_rows = decode_decimal(), decode_number()
+
+        for label, decode, encode, rows in (
+            ("rows", decode_decimal, encode_rows, decimal_rows),
+            ("columnar", decode_number, encode_columnar, number_rows),
+        ):
+            decode_ms = best_of(decode, args.repeat)
+            encode_ms = best_of(lambda: encode(rows), args.repeat)
+            size = len(encode(rows))
+            print(f"{n:>6} | {label:>8} | {decode_ms:>10.3f} | {encode_ms:>10.3f} | {size:>9,}")
+
+
+if __name__ == "__main__":
+    main_cli()
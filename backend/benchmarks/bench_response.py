@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""/chat 응답 인코딩 벤치마크 - pydantic 검증 + jsonable_encoder(이전) vs 직접 인코딩(이후)
+
+DB 없이 fact_loan_sales 형태(지점, 날짜, 건수, Decimal 금액)의 결과로 ChatResponse를 만들어
+응답 본문 인코딩 시간과 압축 방식별 전송 바이트/압축 시간을 출력합니다.
+
+    cd backend
+    python benchmarks/bench_response.py --rows 10,100,1000,10000
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app import json_response  # noqa: E402
+from app.main import ChatResponse  # noqa: E402
+
+COLUMNS = ["branch_name", "sale_date", "contract_count", "total_amount"]
+
+
+def make_rows(n: int):
+    rng = random.Random(42)
+    start = date(2024, 1, 1)
+    return [
+        (
+            f"지점{rng.randint(1, 20):02d}",
+            start + timedelta(days=rng.randint(0, 364)),
+            rng.randint(1, 500),
+            Decimal(f"{rng.randint(1_000_000, 900_000_000)}.{rng.choice(['00', '50', '25'])}"),
+        )
+        for _ in range(n)
+    ]
+
+
+def encode_before(rows) -> bytes:
+    """이전: 검증하며 모델 생성 → jsonable_encoder → json.dumps (FastAPI 기본 경로)"""
+    response = ChatResponse(
+        answer="결과", sql="SELECT ...", columns=COLUMNS,
+        rows=[dict(zip(COLUMNS, row)) for row in rows],
+    )
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False).encode("utf-8")
+
+
+def encode_after(rows) -> bytes:
+    """이후: 검증 없이 모델 생성 → json_response.dumps"""
+    response = ChatResponse.model_construct(
+        answer="결과", sql="SELECT ...", columns=COLUMNS,
+        rows=[dict(zip(COLUMNS, row)) for row in rows],
+    )
+    return json_response.dumps(dict(response))
+
+
+def best_of(fn, repeat: int):
+    """repeat회 중 최소 실행 시간 (ms)과 마지막 결과"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10,100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    encoder = "orjson" if json_response.orjson is not None else "json"
+    print(f"인코더: {encoder}, zstd: {'사용 가능' if json_response.zstandard is not None else '없음'}\n")
+    print(f"{'행 수':>6} | {'이전(ms)':>9} | {'이후(ms)':>9} | {'원본 바이트':>11} | "
+          f"{'gzip 바이트':>11} | {'gzip(ms)':>8} | {'zstd 바이트':>11} | {'zstd(ms)':>8}")
+    print("-" * 98)
+    for n in (int(x) for x in args.rows.split(",")):
+        rows = make_rows(n)
+        before_ms, _ = best_of(lambda: encode_before(rows), args.repeat)
+        after_ms, body = best_of(lambda: encode_after(rows), args.repeat)
+        gzip_ms, gz = best_of(lambda: gzip.compress(body, compresslevel=json_response.GZIP_LEVEL), args.repeat)
+        if json_response._zstd_compressor is not None:
+            zstd_ms, zs = best_of(lambda: json_response._zstd_compressor.compress(body), args.repeat)
+            zstd = f"{len(zs):>11,} | {zstd_ms:>8.2f}"
+        else:
+            zstd = f"{'-':>11} | {'-':>8}"
+        print(f"{n:>6} | {before_ms:>9.2f} | {after_ms:>9.2f} | {len(body):>11,} | "
+              f"{len(gz):>11,} | {gzip_ms:>8.2f} | {zstd}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""롤업 벤치마크 - fact_loan_sales 직접 집계(이전) vs 롤업 재작성(이후)
+
+DATABASE_URL의 DB에 별도 스키마(bench_rollup)를 만들고 db/schema.sql + db/rollups.sql을
+적용한 뒤, 팩트 행을 --rows만큼 generate_series로 채워 대표 집계 쿼리의 지연시간을 비교합니다.
+재작성 결과가 원래 쿼리와 같은 행을 돌려주는지도 함께 확인하고, 마지막으로 트리거를 켠
+상태와 끈 상태의 배치 INSERT 시간을 비교해 증분 반영 비용을 측정합니다.
+
+    cd backend
+    DATABASE_URL=postgresql://... python benchmarks/bench_rollup.py --rows 10000000
+    python benchmarks/bench_rollup.py --reuse   # 이미 채운 스키마로 쿼리만 다시 측정
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psycopg2  # noqa: E402
+
+from bench_common import BRANCHES, PRODUCTS, fact_insert_sql, normalize, run_file, timed  # noqa: E402
+from app.guardrails import validate_and_rewrite  # noqa: E402
+from app.rollup_rewrite import ROLLUPS, _rewrite  # noqa: E402
+
+SCHEMA = "bench_rollup"
+FIRST_DATE = "2022-01-01"
+BATCH_ROWS = 1_000_000
+
+QUERIES = {
+    "지점별 올해 판매액": """
+        SELECT b.branch_name, SUM(f.disbursed_amount) AS total_amount
+        FROM fact_loan_sales f JOIN dim_branch b ON f.branch_id = b.branch_id
+        WHERE f.sale_date >= DATE '2024-01-01' AND f.sale_date < DATE '2025-01-01'
+        GROUP BY b.branch_name ORDER BY total_amount DESC
+    """,
+    "월별 건수/판매액 추이": """
+        SELECT DATE_TRUNC('month', f.sale_date) AS month, COUNT(*) AS contract_count,
+               SUM(f.disbursed_amount) AS total_amount
+        FROM fact_loan_sales f
+        GROUP BY DATE_TRUNC('month', f.sale_date) ORDER BY month
+    """,
+    "상품×분기 판매량": """
+        SELECT p.product_name, DATE_TRUNC('quarter', f.sale_date) AS quarter,
+               COUNT(DISTINCT f.contract_id) AS sales_count
+        FROM fact_loan_sales f JOIN dim_product p ON p.product_id = f.product_id
+        GROUP BY p.product_name, DATE_TRUNC('quarter', f.sale_date) ORDER BY 1, 2
+    """,
+    "한 지점 한 달 평균 판매액": """
+        SELECT AVG(f.disbursed_amount) AS avg_amount, COUNT(*) AS contract_count
+        FROM fact_loan_sales f JOIN dim_branch b ON b.branch_id = f.branch_id
+        WHERE b.branch_name = '지점01' AND f.sale_date >= DATE '2024-03-01' AND f.sale_date < DATE '2024-04-01'
+    """,
+    "전체 건수": "SELECT COUNT(*) FROM fact_loan_sales",
+    # 맞는 행이 없는 기간 (GROUP BY 없음) - COUNT는 0, SUM은 NULL이어야 함
+    "빈 기간 건수": """
+        SELECT COUNT(*) AS contract_count, SUM(f.disbursed_amount) AS total_amount
+        FROM fact_loan_sales f WHERE f.sale_date >= DATE '2030-01-01'
+    """,
+}
+
+
+def load(conn, rows: int) -> None:
+    """스키마 생성 후 차원/팩트 적재 (롤업은 적재 후 한 번에 계산)"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        run_file(cursor, "schema.sql")
+        cursor.execute(
+            f"INSERT INTO dim_branch (branch_name, region) "
+            f"SELECT '지점' || LPAD(g::text, 2, '0'), '지역' || (g % 5) FROM generate_series(1, {BRANCHES}) AS g"
+        )
+        cursor.execute(
+            f"INSERT INTO dim_product (product_name, product_category) "
+            f"SELECT '상품' || LPAD(g::text, 2, '0'), '분류' || (g % 3) FROM generate_series(1, {PRODUCTS}) AS g"
+        )
+        conn.commit()
+
+        start = time.perf_counter()
+        for low in range(1, rows + 1, BATCH_ROWS):
+            high = min(rows, low + BATCH_ROWS - 1)
+            cursor.execute(fact_insert_sql("B", FIRST_DATE), (low, high))
+            conn.commit()
+            print(f"  팩트 적재 {high:,}/{rows:,}행 ({time.perf_counter() - start:.0f}초)", flush=True)
+
+        start = time.perf_counter()
+        run_file(cursor, "rollups.sql")
+        cursor.execute("ANALYZE")
+        conn.commit()
+        print(f"  롤업 생성 + 전체 계산: {time.perf_counter() - start:.1f}초")
+
+
+def bench_queries(conn, repeat: int) -> None:
+    available = frozenset(r.table for r in ROLLUPS)
+    print(f"\n{'쿼리':<20} | {'롤업':<17} | {'직접(ms)':>9} | {'롤업(ms)':>9} | {'배수':>6} | 결과")
+    print("-" * 86)
+    with conn.cursor() as cursor:
+        for label, sql in QUERIES.items():
+            safe_sql = validate_and_rewrite(" ".join(sql.split()))
+            rewritten, detail = _rewrite(safe_sql, available)
+            if rewritten is None:
+                print(f"{label:<20} | 재작성 안 함: {detail}")
+                continue
+            timed(cursor, safe_sql, 1)  # 캐시 데우기
+            direct_ms, direct_rows = timed(cursor, safe_sql, repeat)
+            rollup_ms, rollup_rows = timed(cursor, rewritten, repeat)
+            same = sorted(map(normalize, direct_rows)) == sorted(map(normalize, rollup_rows))
+            print(
+                f"{label:<20} | {detail:<17} | {direct_ms:>9.1f} | {rollup_ms:>9.2f} | "
+                f"{direct_ms / rollup_ms:>5.0f}x | {'일치' if same else '불일치'}"
+            )
+    conn.rollback()
+
+
+def bench_maintenance(conn, batch: int) -> None:
+    """트리거 켠/끈 상태의 batch행 INSERT 시간 비교 후 롤업 합계 검증"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(sale_id), 0) FROM fact_loan_sales")
+        base = cursor.fetchone()[0] + 1
+
+        cursor.execute("ALTER TABLE fact_loan_sales DISABLE TRIGGER USER")
+        start = time.perf_counter()
+        cursor.execute(fact_insert_sql("X", FIRST_DATE), (base, base + batch - 1))
+        plain_ms = (time.perf_counter() - start) * 1000
+        cursor.execute("ALTER TABLE fact_loan_sales ENABLE TRIGGER USER")
+        conn.rollback()
+
+        start = time.perf_counter()
+        cursor.execute(fact_insert_sql("X", FIRST_DATE), (base, base + batch - 1))
+        trigger_ms = (time.perf_counter() - start) * 1000
+        cursor.execute("DELETE FROM fact_loan_sales WHERE sale_id IN (SELECT sale_id FROM fact_loan_sales ORDER BY sale_id DESC LIMIT 100)")
+        cursor.execute("UPDATE fact_loan_sales SET disbursed_amount = disbursed_amount + 1 WHERE contract_id LIKE 'X1%'")
+
+        cursor.execute(
+            "SELECT (SELECT (COUNT(*), SUM(disbursed_amount)) FROM fact_loan_sales), "
+            "(SELECT (SUM(sale_count), SUM(total_amount)) FROM agg_sales_daily), "
+            "(SELECT (SUM(sale_count), SUM(total_amount)) FROM agg_sales_monthly)"
+        )
+        fact, daily, monthly = cursor.fetchone()
+        conn.rollback()
+
+    print(f"\n배치 {batch:,}행 INSERT: 트리거 없음 {plain_ms:.0f}ms, 롤업 증분 반영 포함 {trigger_ms:.0f}ms")
+    print(f"INSERT/DELETE/UPDATE 반영 후 합계 - 팩트 {fact}, 일별 {daily}, 월별 {monthly} → {'일치' if fact == daily == monthly else '불일치'}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--reuse", action="store_true", help="기존 bench_rollup 스키마 재사용")
+    parser.add_argument("--keep", action="store_true", help="끝난 뒤 스키마를 남김")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        sys.exit("DATABASE_URL이 필요합니다")
+
+    conn = psycopg2.connect(dsn, options=f"-c search_path={SCHEMA}")
+    try:
+        if not args.reuse:
+            print(f"{SCHEMA} 스키마에 {args.rows:,}행 적재 중...")
+            load(conn, args.rows)
+        bench_queries(conn, args.repeat)
+        bench_maintenance(conn, args.batch)
+    finally:
+        if not args.keep and not args.reuse:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""KPI 템플릿 매칭 벤치마크 - 질문별 매칭 여부와 호출당 비용(µs)
+
+Vanna 학습 예제 질문과 변형 질문, 템플릿으로 답하면 안 되는 질문을 섞어
+템플릿 적중 여부(미적중은 Vanna/LLM 경로)와 매칭 비용을 출력합니다.
+
+    cd backend
+    python benchmarks/bench_templates.py --number 2000
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.kpi_templates import match_template, set_dimension_names  # noqa: E402
+from app.vanna_client import SQL_EXAMPLES  # noqa: E402
+
+# db/seed.sql의 지점/상품
+BRANCHES = ["서울본점", "부산지점", "대구지점", "대전지점", "광주지점"]
+PRODUCTS = ["신차구매금융", "중고차금융", "차량담보대출", "리스금융", "보증금융"]
+
+QUESTIONS = [example["question"] for example in SQL_EXAMPLES] + [
+    "지난달 판매액 알려줘",
+    "부산 이번 분기 계약 건수",
+    "2024년 3월 상품별 판매액",
+    "top 3 지점 올해 판매량",
+    "지점별 월별 판매액과 건수",
+    "중고차금융 작년 평균 판매액",
+    "서울본점과 대구지점 지난 분기 판매액",
+    # 템플릿으로 답하지 않는 질문 (LLM 경로)
+    "신규 고객 비율은?",
+    "1월 판매액은?",
+    "판매액이 전월보다 늘어난 지점은?",
+    "전월 대비 판매액",
+    "전년 대비 지점별 판매액 증감",
+]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    set_dimension_names(BRANCHES, PRODUCTS)
+    print(f"{'질문':<28} | {'템플릿':<36} | {'µs/호출':>8}")
+    print("-" * 80)
+    hits = 0
+    for question in QUESTIONS:
+        match = match_template(question)
+        hits += match is not None
+        us = min(timeit.repeat(lambda: match_template(question), number=args.number, repeat=3)) / args.number * 1e6
+        print(f"{question:<28} | {match.intent if match else '- (LLM)':<36} | {us:>8.1f}")
+    print(f"\n템플릿 적중 {hits}/{len(QUESTIONS)}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,168 @@
+"""SQL 지문(리터럴 → $n 파라미터) 테스트"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from app import db
+from app.fingerprint import fingerprint_sql
+
+
+def test_extracts_string_and_limit_literals():
+    fp = fingerprint_sql("SELECT b.branch_name FROM dim_branch b WHERE b.branch_name LIKE '%서울본점%' LIMIT 5;")
+    assert fp.template == "select b.branch_name from dim_branch b where b.branch_name like $1 limit $2"
+    assert fp.params == ("%서울본점%", 5)
+    assert fp.param_types == ("unknown", "integer")
+    assert fp.limit == 5
+
+
+def test_same_template_shares_fingerprint_across_literals():
+    a = fingerprint_sql("SELECT COUNT(*) FROM fact_loan_sales WHERE branch_id = 1 LIMIT 10")
+    b = fingerprint_sql("select  count(*)\nFROM fact_loan_sales -- 주석\nWHERE branch_id = 3 LIMIT 20")
+    assert a.fingerprint == b.fingerprint
+    assert (a.params, b.params) == ((1, 10), (3, 20))
+
+
+def test_repeated_literal_reuses_parameter_number():
+    fp = fingerprint_sql("SELECT 'O''Brien' AS a, 'O''Brien' AS b WHERE x = 1 AND y = 1")
+    assert fp.template == "select $1 as a, $1 as b where x = $2 and y = $2"
+    assert fp.params == ("O'Brien", 1)
+
+
+@pytest.mark.parametrize("sql, template", [
+    ("SELECT a, SUM(x) FROM t GROUP BY 1 ORDER BY 2 DESC", "select a, sum(x) from t group by 1 order by 2 desc"),
+    ("SELECT a, b FROM t GROUP BY 1, 2 ORDER BY 1 NULLS LAST LIMIT 3",
+     "select a, b from t group by 1, 2 order by 1 nulls last limit $1"),
+    ("SELECT * FROM (SELECT a FROM t ORDER BY 1 LIMIT 3) s WHERE a > 2",
+     "select * from (select a from t order by 1 limit $1) s where a > $2"),
+    # 목록 항목 전체가 숫자가 아니면 식의 리터럴
+    ("SELECT a FROM t ORDER BY a + 1, 2", "select a from t order by a + $1, 2"),
+])
+def test_preserves_group_and_order_by_ordinals(sql, template):
+    assert fingerprint_sql(sql).template == template
+
+
+@pytest.mark.parametrize("sql, template", [
+    ("SELECT DATE_TRUNC('month', sale_date) FROM t GROUP BY DATE_TRUNC('month', sale_date)",
+     "select date_trunc('month', sale_date) from t group by date_trunc('month', sale_date)"),
+    ("SELECT TO_CHAR(sale_date, 'YYYY-MM') FROM t", "select to_char(sale_date, 'YYYY-MM') from t"),
+    ("SELECT EXTRACT(YEAR FROM sale_date) FROM t", "select extract(year from sale_date) from t"),
+    ("SELECT x::NUMERIC(15, 2), CAST(y AS VARCHAR(10)) FROM t",
+     "select x::numeric(15, 2), cast(y as varchar(10)) from t"),
+])
+def test_keeps_constant_arguments(sql, template):
+    fp = fingerprint_sql(sql)
+    assert fp.template == template
+    assert fp.params == ()
+
+
+def test_typed_literals_become_casts():
+    fp = fingerprint_sql(
+        "SELECT 1 FROM t WHERE sale_date >= DATE '2024-01-01' AND sale_date > CURRENT_DATE - INTERVAL '1 month'"
+    )
+    assert fp.template == "select $1 from t where sale_date >= $2::date and sale_date > current_date - $3::interval"
+    assert fp.params == (1, "2024-01-01", "1 month")
+
+
+def test_interval_with_field_stays_literal():
+    assert fingerprint_sql("SELECT INTERVAL '1' MONTH").template == "select interval '1' month"
+
+
+def test_escape_and_dollar_strings_stay_literal():
+    fp = fingerprint_sql("SELECT E'it\\'s' AS a, $$x'y$$ AS b, 'it''s' AS c")
+    assert fp.template == "select E'it\\'s' as a, $$x'y$$ as b, $1 as c"
+    assert fp.params == ("it's",)
+
+
+def test_number_types():
+    fp = fingerprint_sql("SELECT 1, 3000000000, 99999999999999999999, 1.5")
+    assert fp.params == (1, 3000000000, Decimal("99999999999999999999"), Decimal("1.5"))
+    assert fp.param_types == ("integer", "bigint", "numeric", "numeric")
+
+
+def test_quoted_identifiers_keep_case():
+    fp = fingerprint_sql('SELECT "지점명", "BranchName" FROM T')
+    assert fp.template == 'select "지점명", "BranchName" from t'
+
+
+class _FakeCursor:
+    """실행한 SQL을 기록하고, fail_on이 들어간 SQL이면 그 예외를 던지는 커서"""
+
+    def __init__(self, fail_on=None, error=None):
+        self.connection = SimpleNamespace(prepared=OrderedDict())
+        self.executed = []
+        self.fail_on = fail_on
+        self.error = error
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        if self.fail_on and self.fail_on in sql:
+            raise self.error
+
+
+@pytest.fixture
+def prepared_capacity(monkeypatch):
+    def set_capacity(n):
+        monkeypatch.setattr(db, "get_settings", lambda: SimpleNamespace(DB_PREPARED_STATEMENTS=n))
+    monkeypatch.setattr(db, "_unpreparable", set())
+    set_capacity(8)
+    return set_capacity
+
+
+def test_execute_prepared_prepares_once(prepared_capacity):
+    cursor = _FakeCursor()
+    fp = fingerprint_sql("SELECT * FROM dim_branch WHERE branch_name LIKE '%본점%' LIMIT 5")
+    name = f"fp_{fp.fingerprint}"
+
+    assert db._execute_prepared(cursor, fp, timeout=1)
+    # PREPARE는 파라미터 없이 단독으로 (템플릿의 %는 이스케이프하지 않음)
+    assert cursor.executed[0] == (
+        f"PREPARE {name} (unknown, integer) AS select * from dim_branch where branch_name like $1 limit $2", None
+    )
+    sql, params = cursor.executed[1]
+    assert sql.startswith("BEGIN READ ONLY; ") and sql.endswith(f"EXECUTE {name}(%s, %s)")
+    assert params == ("%본점%", 5)
+
+    assert db._execute_prepared(cursor, fp, timeout=1)
+    assert len(cursor.executed) == 3
+    sql, _ = cursor.executed[-1]
+    assert "PREPARE" not in sql and sql.endswith(f"EXECUTE {name}(%s, %s)")
+
+
+def test_execute_prepared_evicts_least_recent(prepared_capacity):
+    prepared_capacity(1)
+    cursor = _FakeCursor()
+    first = fingerprint_sql("SELECT 1 LIMIT 1")
+    second = fingerprint_sql("SELECT 'a' LIMIT 1")
+
+    db._execute_prepared(cursor, first, timeout=1)
+    db._execute_prepared(cursor, second, timeout=1)
+    sql, _ = cursor.executed[-2]
+    assert sql.startswith(f"DEALLOCATE fp_{first.fingerprint}; PREPARE fp_{second.fingerprint}")
+    assert list(cursor.connection.prepared) == [second.fingerprint]
+
+
+def test_prepare_failure_falls_back_to_raw_sql(prepared_capacity):
+    cursor = _FakeCursor(fail_on="PREPARE", error=psycopg2.ProgrammingError("could not determine data type"))
+    fp = fingerprint_sql("SELECT 'a' || 'b' LIMIT 1")
+
+    assert not db._execute_prepared(cursor, fp, timeout=1)
+    assert fp.fingerprint in db._unpreparable
+    assert fp.fingerprint not in cursor.connection.prepared
+    # 다시 PREPARE를 시도하지 않음
+    assert not db._execute_prepared(cursor, fp, timeout=1)
+    assert len(cursor.executed) == 1
+
+
+def test_execute_data_error_is_raised_once(prepared_capacity):
+    cursor = _FakeCursor(fail_on="EXECUTE", error=psycopg2.DataError("division by zero"))
+    fp = fingerprint_sql("SELECT SUM(disbursed_amount) / 0 FROM fact_loan_sales LIMIT 1")
+
+    with pytest.raises(psycopg2.DataError):
+        db._execute_prepared(cursor, fp, timeout=1)
+    assert [sql.split(" ", 1)[0] for sql, _ in cursor.executed] == ["PREPARE", "BEGIN"]
+    assert fp.fingerprint not in db._unpreparable
+    assert fp.fingerprint in cursor.connection.prepared
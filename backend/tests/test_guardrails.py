@@ -0,0 +1,49 @@
+"""guardrails / sql_lexer 회귀 테스트"""
+
+import pytest
+
+from app.guardrails import validate_and_rewrite
+from app.sql_lexer import tokenize, COMMENT, WORD
+
+
+@pytest.mark.parametrize("sql", [
+    # 식별자 안의 '$'를 달러 인용 시작으로 오인하면 뒤 문장이 숨겨짐
+    "SELECT 1 AS a$b$; COMMIT; BEGIN READ WRITE; DROP TABLE fact_loan_sales; COMMIT; SELECT 1 AS c$b$",
+    "SELECT 1$b$; DROP TABLE fact_loan_sales; $b$",
+    "SELECT 1$b$x$b$",
+    "SELECT $ 1",
+    # 중첩 블록 주석: 첫 */ 에서 끝나지 않음
+    "SELECT 1 /* a /* b */ ; DROP TABLE fact_loan_sales; */",
+    "SELECT 1 /* a /* b */ FROM fact_loan_sales",
+    # 맨 끝 이외의 세미콜론은 위치와 무관하게 거부
+    "SELECT 1; SELECT 2",
+    "SELECT ';' AS s",
+    "SELECT 1 -- ;\nFROM fact_loan_sales",
+    "SELECT 1;;",
+    "DELETE FROM fact_loan_sales",
+    "SELECT 1 FROM t WHERE x IN (DROP)",
+])
+def test_rejects_unsafe_sql(sql):
+    with pytest.raises(ValueError):
+        validate_and_rewrite(sql)
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT 1 AS a$b$ FROM t", "SELECT 1 AS a$b$ FROM t LIMIT 1000;"),
+    ("SELECT $x$it's$x$ AS s", "SELECT $x$it's$x$ AS s LIMIT 1000;"),
+    ("SELECT $$DROP$$ AS s LIMIT 5;", "SELECT $$DROP$$ AS s LIMIT 5;"),
+    ("SELECT 'DROP' AS s", "SELECT 'DROP' AS s LIMIT 1000;"),
+    ("SELECT 1 /* a /* DROP */ b */ AS x", "SELECT 1  AS x LIMIT 1000;"),
+])
+def test_accepts_and_rewrites(sql, expected):
+    assert validate_and_rewrite(sql) == expected
+
+
+def test_identifier_may_contain_dollar():
+    assert [t for t in tokenize("a$b$ c$1") if t.kind == WORD] == [(WORD, "a$b$"), (WORD, "c$1")]
+
+
+def test_nested_block_comment_is_one_token():
+    tokens = tokenize("/* a /* b */ c */x")
+    assert tokens[0] == (COMMENT, "/* a /* b */ c */")
+    assert tokens[1] == (WORD, "x")
@@ -0,0 +1,53 @@
+"""응답 인코딩/압축 협상 테스트"""
+
+import gzip
+
+import pytest
+
+from app import json_response
+from app.json_response import compress
+
+BODY = b'{"rows":[' + b",".join(b'[1,"x"]' for _ in range(2000)) + b"]}"
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("GZIP;Q=0.5", "gzip"),
+    # q=0은 명시적 거부
+    ("gzip;q=0", None),
+    ("zstd;q=0, gzip", "gzip"),
+    ("zstd;q=0.0, gzip;q=0", None),
+    ("gzip;q=0.000", None),
+    # q 값이 높은 쪽, 같으면 zstd
+    ("zstd;q=0.5, gzip;q=0.8", "gzip"),
+    ("zstd;q=0.8, gzip;q=0.8", "zstd"),
+    # '*'는 목록에 없는 코딩에만 적용
+    ("*", "zstd"),
+    ("*;q=0", None),
+    ("zstd;q=0, *", "gzip"),
+    ("*;q=0, gzip", "gzip"),
+    # 잘못된 q 값은 거부로 취급
+    ("gzip;q=abc", None),
+    ("gzip;q=2", None),
+])
+def test_compress_honours_q_values(accept_encoding, expected):
+    body, encoding = compress(BODY, accept_encoding)
+    assert encoding == expected
+    if encoding is None:
+        assert body == BODY
+    elif encoding == "gzip":
+        assert gzip.decompress(body) == BODY
+
+
+def test_zstd_requires_zstandard(monkeypatch):
+    monkeypatch.setattr(json_response, "_zstd_compressor", None)
+    assert compress(BODY, "zstd")[1] is None
+    assert compress(BODY, "zstd, gzip;q=0.1")[1] == "gzip"
+
+
+def test_small_bodies_are_not_compressed():
+    assert compress(b"{}", "gzip") == (b"{}", None)
@@ -0,0 +1,119 @@
+"""KPI 질문 템플릿 매칭 테스트"""
+
+import pytest
+
+from app import kpi_templates
+from app.kpi_templates import match_template
+from app.vanna_client import SQL_EXAMPLES
+
+# db/seed.sql의 지점/상품/지역
+BRANCHES = ["서울본점", "부산지점", "대구지점", "대전지점", "광주지점"]
+PRODUCTS = ["신차구매금융", "중고차금융", "차량담보대출", "리스금융", "보증금융"]
+REGIONS = ["서울", "부산", "대구", "대전", "광주"]
+
+LAST_MONTH = (
+    "f.sale_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month') "
+    "AND f.sale_date < DATE_TRUNC('month', CURRENT_DATE)"
+)
+
+
+@pytest.fixture(autouse=True)
+def _dimensions():
+    kpi_templates.set_dimension_names(BRANCHES, PRODUCTS, REGIONS)
+    yield
+    kpi_templates.set_dimension_names([], [], [])
+
+
+@pytest.mark.parametrize("question, intent", [
+    # Vanna 학습 예제
+    ("지난 달 전체 판매액은?", "sum+last_month"),
+    ("서울본점의 이번 달 계약 건수는?", "count+this_month+branch_filter"),
+    ("상위 5개 지점의 판매액은?", "sum+branch+top"),
+    # 띄어쓰기/군더더기/별칭 변형
+    ("지난달 판매액 알려줘", "sum+last_month"),
+    ("부산 이번 분기 계약 건수", "count+this_quarter+branch_filter"),
+    ("2024년 3월 상품별 판매액", "sum+product+month_literal"),
+    ("top 3 지점 올해 판매량", "count+branch+this_year+top"),
+    ("지점별 월별 판매액과 건수", "sum+count+branch+month"),
+    ("중고차금융 작년 평균 판매액", "avg+last_year+product_filter"),
+    ("서울본점과 대구지점 지난 분기 판매액", "sum+branch+last_quarter+branch_filter"),
+    ("지역별 최근 30일 계약 건수", "count+region+recent"),
+])
+def test_matches_kpi_questions(question, intent):
+    match = match_template(question)
+    assert match is not None
+    assert match.intent == intent
+
+
+def test_trained_questions_all_match():
+    for example in SQL_EXAMPLES:
+        assert match_template(example["question"]) is not None, example["question"]
+
+
+def test_period_only_question():
+    assert match_template("지난 달 전체 판매액은?").sql == (
+        "SELECT SUM(f.disbursed_amount) AS total_sales_amount\n"
+        "FROM fact_loan_sales f\n"
+        f"WHERE {LAST_MONTH}"
+    )
+
+
+def test_branch_filter_uses_exact_name_from_alias():
+    sql = match_template("부산 이번 달 계약 건수는?").sql
+    assert "JOIN dim_branch b ON f.branch_id = b.branch_id" in sql
+    assert "b.branch_name = '부산지점'" in sql
+    assert "dim_product" not in sql
+
+
+def test_product_filter_and_absolute_quarter():
+    sql = match_template("2024년 2분기 리스금융 판매액").sql
+    assert "p.product_name = '리스금융'" in sql
+    assert "f.sale_date >= DATE '2024-04-01' AND f.sale_date < DATE '2024-07-01'" in sql
+
+
+def test_several_branches_are_grouped():
+    sql = match_template("서울본점과 대구지점 지난 달 판매액").sql
+    assert "b.branch_name IN ('서울본점', '대구지점')" in sql
+    assert "GROUP BY b.branch_name" in sql
+    assert LAST_MONTH in sql
+
+
+def test_top_n_orders_and_limits():
+    sql = match_template("하위 2개 상품 작년 판매액").sql
+    assert sql.endswith("ORDER BY total_sales_amount ASC\nLIMIT 2")
+    assert "GROUP BY p.product_name" in sql
+
+
+def test_time_group_is_ordered_by_time():
+    sql = match_template("올해 월별 판매액").sql
+    assert "DATE_TRUNC('month', f.sale_date) AS month" in sql
+    assert sql.endswith("ORDER BY DATE_TRUNC('month', f.sale_date)")
+
+
+@pytest.mark.parametrize("question", [
+    # 모르는 말이 남음
+    "신규 고객 비율은?",
+    "담당자별 판매액",
+    "판매액이 전월보다 늘어난 지점은?",
+    # 비교/비율 질문은 한 기간 합계로 답하면 틀림
+    "전월 대비 판매액",
+    "전년 대비 지점별 판매액 증감",
+    "서울본점과 부산지점 판매액 비교",
+    "상품별 판매액 비중",
+    "이번 달 vs 지난 달 판매액",
+    # 연도 없는 월, 기간이 둘, 지표 없음, 상위 0개, 그룹이 너무 많음
+    "1월 판매액은?",
+    "지난 달 이번 달 판매액",
+    "지난 달 서울본점",
+    "상위 0개 지점 판매액",
+    "지점별 상품별 월별 판매액",
+    # 등록되지 않은 지점 이름
+    "인천지점 지난 달 판매액",
+])
+def test_falls_through_to_llm(question):
+    assert match_template(question) is None
+
+
+def test_unregistered_names_fall_through():
+    kpi_templates.set_dimension_names([], [], [])
+    assert match_template("서울본점의 이번 달 계약 건수는?") is None
@@ -0,0 +1,77 @@
+"""질문 캐시 조회 단계(exact/normalized/similar) 테스트"""
+
+import pytest
+
+from app import kpi_templates, question_cache
+from app.question_cache import QuestionCache, normalize_question
+
+BRANCHES = ["서울본점", "부산지점", "대구지점", "대전지점", "광주지점"]
+PRODUCTS = ["신차구매금융", "중고차금융", "차량담보대출", "리스금융", "보증금융"]
+REGIONS = ["서울", "부산", "대구", "대전", "광주"]
+
+
+@pytest.fixture(autouse=True)
+def _dimensions(monkeypatch):
+    monkeypatch.setattr(question_cache, "schema_version", lambda: 1)
+    kpi_templates.set_dimension_names(BRANCHES, PRODUCTS, REGIONS)
+    yield
+    kpi_templates.set_dimension_names([], [], [])
+
+
+@pytest.fixture
+def cache():
+    return QuestionCache(max_entries=100, ttl_seconds=60, similarity_threshold=0.85)
+
+
+def test_normalized_hit_ignores_spacing_and_fillers(cache):
+    cache.put("지난 달 전체 판매액은?", "SQL")
+    assert cache.get("지난달 전체 판매액 알려줘") == "SQL"
+    assert cache.stats()["normalized"] == 1
+
+
+def test_similar_hit_accepts_typo(cache):
+    cache.put("작년 월별 상품별 지역별 판매액 추이 그래프", "SQL")
+    assert cache.get("작년 월별 상품별 지역별 판메액 추이 그래프") == "SQL"
+    assert cache.stats()["similar"] == 1
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("대구지점 이번 달 상품별 판매액 추이 보여줘", "대전지점 이번 달 상품별 판매액 추이 보여줘"),
+    ("대구지점의 작년 월별 신차구매금융 계약 건수 추이", "대전지점의 작년 월별 신차구매금융 계약 건수 추이"),
+    ("부산지점 작년 월별 리스금융 판매액 추이", "부산지점 작년 월별 보증금융 판매액 추이"),
+    ("대구 지역 작년 월별 판매액 추이 보여줘", "대전 지역 작년 월별 판매액 추이 보여줘"),
+    ("지난 달 상품별 판매액 추이", "지난 달 상품별 판매액 추이 2024"),
+])
+def test_different_dimension_is_never_similar(cache, cached, asked):
+    cache.put(cached, "SQL")
+    assert cache.get(asked) is None
+    assert cache.stats()["miss"] == 1
+
+
+def test_typo_inside_dimension_name_is_not_accepted(cache):
+    cache.put("대구지점 이번 달 상품별 판매액 추이 보여줘", "SQL")
+    assert cache.get("대구지졈 이번 달 상품별 판매액 추이 보여줘") is None
+
+
+def test_evicted_entries_leave_similar_index():
+    cache = QuestionCache(max_entries=1, ttl_seconds=60, similarity_threshold=0.85)
+    cache.put("작년 월별 상품별 지역별 판매액 추이 그래프", "OLD")
+    cache.put("지난 달 지역별 계약 건수 추이", "NEW")
+    assert cache.get("작년 월별 상품별 지역별 판메액 추이 그래프") is None
+    assert cache.stats()["evicted"] == 1
+    assert sum(len(keys) for keys in cache._by_token_count.values()) == 1
+
+
+def test_range_particles_keep_their_meaning():
+    keys = {normalize_question(q) for q in ("3월부터 판매액", "3월까지 판매액", "3월 판매액")}
+    assert len(keys) == 3
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("3월부터 서울본점 판매액", "3월까지 서울본점 판매액"),
+    ("3월부터 서울본점 판매액", "3월 서울본점 판매액"),
+    ("2024년 3월까지 상품별 계약 건수", "2024년 3월 상품별 계약 건수"),
+])
+def test_range_particles_never_share_sql(cache, cached, asked):
+    cache.put(cached, "SQL")
+    assert cache.get(asked) is None
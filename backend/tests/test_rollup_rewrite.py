@@ -0,0 +1,106 @@
+"""롤업 재작성 규칙 테스트"""
+
+import pytest
+
+from app import rollup_rewrite
+from app.rollup_rewrite import ROLLUPS, _rewrite, rewrite_for_rollup
+
+ALL = frozenset(r.table for r in ROLLUPS)
+DAILY_ONLY = frozenset({"agg_sales_daily"})
+
+
+@pytest.mark.parametrize("sql, expected, table", [
+    # SUM(disbursed_amount) → 롤업 합계, 일 단위 조건이면 일별 롤업
+    (
+        "SELECT b.branch_name, SUM(f.disbursed_amount) AS total FROM fact_loan_sales f "
+        "JOIN dim_branch b ON f.branch_id = b.branch_id WHERE f.sale_date >= DATE '2024-01-01' "
+        "GROUP BY b.branch_name LIMIT 1000;",
+        "SELECT b.branch_name, SUM(f.total_amount) AS total FROM agg_sales_daily f "
+        "JOIN dim_branch b ON f.branch_id = b.branch_id WHERE f.sale_date >= DATE '2024-01-01' "
+        "GROUP BY b.branch_name LIMIT 1000;",
+        "agg_sales_daily",
+    ),
+    # COUNT(*) → 빈 범위에서도 0이 되도록 COALESCE, 별칭 없는 컬럼명은 count 유지
+    (
+        "SELECT COUNT(*) FROM fact_loan_sales WHERE sale_date >= DATE '2024-01-01' LIMIT 1000;",
+        "SELECT COALESCE(SUM(agg_sales_daily.sale_count), 0)::BIGINT AS count FROM agg_sales_daily "
+        "WHERE sale_date >= DATE '2024-01-01' LIMIT 1000;",
+        "agg_sales_daily",
+    ),
+    # sale_date가 월 단위 DATE_TRUNC 안에만 있으면 월별 롤업
+    (
+        "SELECT DATE_TRUNC('month', sale_date) AS month, COUNT(*) FROM fact_loan_sales "
+        "GROUP BY DATE_TRUNC('month', sale_date) ORDER BY 1 LIMIT 1000;",
+        "SELECT DATE_TRUNC('month', sale_month) AS month, COALESCE(SUM(agg_sales_monthly.sale_count), 0)::BIGINT AS count "
+        "FROM agg_sales_monthly GROUP BY DATE_TRUNC('month', sale_month) ORDER BY 1 LIMIT 1000;",
+        "agg_sales_monthly",
+    ),
+    # AVG → SUM / NULLIF(SUM(count)), EXTRACT(YEAR ...)도 월 단위로 안전
+    (
+        "SELECT AVG(f.disbursed_amount) AS avg_amount FROM fact_loan_sales f "
+        "WHERE EXTRACT(YEAR FROM f.sale_date) = 2024 LIMIT 1000;",
+        "SELECT (SUM(f.total_amount) / NULLIF(SUM(f.sale_count), 0)) AS avg_amount FROM agg_sales_monthly f "
+        "WHERE EXTRACT(YEAR FROM f.sale_month) = 2024 LIMIT 1000;",
+        "agg_sales_monthly",
+    ),
+    # COUNT(DISTINCT 계약번호) == 행 수, USING 조인
+    (
+        "SELECT p.product_name, COUNT(DISTINCT f.contract_id) AS n FROM fact_loan_sales f "
+        "LEFT JOIN dim_product p USING (product_id) GROUP BY p.product_name LIMIT 1000;",
+        "SELECT p.product_name, COALESCE(SUM(f.sale_count), 0)::BIGINT AS n FROM agg_sales_monthly f "
+        "LEFT JOIN dim_product p USING (product_id) GROUP BY p.product_name LIMIT 1000;",
+        "agg_sales_monthly",
+    ),
+    # MIN/MAX(sale_date)는 롤업 행에 그대로 적용
+    (
+        "SELECT MAX(sale_date), COUNT(*) FROM fact_loan_sales LIMIT 1000;",
+        "SELECT MAX(sale_date), COALESCE(SUM(agg_sales_daily.sale_count), 0)::BIGINT AS count FROM agg_sales_daily LIMIT 1000;",
+        "agg_sales_daily",
+    ),
+])
+def test_rewrites_supported_shapes(sql, expected, table):
+    assert _rewrite(sql, ALL) == (expected, table)
+
+
+def test_month_safe_query_falls_back_to_daily_rollup():
+    sql = "SELECT DATE_TRUNC('year', sale_date) AS year, SUM(disbursed_amount) FROM fact_loan_sales GROUP BY 1 LIMIT 1000;"
+    rewritten, table = _rewrite(sql, DAILY_ONLY)
+    assert table == "agg_sales_daily"
+    assert "DATE_TRUNC('year', sale_date)" in rewritten
+
+
+@pytest.mark.parametrize("sql", [
+    # 월보다 작은 단위로 자르면 월별 롤업 불가
+    "SELECT DATE_TRUNC('week', sale_date), COUNT(*) FROM fact_loan_sales GROUP BY 1 LIMIT 1000;",
+    "SELECT COUNT(*) FROM fact_loan_sales WHERE EXTRACT(DAY FROM sale_date) = 1 LIMIT 1000;",
+])
+def test_sub_month_dates_never_use_monthly_rollup(sql):
+    assert _rewrite(sql, ALL)[1] == "agg_sales_daily"
+    assert _rewrite(sql, frozenset({"agg_sales_monthly"}))[0] is None
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT MAX(disbursed_amount) FROM fact_loan_sales LIMIT 1000;",
+    "SELECT SUM(quantity) FROM fact_loan_sales LIMIT 1000;",
+    "SELECT SUM(disbursed_amount * 2) FROM fact_loan_sales LIMIT 1000;",
+    "SELECT SUM(DISTINCT disbursed_amount) FROM fact_loan_sales LIMIT 1000;",
+    "SELECT contract_id, SUM(disbursed_amount) FROM fact_loan_sales GROUP BY contract_id LIMIT 1000;",
+    "SELECT SUM(disbursed_amount) FROM fact_loan_sales WHERE sale_date IN (SELECT MAX(sale_date) FROM fact_loan_sales) LIMIT 1000;",
+    "SELECT SUM(f.disbursed_amount) OVER () FROM fact_loan_sales f LIMIT 1000;",
+    "SELECT SUM(f.disbursed_amount) FROM fact_loan_sales f JOIN dim_branch b ON f.branch_id = b.branch_id AND b.region = '서울' LIMIT 1000;",
+    "SELECT SUM(f.disbursed_amount) FROM fact_loan_sales f, dim_branch b WHERE f.branch_id = b.branch_id LIMIT 1000;",
+    "SELECT SUM(f.disbursed_amount) FROM fact_loan_sales f WHERE f.created_at > NOW() - INTERVAL '1 day' LIMIT 1000;",
+    "SELECT b.branch_name FROM dim_branch b LIMIT 1000;",
+    "SELECT sale_date FROM fact_loan_sales LIMIT 1000;",
+])
+def test_leaves_unsupported_shapes_untouched(sql):
+    rewritten, reason = _rewrite(sql, ALL)
+    assert rewritten is None, reason
+
+
+def test_rewrite_for_rollup_needs_available_tables(monkeypatch):
+    sql = "SELECT COUNT(*) FROM fact_loan_sales LIMIT 1000;"
+    monkeypatch.setattr(rollup_rewrite, "_available", frozenset())
+    assert rewrite_for_rollup(sql) == sql
+    monkeypatch.setattr(rollup_rewrite, "_available", DAILY_ONLY)
+    assert "agg_sales_daily" in rewrite_for_rollup(sql)
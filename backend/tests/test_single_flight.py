@@ -0,0 +1,35 @@
+"""동시에 들어온 같은 질문의 SQL 생성 공유(single-flight) 테스트"""
+
+import asyncio
+
+from app import main
+
+
+def _run_concurrently(monkeypatch, questions):
+    """questions를 동시에 resolve_sql로 보내고 (결과, _resolve_sql 호출 수) 반환"""
+    calls = []
+
+    async def fake_resolve(question):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return f"SQL for {question}"
+
+    monkeypatch.setattr(main, "_resolve_sql", fake_resolve)
+
+    async def run():
+        return await asyncio.gather(*(main.resolve_sql(q) for q in questions))
+
+    return asyncio.run(run()), calls
+
+
+def test_same_normalized_question_is_coalesced(monkeypatch):
+    results, calls = _run_concurrently(monkeypatch, ["지난 달 전체 판매액은?", "지난달 전체 판매액 알려줘"])
+    assert len(calls) == 1
+    assert results[0] == results[1]
+
+
+def test_range_particles_are_not_coalesced(monkeypatch):
+    questions = ["3월부터 서울본점 판매액", "3월까지 서울본점 판매액", "3월 서울본점 판매액"]
+    results, calls = _run_concurrently(monkeypatch, questions)
+    assert sorted(calls) == sorted(questions)
+    assert results == [f"SQL for {q}" for q in questions]
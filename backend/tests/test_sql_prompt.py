@@ -0,0 +1,49 @@
+"""SQL 프롬프트 구성(정적 프리픽스 + 질문별 섹션) 테스트"""
+
+import pytest
+
+from app import kpi_templates
+from app.llm_client import SYSTEM_PROMPT
+from app.sql_prompt import MIN_CACHEABLE_TOKENS, STATIC_PREFIX, build_prompt, estimate_tokens, select_sections
+
+
+@pytest.fixture(autouse=True)
+def _dimensions():
+    kpi_templates.set_dimension_names(["서울본점", "부산지점"], ["신차구매금융", "중고차금융"], ["서울", "부산"])
+    yield
+    kpi_templates.set_dimension_names([], [], [])
+
+
+def _names(question):
+    kpis, rules = select_sections(question)
+    return [s.name for s in kpis + rules]
+
+
+@pytest.mark.parametrize("question, expected", [
+    # "제일"의 '일'은 기간이 아님
+    ("제일 많이 판 상품은?", ["kpi_count", "kpi_amount", "kpi_product"]),
+    # 어디/어느 곳은 지점을 묻는 말
+    ("어디가 제일 많이 팔았어?", ["kpi_count", "kpi_amount", "kpi_branch"]),
+    ("어느 곳이 계약 건수가 많아?", ["kpi_count", "kpi_branch"]),
+    # 숫자 뒤의 기간 단위, 기간 단어
+    ("3월 판매액", ["kpi_amount", "kpi_period", "rule_date"]),
+    ("2024년 부산 계약 건수", ["kpi_count", "kpi_branch", "kpi_period", "rule_date"]),
+    ("최근 6개월 중고차금융 판매액 추이", ["kpi_amount", "kpi_product", "kpi_period", "rule_date"]),
+    ("지점별 월별 판매액", ["kpi_amount", "kpi_branch", "kpi_period", "rule_date"]),
+])
+def test_selects_sections_for_question(question, expected):
+    assert _names(question) == expected
+
+
+def test_static_prefix_is_cacheable_and_has_all_tables():
+    assert estimate_tokens(f"{SYSTEM_PROMPT}\n\n{STATIC_PREFIX}") >= MIN_CACHEABLE_TOKENS
+    for table in ("### dim_branch", "### dim_product", "### fact_loan_sales"):
+        assert table in STATIC_PREFIX
+
+
+def test_static_prefix_is_identical_across_questions():
+    a = build_prompt("제일 많이 판 상품은?")
+    b = build_prompt("어디가 제일 많이 팔았어?")
+    assert a.static == b.static == STATIC_PREFIX
+    assert a.dynamic.endswith("## 사용자 질문\n제일 많이 판 상품은?\n\nSQL:")
+    assert "지점별 실적" in b.dynamic and "상품별 실적" not in b.dynamic
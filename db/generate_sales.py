@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+"""대용량 판매 데이터 생성기 - 시드 기반 결정적 데이터를 COPY FROM STDIN으로 적재
+
+seed.sql의 200여 행으로는 실제 규모의 쿼리 계획/지연시간을 볼 수 없으므로,
+현실적인 분포로 dim_branch/dim_product/fact_loan_sales를 채웁니다.
+
+- 계절성: 월별 계수(1~2월 비수기, 3/6/12월 성수기) × 요일 계수(주말 감소) × 연 성장률
+- 지점 편중: 지점별 가중치가 Zipf 분포 (seed.sql의 5개 지점이 상위, 나머지는 17개 시도에 분산)
+- 상품 구성: 카테고리 비중(신차 > 중고차 > ...) × 카테고리 안 Zipf
+- 금액: 상품 카테고리별 로그정규 분포(중앙값/퍼짐)를 범위로 자르고 만원 단위로 반올림
+
+같은 --seed면 같은 데이터를 만듭니다. 팩트는 --chunk-rows 단위로 나눠 (시드, 청크 번호)로
+난수를 만들기 때문에 --workers 수와 관계없이 결과가 같습니다. 각 청크는 별도 프로세스에서
+COPY로 스트리밍 적재(청크마다 커밋)하고, 적재 전에 팩트의 PK/UNIQUE/FK 제약과 인덱스를
+지웠다가 적재 후 다시 만듭니다 (rollups.sql의 트리거는 끄고 적재 후 전체 재계산).
+적재나 재생성이 실패해도 제약/인덱스를 다시 만들고, 만들지 못한 것은 복원 DDL을 출력합니다.
+
+    cd db
+    DATABASE_URL=postgresql://... python generate_sales.py --rows 10000000 --truncate
+    python generate_sales.py --rows 1000 --dry-run   # DB 없이 샘플 행과 분포 확인
+"""
+
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+FACT_TABLE = "fact_loan_sales"
+FACT_COLUMNS = "(sale_id, contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity)"
+
+# seed.sql과 같은 이름을 앞에 두어 템플릿/학습 예제 질문이 그대로 동작하게 함
+SEED_BRANCHES = [
+    ("서울본점", "서울"), ("부산지점", "부산"), ("대구지점", "대구"), ("대전지점", "대전"), ("광주지점", "광주"),
+]
+REGIONS = [
+    ("서울", 10), ("경기", 9), ("부산", 5), ("인천", 4), ("대구", 4), ("경남", 4), ("경북", 3), ("충남", 3),
+    ("대전", 2), ("광주", 2), ("전북", 2), ("전남", 2), ("충북", 2), ("강원", 2), ("울산", 2), ("제주", 1), ("세종", 1),
+]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN_NAMES = ["민준", "서연", "도윤", "지우", "하준", "서현", "시우", "수아", "주원", "지민", "경수", "영미", "준호", "수진", "현우"]
+
+
+class Category(NamedTuple):
+    name: str           # product_category
+    base_name: str      # seed.sql 상품명 (카테고리 첫 상품)
+    share: float        # 계약 건수 비중
+    median: float       # 금액 중앙값 (원)
+    sigma: float        # 로그정규 퍼짐
+    low: float          # 금액 하한/상한 (원)
+    high: float
+
+
+CATEGORIES = [
+    Category("신차", "신차구매금융", 0.35, 30_000_000, 0.35, 5_000_000, 100_000_000),
+    Category("중고차", "중고차금융", 0.25, 12_000_000, 0.45, 2_000_000, 50_000_000),
+    Category("담보대출", "차량담보대출", 0.15, 15_000_000, 0.50, 3_000_000, 50_000_000),
+    Category("리스", "리스금융", 0.15, 40_000_000, 0.40, 10_000_000, 150_000_000),
+    Category("보증", "보증금융", 0.10, 5_000_000, 0.40, 1_000_000, 20_000_000),
+]
+PRODUCT_VARIANTS = ["스탠다드", "프리미엄", "플러스", "라이트", "우대", "다이렉트", "특판", "청년", "법인", "친환경"]
+
+MONTH_FACTORS = [0.80, 0.85, 1.10, 1.00, 1.00, 1.10, 0.95, 0.90, 1.00, 1.00, 1.05, 1.20]
+WEEKDAY_FACTORS = [1.10, 1.05, 1.00, 1.00, 1.15, 0.55, 0.20]  # 월~일
+ANNUAL_GROWTH = 0.06
+BRANCH_ZIPF = 0.9
+PRODUCT_ZIPF = 1.1
+
+
+class Model(NamedTuple):
+    """청크 생성에 필요한 분포 (프로세스로 넘기므로 단순 값만)"""
+    seed: int
+    days: List[str]
+    day_weights: List[float]        # 누적 가중치
+    branch_ids: List[int]
+    branch_weights: List[float]     # 누적
+    product_ids: List[int]
+    product_weights: List[float]    # 누적
+    product_amounts: Dict[int, Tuple[float, float, float, float]]  # product_id → (mu, sigma, low, high)
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def build_branches(count: int, rng: random.Random) -> List[Tuple[int, str, str, str]]:
+    """(branch_id, branch_name, region, manager_name) - 시도 인구 비중대로 지점 배분"""
+    branches = list(SEED_BRANCHES)
+    per_region: Counter = Counter(region for _, region in branches)
+    regions = [r for r, _ in REGIONS]
+    weights = [w for _, w in REGIONS]
+    while len(branches) < count:
+        region = rng.choices(regions, weights=weights)[0]
+        per_region[region] += 1
+        branches.append((f"{region}{per_region[region]}지점", region))
+    return [
+        (i + 1, name, region, rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES))
+        for i, (name, region) in enumerate(branches[:count])
+    ]
+
+
+def build_products(count: int) -> List[Tuple[int, str, str, str]]:
+    """(product_id, product_name, product_category, description) - 카테고리를 번갈아 배분"""
+    products = []
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        k = i // len(CATEGORIES)
+        name = category.base_name if k == 0 else f"{category.base_name} {PRODUCT_VARIANTS[(k - 1) % len(PRODUCT_VARIANTS)]}"
+        if k > len(PRODUCT_VARIANTS):  # 변형을 다 쓰면 "... 스탠다드 2"
+            name += f" {(k - 1) // len(PRODUCT_VARIANTS) + 1}"
+        products.append((i + 1, name, category.name, f"{category.name} 자동차금융 ({name})"))
+    return products
+
+
+def build_model(args, branches, products) -> Model:
+    start = date.fromisoformat(args.start)
+    days = [start + timedelta(days=d) for d in range(args.days)]
+    day_weights = [
+        MONTH_FACTORS[d.month - 1] * WEEKDAY_FACTORS[d.weekday()] * (1 + ANNUAL_GROWTH) ** ((d - start).days / 365)
+        for d in days
+    ]
+
+    by_name = {c.name: c for c in CATEGORIES}
+    product_weights = []
+    product_amounts = {}
+    for category in CATEGORIES:
+        members = [p for p in products if p[2] == category.name]
+        weights = zipf_weights(len(members), PRODUCT_ZIPF)
+        total = sum(weights)
+        for p, w in zip(members, weights):
+            product_weights.append((p[0], category.share * w / total))
+    for product_id, _, category_name, _ in products:
+        c = by_name[category_name]
+        product_amounts[product_id] = (math.log(c.median), c.sigma, c.low, c.high)
+    product_weights.sort()
+
+    return Model(
+        seed=args.seed,
+        days=[d.isoformat() for d in days],
+        day_weights=list(accumulate(day_weights)),
+        branch_ids=[b[0] for b in branches],
+        branch_weights=list(accumulate(zipf_weights(len(branches), BRANCH_ZIPF))),
+        product_ids=[p for p, _ in product_weights],
+        product_weights=list(accumulate(w for _, w in product_weights)),
+        product_amounts=product_amounts,
+    )
+
+
+def generate_chunk(model: Model, chunk: int, first_id: int, rows: int) -> Iterator[str]:
+    """청크의 COPY 텍스트 행 (sale_id는 first_id부터 연속)"""
+    rng = random.Random(f"{model.seed}:{chunk}")
+    days = sorted(rng.choices(model.days, cum_weights=model.day_weights, k=rows))  # 실제 유입처럼 날짜순 (BRIN 효율)
+    branches = rng.choices(model.branch_ids, cum_weights=model.branch_weights, k=rows)
+    products = rng.choices(model.product_ids, cum_weights=model.product_weights, k=rows)
+    lognormvariate = rng.lognormvariate
+    amounts = model.product_amounts
+    for i in range(rows):
+        product_id = products[i]
+        mu, sigma, low, high = amounts[product_id]
+        amount = round(min(high, max(low, lognormvariate(mu, sigma))), -4)
+        sale_id = first_id + i
+        yield f"{sale_id}\tL{sale_id:010d}\t{branches[i]}\t{product_id}\t{days[i]}\t{amount:.0f}\t1\n"
+
+
+class _LineReader(io.TextIOBase):
+    """행 이터레이터를 copy_expert가 읽을 수 있는 파일처럼 감쌈 (메모리에 전체를 올리지 않음)"""
+
+    def __init__(self, lines: Iterator[str], batch: int = 10_000):
+        self._lines = lines
+        self._batch = batch
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        chunk = []
+        for line in self._lines:
+            chunk.append(line)
+            if len(chunk) >= self._batch:
+                break
+        return "".join(chunk)
+
+
+def _connect(url: str):
+    import psycopg2
+    return psycopg2.connect(url)
+
+
+def load_chunk(url: str, model: Model, chunk: int, first_id: int, rows: int) -> int:
+    """한 청크를 COPY로 적재 (프로세스 풀에서 실행)"""
+    conn = _connect(url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET synchronous_commit = off")
+            cursor.copy_expert(
+                f"COPY {FACT_TABLE} {FACT_COLUMNS} FROM STDIN",
+                _LineReader(generate_chunk(model, chunk, first_id, rows)),
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    return rows
+
+
+def copy_rows(cursor, table: str, columns: str, rows: List[tuple]) -> None:
+    lines = ("\t".join(str(v) for v in row) + "\n" for row in rows)
+    cursor.copy_expert(f"COPY {table} {columns} FROM STDIN", _LineReader(lines))
+
+
+def fact_constraints_and_indexes(cursor) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str]]]:
+    """
+    팩트 테이블의 (제약 이름, 종류, 정의)와 제약에 속하지 않은 (인덱스 이름, 정의)
+
+    스키마 파일이 아니라 카탈로그에서 읽으므로 파티션 등 테이블 정의가 바뀌어도 그대로 복원됩니다.
+    """
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f') ORDER BY contype DESC",
+        (FACT_TABLE,),
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = %s::regclass AND NOT EXISTS ("
+        "  SELECT 1 FROM pg_constraint k WHERE k.conrelid = i.indrelid AND k.conindid = i.indexrelid)",
+        (FACT_TABLE,),
+    )
+    # 파티션 테이블의 인덱스 정의는 'ON ONLY'(부모에만 생성)로 나오므로 파티션까지 만들도록 제거
+    indexes = [(name, definition.replace(" ON ONLY ", " ON ", 1)) for name, definition in cursor.fetchall()]
+    return constraints, indexes
+
+
+def restore_statements(constraints, indexes) -> List[Tuple[str, str]]:
+    """제거한 제약/인덱스를 다시 만드는 (이름, DDL) - PK/UNIQUE, 인덱스, FK 순"""
+    statements = [(n, f"ALTER TABLE {FACT_TABLE} ADD CONSTRAINT {n} {d}") for n, k, d in constraints if k != "f"]
+    statements += indexes
+    statements += [(n, f"ALTER TABLE {FACT_TABLE} ADD CONSTRAINT {n} {d}") for n, k, d in constraints if k == "f"]
+    return statements
+
+
+def restore_missing(cursor, constraints, indexes) -> List[str]:
+    """
+    제거한 제약/인덱스 중 아직 없는 것을 하나씩 다시 만들고, 만들지 못한 DDL 반환
+
+    적재나 병렬 재생성이 실패했을 때 테이블을 제약/인덱스 없이 남기지 않기 위해 사용합니다.
+    """
+    import psycopg2
+
+    present_constraints, present_indexes = fact_constraints_and_indexes(cursor)
+    present = {name for name, _, _ in present_constraints} | {name for name, _ in present_indexes}
+    failed = []
+    for name, statement in restore_statements(constraints, indexes):
+        if name in present:
+            continue
+        try:
+            cursor.execute(statement)
+        except psycopg2.Error as e:
+            print(f"  {name} 복원 실패: {str(e).strip()}", file=sys.stderr)
+            failed.append(statement)
+    return failed
+
+
+def print_restore_ddl(statements: List[str]) -> None:
+    print("다음 DDL로 팩트 제약/인덱스를 직접 복원해야 합니다 (중복 행 등 원인을 해결한 뒤 실행):", file=sys.stderr)
+    for statement in statements:
+        print(f"  {statement};", file=sys.stderr)
+
+
+def create_index(url: str, statement: str) -> float:
+    """인덱스/제약 하나 생성 (스레드마다 별도 커넥션으로 병렬 생성)"""
+    conn = _connect(url)
+    try:
+        start = time.perf_counter()
+        with conn.cursor() as cursor:
+            cursor.execute("SET maintenance_work_mem = '1GB'")
+            cursor.execute(statement)
+        conn.commit()
+        return time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def dry_run(model: Model, branches, products, rows: int) -> None:
+    """DB 없이 샘플 행과 분포 요약 출력"""
+    lines = list(generate_chunk(model, 0, 1, rows))
+    print("샘플 행 (sale_id, contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity):")
+    for line in lines[:5]:
+        print("  " + line.rstrip("\n").replace("\t", " | "))
+    fields = [line.split("\t") for line in lines]
+    branch_names = {b[0]: b[1] for b in branches}
+    category_of = {p[0]: p[2] for p in products}
+    top = Counter(int(f[2]) for f in fields).most_common(5)
+    print("상위 지점:", ", ".join(f"{branch_names[b]} {n / rows:.1%}" for b, n in top))
+    by_category: Dict[str, List[float]] = {}
+    for f in fields:
+        by_category.setdefault(category_of[int(f[3])], []).append(float(f[5]))
+    for name, amounts in by_category.items():
+        amounts.sort()
+        print(f"{name}: {len(amounts) / rows:.1%}, 금액 중앙값 {amounts[len(amounts) // 2]:,.0f}원")
+    months = Counter(f[4][5:7] for f in fields)
+    print("월별 비중:", " ".join(f"{m}월 {months[m] / rows:.1%}" for m in sorted(months)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="팩트 행 수")
+    parser.add_argument("--branches", type=int, default=200)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--start", default="2021-01-01", help="첫 판매일")
+    parser.add_argument("--days", type=int, default=4 * 365, help="판매 기간 (일)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="COPY/트랜잭션 단위 행 수")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--truncate", action="store_true", help="기존 데이터를 지우고 적재 (없으면 비어 있을 때만)")
+    parser.add_argument("--dry-run", action="store_true", help="DB 없이 샘플 행과 분포만 출력")
+    args = parser.parse_args()
+
+    if args.branches < len(SEED_BRANCHES) or args.products < len(CATEGORIES):
+        sys.exit(f"--branches는 {len(SEED_BRANCHES)} 이상, --products는 {len(CATEGORIES)} 이상이어야 합니다")
+
+    rng = random.Random(args.seed)
+    branches = build_branches(args.branches, rng)
+    products = build_products(args.products)
+    model = build_model(args, branches, products)
+
+    if args.dry_run:
+        dry_run(model, branches, products, min(args.rows, args.chunk_rows))
+        return
+
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        sys.exit("DATABASE_URL이 필요합니다")
+
+    conn = _connect(url)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        if args.truncate:
+            cursor.execute(f"TRUNCATE {FACT_TABLE}, dim_branch, dim_product RESTART IDENTITY CASCADE")
+        else:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {FACT_TABLE}) OR EXISTS (SELECT 1 FROM dim_branch)")
+            if cursor.fetchone()[0]:
+                sys.exit("테이블에 데이터가 있습니다 (--truncate로 지우고 적재)")
+
+        # 1. 차원
+        copy_rows(cursor, "dim_branch", "(branch_id, branch_name, region, manager_name)", branches)
+        copy_rows(cursor, "dim_product", "(product_id, product_name, product_category, description)", products)
+        print(f"차원 적재: 지점 {len(branches)}개, 상품 {len(products)}개")
+
+        # 2. 파티션 레이아웃(partitioned.sql)이면 기간의 월 파티션 생성, 제약/인덱스 제거, 롤업 트리거 끄기
+        cursor.execute("SELECT to_regproc('create_sales_partitions') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT create_sales_partitions(%s, %s)", (model.days[0], model.days[-1]))
+            print(f"월 파티션 {cursor.fetchone()[0]}개 생성")
+        constraints, indexes = fact_constraints_and_indexes(cursor)
+        for name, _, _ in constraints:  # UNIQUE(u) → PK(p) → FK(f) 순
+            cursor.execute(f"ALTER TABLE {FACT_TABLE} DROP CONSTRAINT {name}")
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        cursor.execute(f"ALTER TABLE {FACT_TABLE} DISABLE TRIGGER USER")
+        print(f"제약 {len(constraints)}개, 인덱스 {len(indexes)}개 제거 후 적재")
+
+        # 3. 팩트 (청크별 프로세스에서 COPY)
+        start = time.perf_counter()
+        chunks = [
+            (chunk, low + 1, min(args.chunk_rows, args.rows - low))
+            for chunk, low in enumerate(range(0, args.rows, args.chunk_rows))
+        ]
+        loaded = 0
+        try:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                futures = [pool.submit(load_chunk, url, model, *c) for c in chunks]
+                for future in futures:
+                    loaded += future.result()
+                    elapsed = time.perf_counter() - start
+                    print(f"  팩트 적재 {loaded:,}/{args.rows:,}행 ({elapsed:.0f}초, {loaded / elapsed:,.0f}행/초)", flush=True)
+        except BaseException:
+            # 적재 실패/중단 - 이미 커밋된 청크는 남기고 제거한 제약/인덱스를 되돌림 (롤업은 재계산 필요)
+            cursor.execute(f"ALTER TABLE {FACT_TABLE} ENABLE TRIGGER USER")
+            print(f"팩트 적재 실패 ({loaded:,}행 커밋됨) - 제약/인덱스 복원 중", file=sys.stderr)
+            failed = restore_missing(cursor, constraints, indexes)
+            if failed:
+                print_restore_ddl(failed)
+            print("적재된 행을 롤업에 반영하려면: SELECT refresh_sales_rollups();", file=sys.stderr)
+            raise
+        cursor.execute(f"ALTER TABLE {FACT_TABLE} ENABLE TRIGGER USER")
+
+        # 4. 제약/인덱스 재생성 (PK/UNIQUE와 인덱스는 병렬, FK는 그 뒤)
+        start = time.perf_counter()
+        foreign_keys = {n for n, k, _ in constraints if k == "f"}
+        statements = restore_statements(constraints, indexes)
+        try:
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                list(pool.map(lambda s: create_index(url, s), [d for n, d in statements if n not in foreign_keys]))
+            for name, statement in statements:
+                if name in foreign_keys:
+                    cursor.execute(statement)
+        except Exception:
+            # 병렬 생성 중 하나가 실패하면 나머지를 하나씩 다시 시도하고, 그래도 없는 것은 DDL 출력
+            print("제약/인덱스 재생성 실패 - 남은 것을 하나씩 다시 시도", file=sys.stderr)
+            failed = restore_missing(cursor, constraints, indexes)
+            if failed:
+                print_restore_ddl(failed)
+                raise
+        print(f"제약/인덱스 재생성: {time.perf_counter() - start:.1f}초")
+
+        # 5. 시퀀스, 롤업, 통계
+        for table, column in ((FACT_TABLE, "sale_id"), ("dim_branch", "branch_id"), ("dim_product", "product_id")):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), (SELECT MAX({column}) FROM {table}))"
+            )
+        cursor.execute("SELECT to_regproc('refresh_sales_rollups') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            start = time.perf_counter()
+            cursor.execute("SELECT refresh_sales_rollups()")
+            print(f"롤업 재계산: {time.perf_counter() - start:.1f}초")
+        cursor.execute("ANALYZE")
+    conn.close()
+    print("완료")
+
+
+if __name__ == "__main__":
+    main()
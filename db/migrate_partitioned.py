@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+"""fact_loan_sales 레이아웃 전환 - 단일 테이블(schema.sql) → 월 파티션(partitioned.sql)
+
+한 트랜잭션에서 실행하므로 중간에 실패하면 아무것도 바뀌지 않습니다. 테이블 이름을 바꾸려면
+ACCESS EXCLUSIVE 잠금이 필요해 실행 중에는 팩트 읽기(/chat)와 쓰기(적재)가 모두 대기하므로
+점검 시간에 실행하세요 (소요 시간은 행 수에 비례하며 대부분 복사와 인덱스 생성).
+
+1. 기존 테이블/인덱스/시퀀스 이름에 _heap을 붙여 보관 (롤업 트리거 정의는 읽어둔 뒤 제거)
+2. partitioned.sql로 파티션 부모 생성, 데이터 기간의 월 파티션 생성
+3. 보조 인덱스를 지우고 월별로 날짜순 복사(BRIN이 좁은 범위를 갖도록) 후 인덱스 재생성
+4. sale_id 시퀀스 이어받기, 롤업 트리거를 새 부모에 다시 생성 (데이터가 같으므로 롤업 재계산 불필요)
+
+    cd db
+    DATABASE_URL=postgresql://... python migrate_partitioned.py
+    python migrate_partitioned.py --drop-old   # 확인 후 보관한 fact_loan_sales_heap 삭제
+
+되돌리려면 fact_loan_sales를 지우고 fact_loan_sales_heap과 그 인덱스/시퀀스의 _heap을 떼면 됩니다
+(전환 후 적재된 행은 옮겨야 함).
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from generate_sales import FACT_TABLE, fact_constraints_and_indexes
+
+DB_DIR = Path(__file__).resolve().parent
+OLD_TABLE = f"{FACT_TABLE}_heap"
+COLUMNS = "sale_id, contract_id, branch_id, product_id, sale_date, disbursed_amount, quantity, created_at"
+
+
+def relkind(cursor, table: str):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def migrate(cursor, log=print) -> None:
+    """현재 트랜잭션에서 전환 (커밋은 호출자가)"""
+    kind = relkind(cursor, FACT_TABLE)
+    if kind == "p":
+        raise RuntimeError(f"{FACT_TABLE}는 이미 파티션 테이블입니다")
+    if kind != "r":
+        raise RuntimeError(f"{FACT_TABLE} 테이블이 없습니다 (schema.sql 먼저 실행)")
+    if relkind(cursor, OLD_TABLE) is not None:
+        raise RuntimeError(f"{OLD_TABLE}가 이미 있습니다 (이전 전환의 보관 테이블 확인 후 --drop-old)")
+
+    cursor.execute(f"LOCK TABLE {FACT_TABLE} IN ACCESS EXCLUSIVE MODE")  # 도중에 잠금을 올리다 교착되지 않도록 처음부터
+    cursor.execute("SET LOCAL maintenance_work_mem = '1GB'")
+
+    # 1. 롤업 등 사용자 트리거 정의 보관 후 제거, 기존 객체 이름 변경
+    cursor.execute(
+        "SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal",
+        (FACT_TABLE,),
+    )
+    triggers = cursor.fetchall()
+    for name, _ in triggers:
+        cursor.execute(f"DROP TRIGGER {name} ON {FACT_TABLE}")
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'sale_id')", (FACT_TABLE,))
+    sequence = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = %s::regclass",
+        (FACT_TABLE,),
+    )
+    for (index,) in cursor.fetchall():  # 제약 인덱스 이름을 바꾸면 제약 이름도 함께 바뀜
+        cursor.execute(f'ALTER INDEX "{index}" RENAME TO "{index}_heap"')
+    cursor.execute(f"ALTER TABLE {FACT_TABLE} RENAME TO {OLD_TABLE}")
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} RENAME TO {OLD_TABLE}_sale_id_seq")
+
+    # 2. 파티션 부모와 월 파티션
+    cursor.execute((DB_DIR / "partitioned.sql").read_text(encoding="utf-8"))
+    cursor.execute(f"SELECT MIN(sale_date), MAX(sale_date), COUNT(*) FROM {OLD_TABLE}")
+    first, last, total = cursor.fetchone()
+    months = []
+    if total:
+        cursor.execute("SELECT create_sales_partitions(%s, %s)", (first, last))
+        cursor.execute(
+            "SELECT d::DATE FROM generate_series(DATE_TRUNC('month', %s::DATE), %s::DATE, INTERVAL '1 month') AS d",
+            (first, last),
+        )
+        months = [m for (m,) in cursor.fetchall()]
+
+    # 3. 보조 인덱스 없이 월별 날짜순 복사 후 인덱스 재생성
+    _, indexes = fact_constraints_and_indexes(cursor)
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    start = time.perf_counter()
+    copied = 0
+    for month in months:
+        cursor.execute(
+            f"INSERT INTO {FACT_TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {OLD_TABLE} "
+            "WHERE sale_date >= %s AND sale_date < %s::DATE + INTERVAL '1 month' ORDER BY sale_date",
+            (month, month),
+        )
+        copied += cursor.rowcount
+        log(f"  {month:%Y-%m} {cursor.rowcount:,}행 복사 ({copied:,}/{total:,}, {time.perf_counter() - start:.0f}초)")
+    for name, definition in indexes:
+        index_start = time.perf_counter()
+        cursor.execute(definition)
+        log(f"  인덱스 {name} 생성 ({time.perf_counter() - index_start:.1f}초)")
+
+    # 4. 시퀀스, 트리거, 통계
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{FACT_TABLE}', 'sale_id'), "
+        f"(SELECT COALESCE(MAX(sale_id), 0) + 1 FROM {OLD_TABLE}), false)"
+    )
+    for name, definition in triggers:  # 정의가 원래 이름(fact_loan_sales)을 가리키므로 그대로 실행
+        cursor.execute(definition)
+        log(f"  트리거 {name} 재생성")
+    cursor.execute(f"ANALYZE {FACT_TABLE}")
+    log(f"전환 완료: {copied:,}행, {len(months)}개월, {time.perf_counter() - start:.0f}초")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drop-old", action="store_true", help=f"전환 후 보관한 {OLD_TABLE} 삭제")
+    args = parser.parse_args()
+
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        sys.exit("DATABASE_URL이 필요합니다")
+
+    import psycopg2
+
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cursor:
+            if args.drop_old:
+                if relkind(cursor, FACT_TABLE) != "p":
+                    sys.exit(f"{FACT_TABLE}가 파티션 테이블이 아니므로 {OLD_TABLE}를 지우지 않습니다")
+                cursor.execute(f"DROP TABLE IF EXISTS {OLD_TABLE}")
+                print(f"{OLD_TABLE} 삭제")
+            else:
+                try:
+                    migrate(cursor)
+                except RuntimeError as e:
+                    sys.exit(str(e))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+-- 월별 범위 파티션 판매 팩트 (선택 레이아웃)
+-- 기존 테이블은 migrate_partitioned.py로 옮기고, 새로 설치할 때는 schema.sql 대신 아래를 실행
+-- (dim_branch/dim_product는 schema.sql과 같음, 여러 번 실행해도 안전)
+--
+-- 생성되는 쿼리는 거의 모두 sale_date로 거르고 지점/상품으로 묶으므로
+-- - 월 파티션: 기간 조건이 있으면 해당 월 파티션만 읽음 (파티션 프루닝)
+-- - BRIN(sale_date): 파티션 안에서 날짜 범위를 블록 단위로 건너뜀 (날짜순 적재 시 수십 KB)
+-- - (branch_id, sale_date) / (product_id, sale_date) INCLUDE (...): 지점/상품별 합계를 인덱스만으로 계산
+--
+-- 파티션 테이블의 UNIQUE 제약은 파티션 키를 포함해야 하므로 contract_id 단독 유일성은
+-- (contract_id, sale_date) 제약 + 적재 API(/ingest/sales)의 잠금 후 UPDATE/INSERT로 보장합니다.
+
+CREATE TABLE IF NOT EXISTS dim_branch (
+    branch_id SERIAL PRIMARY KEY,
+    branch_name VARCHAR(100) NOT NULL UNIQUE,
+    region VARCHAR(50),
+    manager_name VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS dim_product (
+    product_id SERIAL PRIMARY KEY,
+    product_name VARCHAR(100) NOT NULL UNIQUE,
+    product_category VARCHAR(50),
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 기존 비파티션 테이블 위에 실행하면 인덱스만 잘못 붙으므로 중단
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass('fact_loan_sales') AND relkind <> 'p') THEN
+        RAISE EXCEPTION 'fact_loan_sales가 파티션 테이블이 아닙니다 - migrate_partitioned.py로 옮기세요';
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS fact_loan_sales (
+    sale_id SERIAL,
+    contract_id VARCHAR(50) NOT NULL,
+    branch_id INTEGER NOT NULL REFERENCES dim_branch(branch_id),
+    product_id INTEGER NOT NULL REFERENCES dim_product(product_id),
+    sale_date DATE NOT NULL,
+    disbursed_amount NUMERIC(15, 2) NOT NULL,
+    quantity INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (sale_id, sale_date),
+    UNIQUE (contract_id, sale_date)
+) PARTITION BY RANGE (sale_date);
+
+CREATE INDEX IF NOT EXISTS idx_fact_sales_date_brin ON fact_loan_sales USING BRIN (sale_date) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_branch_date ON fact_loan_sales (branch_id, sale_date) INCLUDE (product_id, disbursed_amount);
+CREATE INDEX IF NOT EXISTS idx_fact_sales_product_date ON fact_loan_sales (product_id, sale_date) INCLUDE (branch_id, disbursed_amount);
+-- contract_id 조회는 UNIQUE (contract_id, sale_date) 인덱스 사용
+
+-- 월 파티션이 없는 날짜의 행을 받는 기본 파티션
+-- (seed.sql이나 직접 INSERT처럼 create_sales_partitions를 먼저 부르지 않는 쓰기가 실패하지 않도록)
+-- 기본 파티션은 비어 있거나 작게 유지해야 합니다 - 월 파티션을 만들 때마다 기본 파티션 전체를 검사하므로
+CREATE TABLE IF NOT EXISTS fact_loan_sales_default PARTITION OF fact_loan_sales DEFAULT;
+
+-- 월 파티션 생성 (first_date가 속한 월부터 last_date가 속한 월까지, 이미 있으면 건너뜀)
+-- 기본 파티션에 그 월의 행이 있으면 새 파티션으로 옮긴 뒤 붙임 (행은 그대로이므로 롤업 재계산 불필요)
+-- 적재 API와 generate_sales.py는 적재 전에, 백엔드는 시작 시와 하루마다 앞으로 몇 달치를 호출합니다.
+CREATE OR REPLACE FUNCTION create_sales_partitions(first_date DATE, last_date DATE) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    part_month DATE := DATE_TRUNC('month', first_date)::DATE;
+    part_end DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_month <= last_date LOOP
+        part_end := (part_month + INTERVAL '1 month')::DATE;
+        part_name := 'fact_loan_sales_' || TO_CHAR(part_month, 'YYYYMM');
+        IF to_regclass(part_name) IS NULL THEN
+            IF EXISTS (
+                SELECT 1 FROM fact_loan_sales_default WHERE sale_date >= part_month AND sale_date < part_end
+            ) THEN
+                -- 기본 파티션의 행을 옮긴 뒤 붙임 (붙일 때 인덱스/제약은 부모 기준으로 생성)
+                EXECUTE format('CREATE TABLE %I (LIKE fact_loan_sales INCLUDING DEFAULTS)', part_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM fact_loan_sales_default WHERE sale_date >= %L AND sale_date < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    part_month, part_end, part_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE fact_loan_sales ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    part_name, part_month, part_end
+                );
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF fact_loan_sales FOR VALUES FROM (%L) TO (%L)',
+                    part_name, part_month, part_end
+                );
+            END IF;
+            created := created + 1;
+        END IF;
+        part_month := part_end;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+-- 최근 2년 + 다음 3개월
+SELECT create_sales_partitions((CURRENT_DATE - INTERVAL '2 years')::DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE);
@@ -0,0 +1,134 @@
+-- 판매 집계 롤업 테이블
+-- schema.sql 실행 후 실행 (여러 번 실행해도 안전, 마지막에 현재 팩트 데이터로 다시 채움)
+--
+-- 대부분의 질문은 fact_loan_sales를 지점/상품/월별로 SUM(disbursed_amount), COUNT(*) 하는
+-- 집계입니다. 백엔드는 가드레일 검증 후 이런 쿼리를 답할 수 있는 가장 작은 롤업으로
+-- 바꿔 실행합니다 (backend/app/rollup_rewrite.py).
+--
+-- 롤업은 fact_loan_sales의 문장 단위 트리거가 변경된 행(전이 테이블)만 모아 증분 반영합니다.
+-- INSERT/COPY 한 번에 몇 건이 들어오든 트리거는 문장당 한 번 실행됩니다.
+
+-- 1. 일별 지점×상품 집계
+CREATE TABLE IF NOT EXISTS agg_sales_daily (
+    sale_date DATE NOT NULL,
+    branch_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    sale_count BIGINT NOT NULL,
+    total_amount NUMERIC(20, 2) NOT NULL,
+    PRIMARY KEY (sale_date, branch_id, product_id)
+);
+
+-- 2. 월별 지점×상품 집계 (sale_month = 해당 월 1일)
+CREATE TABLE IF NOT EXISTS agg_sales_monthly (
+    sale_month DATE NOT NULL,
+    branch_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    sale_count BIGINT NOT NULL,
+    total_amount NUMERIC(20, 2) NOT NULL,
+    PRIMARY KEY (sale_month, branch_id, product_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_agg_sales_daily_branch ON agg_sales_daily(branch_id, sale_date);
+CREATE INDEX IF NOT EXISTS idx_agg_sales_daily_product ON agg_sales_daily(product_id, sale_date);
+
+-- 3. 증분 반영 트리거
+-- 변경된 행을 (키, +1/-1, ±금액) 델타로 모아 키별로 더하고, 건수가 0이 된 키는 삭제
+CREATE OR REPLACE FUNCTION maintain_sales_rollups() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    delta TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        delta := 'SELECT sale_date, branch_id, product_id, 1 AS n, disbursed_amount AS amount FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        delta := 'SELECT sale_date, branch_id, product_id, -1 AS n, -disbursed_amount AS amount FROM old_rows';
+    ELSE
+        delta := 'SELECT sale_date, branch_id, product_id, 1 AS n, disbursed_amount AS amount FROM new_rows '
+              || 'UNION ALL '
+              || 'SELECT sale_date, branch_id, product_id, -1, -disbursed_amount FROM old_rows';
+    END IF;
+
+    EXECUTE format($sql$
+        WITH delta AS (%s),
+        daily AS (
+            INSERT INTO agg_sales_daily AS a (sale_date, branch_id, product_id, sale_count, total_amount)
+            SELECT sale_date, branch_id, product_id, SUM(n), SUM(amount)
+            FROM delta
+            GROUP BY sale_date, branch_id, product_id
+            ON CONFLICT (sale_date, branch_id, product_id) DO UPDATE
+            SET sale_count = a.sale_count + EXCLUDED.sale_count,
+                total_amount = a.total_amount + EXCLUDED.total_amount
+        )
+        INSERT INTO agg_sales_monthly AS a (sale_month, branch_id, product_id, sale_count, total_amount)
+        SELECT DATE_TRUNC('month', sale_date)::DATE, branch_id, product_id, SUM(n), SUM(amount)
+        FROM delta
+        GROUP BY DATE_TRUNC('month', sale_date)::DATE, branch_id, product_id
+        ON CONFLICT (sale_month, branch_id, product_id) DO UPDATE
+        SET sale_count = a.sale_count + EXCLUDED.sale_count,
+            total_amount = a.total_amount + EXCLUDED.total_amount
+    $sql$, delta);
+
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM agg_sales_daily a
+        USING (SELECT DISTINCT sale_date, branch_id, product_id FROM old_rows) o
+        WHERE a.sale_date = o.sale_date AND a.branch_id = o.branch_id AND a.product_id = o.product_id
+          AND a.sale_count = 0;
+        DELETE FROM agg_sales_monthly a
+        USING (SELECT DISTINCT DATE_TRUNC('month', sale_date)::DATE AS sale_month, branch_id, product_id FROM old_rows) o
+        WHERE a.sale_month = o.sale_month AND a.branch_id = o.branch_id AND a.product_id = o.product_id
+          AND a.sale_count = 0;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION truncate_sales_rollups() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE agg_sales_daily, agg_sales_monthly;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_sales_rollups_insert ON fact_loan_sales;
+DROP TRIGGER IF EXISTS trg_sales_rollups_update ON fact_loan_sales;
+DROP TRIGGER IF EXISTS trg_sales_rollups_delete ON fact_loan_sales;
+DROP TRIGGER IF EXISTS trg_sales_rollups_truncate ON fact_loan_sales;
+
+CREATE TRIGGER trg_sales_rollups_insert
+    AFTER INSERT ON fact_loan_sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_sales_rollups();
+
+CREATE TRIGGER trg_sales_rollups_update
+    AFTER UPDATE ON fact_loan_sales
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_sales_rollups();
+
+CREATE TRIGGER trg_sales_rollups_delete
+    AFTER DELETE ON fact_loan_sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_sales_rollups();
+
+CREATE TRIGGER trg_sales_rollups_truncate
+    AFTER TRUNCATE ON fact_loan_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION truncate_sales_rollups();
+
+-- 4. 전체 재계산 (최초 적재, 트리거 없이 대량 적재한 뒤 등)
+CREATE OR REPLACE FUNCTION refresh_sales_rollups() RETURNS VOID
+LANGUAGE sql AS $$
+    TRUNCATE agg_sales_daily, agg_sales_monthly;
+    INSERT INTO agg_sales_daily (sale_date, branch_id, product_id, sale_count, total_amount)
+    SELECT sale_date, branch_id, product_id, COUNT(*), SUM(disbursed_amount)
+    FROM fact_loan_sales
+    GROUP BY sale_date, branch_id, product_id;
+    INSERT INTO agg_sales_monthly (sale_month, branch_id, product_id, sale_count, total_amount)
+    SELECT DATE_TRUNC('month', sale_date)::DATE, branch_id, product_id, SUM(sale_count), SUM(total_amount)
+    FROM agg_sales_daily
+    GROUP BY DATE_TRUNC('month', sale_date)::DATE, branch_id, product_id;
+$$;
+
+SELECT refresh_sales_rollups();
+ANALYZE agg_sales_daily;
+ANALYZE agg_sales_monthly;
@@ -35,4 +35,5 @@ CREATE TABLE IF NOT EXISTS fact_loan_sales (
 CREATE INDEX IF NOT EXISTS idx_fact_sales_branch ON fact_loan_sales(branch_id);
 CREATE INDEX IF NOT EXISTS idx_fact_sales_product ON fact_loan_sales(product_id);
 CREATE INDEX IF NOT EXISTS idx_fact_sales_date ON fact_loan_sales(sale_date);
-CREATE INDEX IF NOT EXISTS idx_fact_sales_contract ON fact_loan_sales(contract_id);
+-- contract_id는 UNIQUE 제약 인덱스로 충분하므로 별도 인덱스 제거 (이전 스키마로 만든 DB 포함)
+DROP INDEX IF EXISTS idx_fact_sales_contract;